@@ -3,6 +3,7 @@
 import streamlit as st
 import pandas as pd
 from database.crud import crud
+from utils.figure_cache import cached_figure
 from datetime import date, timedelta
 
 def render():
@@ -19,6 +20,15 @@ def render():
     with tab2:
         render_search_activities()
 
+    # حالة كاتب السجل (الأنشطة تُكتب على دفعات في الخلفية)
+    with st.expander("⚙️ حالة كاتب السجل"):
+        writer_stats = crud.get_activity_log_writer_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("📥 المستلمة", writer_stats['buffered'])
+        col2.metric("💾 المكتوبة", writer_stats['flushed'])
+        col3.metric("⏳ المعلقة", writer_stats['pending'])
+        col4.metric("🗑️ المسقطة", writer_stats['dropped'])
+
 def render_all_activities():
     """عرض جميع الأنشطة"""
     st.markdown("### 📋 سجل الأنشطة الأخير")
@@ -94,10 +104,12 @@ def render_all_activities():
         
         if not table_counts.empty:
             import plotly.express as px
-            fig = px.bar(
-                x=table_counts.index,
-                y=table_counts.values,
-                labels={'x': 'الجدول', 'y': 'عدد الأنشطة'},
+            fig = cached_figure(
+                px.bar,
+                table_counts.rename_axis('table_name').reset_index(name='count'),
+                x='table_name',
+                y='count',
+                labels={'table_name': 'الجدول', 'count': 'عدد الأنشطة'},
                 title='الأنشطة حسب الجدول'
             )
             st.plotly_chart(fig, use_container_width=True)
@@ -108,29 +120,33 @@ def render_search_activities():
     """البحث والفلترة في الأنشطة"""
     st.markdown("### 🔍 بحث وفلترة متقدمة")
     
-    activities = crud.get_activity_log(limit=1000)
+    # قيم الفلاتر من قاعدة البيانات (تشمل الأقسام المؤرشفة)
+    filter_values = crud.get_activity_log_filter_values()
     
-    if activities.empty:
+    if not filter_values['action']:
         st.info("لا توجد أنشطة للبحث فيها")
         return
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         # فلترة حسب نوع النشاط
-        action_types = ["الكل"] + activities['action'].unique().tolist()
+        action_types = ["الكل"] + filter_values['action']
         selected_action = st.selectbox("نوع النشاط", action_types)
     
     with col2:
         # فلترة حسب الجدول
-        tables = ["الكل"] + activities['table_name'].unique().tolist()
+        tables = ["الكل"] + filter_values['table_name']
         selected_table = st.selectbox("الجدول", tables)
     
     with col3:
         # فلترة حسب المستخدم
-        users = ["الكل"] + activities['user_name'].unique().tolist()
+        users = ["الكل"] + filter_values['user_name']
         selected_user = st.selectbox("المستخدم", users)
     
+    with col4:
+        record_id = st.number_input("رقم السجل", min_value=0, value=0, step=1, help="0 = الكل")
+    
     # فلترة حسب التاريخ
     col1, col2 = st.columns(2)
     with col1:
@@ -141,29 +157,26 @@ def render_search_activities():
     # بحث نصي
     search_text = st.text_input("🔍 بحث في التفاصيل")
     
-    # تطبيق الفلاتر
-    filtered_activities = activities.copy()
-    
-    if selected_action != "الكل":
-        filtered_activities = filtered_activities[filtered_activities['action'] == selected_action]
-    
-    if selected_table != "الكل":
-        filtered_activities = filtered_activities[filtered_activities['table_name'] == selected_table]
-    
-    if selected_user != "الكل":
-        filtered_activities = filtered_activities[filtered_activities['user_name'] == selected_user]
-    
-    # فلترة التاريخ
-    filtered_activities['created_date'] = pd.to_datetime(filtered_activities['created_at']).dt.date
-    filtered_activities = filtered_activities[
-        (filtered_activities['created_date'] >= start_date) & 
-        (filtered_activities['created_date'] <= end_date)
-    ]
-    
-    if search_text:
-        filtered_activities = filtered_activities[
-            filtered_activities['details'].str.contains(search_text, case=False, na=False)
-        ]
+    filters = {
+        'action': None if selected_action == "الكل" else selected_action,
+        'table_name': None if selected_table == "الكل" else selected_table,
+        'user_name': None if selected_user == "الكل" else selected_user,
+        'record_id': int(record_id) or None,
+        'start_date': start_date,
+        'end_date': end_date,
+        'search_text': search_text or None
+    }
+    
+    # الصفحات بمؤشر آخر رقم معروض، ويبدأ من جديد عند تغيير الفلاتر
+    filters_key = repr(sorted(filters.items()))
+    if st.session_state.get('activity_search_filters') != filters_key:
+        st.session_state.activity_search_filters = filters_key
+        st.session_state.activity_search_cursor = None
+    
+    page_size = 200
+    filtered_activities = crud.get_activity_log(
+        limit=page_size, before_id=st.session_state.activity_search_cursor, **filters
+    )
     
     # عرض النتائج
     st.markdown(f"### 📊 النتائج ({len(filtered_activities)} سجل)")
@@ -175,6 +188,16 @@ def render_search_activities():
             hide_index=True
         )
         
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.session_state.activity_search_cursor is not None and st.button("⏮️ الأحدث"):
+                st.session_state.activity_search_cursor = None
+                st.rerun()
+        with col2:
+            if len(filtered_activities) == page_size and st.button("⬅️ الأقدم"):
+                st.session_state.activity_search_cursor = int(filtered_activities['id'].iloc[-1])
+                st.rerun()
+        
         # تصدير النتائج
         st.markdown("---")
         st.markdown("#### 📥 تصدير النتائج")
@@ -187,4 +210,11 @@ def render_search_activities():
             mime="text/csv"
         )
     else:
-        st.info("لا توجد نتائج مطابقة للبحث")
\ No newline at end of file
+        st.info("لا توجد نتائج مطابقة للبحث")
+    
+    # أرشفة الأنشطة القديمة في أقسام شهرية
+    with st.expander("🗄️ أرشفة الأنشطة القديمة"):
+        older_than_days = st.number_input("أرشفة الأنشطة الأقدم من (يوم)", min_value=30, value=90, step=30)
+        if st.button("🗄️ أرشفة"):
+            moved = crud.archive_activity_log(older_than_days=int(older_than_days))
+            st.success(f"✅ تم نقل {moved} سجل إلى الأرشيف الشهري")
@@ -1,6 +1,9 @@
 import streamlit as st
 from datetime import date
 from database.crud import crud
+from database.dashboard_snapshot import dashboard_snapshots
+from database.journal import change_journal
+from database.maintenance import maintenance
 from database.models import db
 from styles import load_custom_css
 from components.notifications import NotificationCenter
@@ -32,6 +35,10 @@ st.set_page_config(
 @st.cache_resource
 def init_db():
     db.initialize()
+    # نقل كل تغيير إلى سجل الاستعادة لنقطة زمنية
+    change_journal.start()
+    # ANALYZE والتفريغ التدريجي في ساعات الهدوء
+    maintenance.start()
     return True
 
 init_db()
@@ -83,7 +90,7 @@ def render_sidebar():
 
         st.markdown("---")
         # معلومات سريعة
-        stats = crud.get_dashboard_stats()
+        stats = dashboard_snapshots.get().stats
         st.info(f"📅 {date.today().strftime('%Y-%m-%d')}")
         st.success(f"📌 مواعيد اليوم: {stats['today_appointments']}")
         if stats['low_stock_items'] > 0:
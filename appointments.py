@@ -4,6 +4,8 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from database.crud import crud
+from database.reference_data import reference_data
+from components.patient_picker import PatientPicker
 
 def render():
     """صفحة إدارة المواعيد"""
@@ -72,26 +74,21 @@ def render_all_appointments():
 def render_add_appointment():
     """➕ إضافة موعد جديد"""
     st.markdown("#### ➕ إضافة موعد")
-    patients = crud.get_all_patients()
     doctors = crud.get_all_doctors()
     treatments = crud.get_all_treatments()
     
-    if patients.empty or doctors.empty:
+    if doctors.empty:
         st.warning("⚠️ يجب إضافة مرضى وأطباء أولاً.")
         return
     
     col1, col2 = st.columns(2)
     
     with col1:
-        patient_id = st.selectbox(
-            "المريض *",
-            patients['id'].tolist(),
-            format_func=lambda x: patients[patients['id'] == x]['name'].iloc[0]
-        )
+        patient_id = PatientPicker.render("المريض *", key="appointment_patient")
         treatment_id = st.selectbox(
             "العلاج *",
             treatments['id'].tolist(),
-            format_func=lambda x: treatments[treatments['id'] == x]['name'].iloc[0]
+            format_func=reference_data.formatter('treatments')
         ) if not treatments.empty else None
         appointment_date = st.date_input("تاريخ الموعد *", min_value=date.today())
     
@@ -99,7 +96,7 @@ def render_add_appointment():
         doctor_id = st.selectbox(
             "الطبيب *",
             doctors['id'].tolist(),
-            format_func=lambda x: doctors[doctors['id'] == x]['name'].iloc[0]
+            format_func=reference_data.formatter('doctors')
         )
         appointment_time = st.time_input("وقت الموعد *")
         
@@ -112,6 +109,9 @@ def render_add_appointment():
     notes = st.text_area("ملاحظات")
     
     if st.button("💾 حجز الموعد", type="primary", use_container_width=True):
+        if patient_id is None:
+            st.error("❌ يرجى اختيار المريض")
+            return
         try:
             crud.create_appointment(
                 patient_id,
@@ -151,7 +151,7 @@ def render_doctor_schedule():
             selected_doctor = st.selectbox(
                 "اختر الطبيب",
                 doctors['id'].tolist(),
-                format_func=lambda x: doctors[doctors['id'] == x]['name'].iloc[0]
+                format_func=reference_data.formatter('doctors')
             )
         with col2:
             schedule_date = st.date_input("التاريخ", date.today())
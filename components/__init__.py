@@ -2,5 +2,6 @@
 
 from .notifications import NotificationCenter
 from .quick_actions import QuickActions
+from .patient_picker import PatientPicker
 
-__all__ = ['NotificationCenter', 'QuickActions']
\ No newline at end of file
+__all__ = ['NotificationCenter', 'QuickActions', 'PatientPicker']
\ No newline at end of file
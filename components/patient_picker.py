@@ -0,0 +1,49 @@
+# components/patient_picker.py
+
+import streamlit as st
+from database.crud import crud
+from database.reference_data import reference_data
+
+@st.cache_data(max_entries=2000, show_spinner=False)
+def _find_patients(prefix, limit, generation):
+    """نتائج البحث لكل نص مكتوب، وتتجدد تلقائياً مع أي تعديل على المرضى (generation)"""
+    return crud.find_patients(prefix, limit)
+
+class PatientPicker:
+    """اختيار مريض بالبحث بدلاً من قائمة بكل المرضى"""
+    
+    @staticmethod
+    def render(label="المريض", key="patient_picker", limit=20):
+        """حقل بحث وقائمة بأول النتائج المطابقة، ويرجع رقم المريض المختار أو None"""
+        query = st.text_input(
+            f"🔍 {label}",
+            key=f"{key}_query",
+            placeholder="اكتب بداية الاسم أو رقم الهاتف..."
+        )
+        
+        selected_key = f"{key}_selected"
+        selected_id = st.session_state.get(selected_key)
+        
+        matches = _find_patients(query.strip(), limit, reference_data.generation('patients')) if query.strip() else []
+        options = [row[0] for row in matches]
+        labels = {row[0]: f"{row[1]} - {row[2]}" if row[2] else row[1] for row in matches}
+        
+        # الإبقاء على الاختيار السابق ظاهراً حتى لو تغير نص البحث
+        if selected_id is not None and selected_id not in labels:
+            options.insert(0, selected_id)
+            labels[selected_id] = reference_data.name('patients', selected_id)
+        
+        if not options:
+            if query.strip():
+                st.caption("لا يوجد مريض مطابق")
+            return None
+        
+        patient_id = st.selectbox(
+            label,
+            options,
+            index=options.index(selected_id) if selected_id in options else 0,
+            format_func=lambda x: labels[x],
+            key=f"{key}_select"
+        )
+        st.session_state[selected_key] = patient_id
+        return patient_id
@@ -3,6 +3,7 @@
 import streamlit as st
 from datetime import date
 from database.crud import crud
+from database.dashboard_snapshot import dashboard_snapshots
 
 class QuickActions:
     """مكون الإجراءات السريعة"""
@@ -35,7 +36,7 @@ class QuickActions:
                 st.rerun()
         
         # إحصائيات سريعة
-        stats = crud.get_dashboard_stats()
+        stats = dashboard_snapshots.get().stats
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -2,20 +2,53 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from database.crud import crud
+from database.dashboard_snapshot import dashboard_snapshots
 from components.quick_actions import QuickActions
 
+# فترات التحديث التلقائي المتاحة (بالثواني)
+REFRESH_INTERVALS = {
+    "بدون": None,
+    "كل 30 ثانية": 30,
+    "كل دقيقة": 60,
+    "كل 5 دقائق": 300
+}
+
 def render():
     """صفحة لوحة التحكم المحسنة"""
     st.markdown("""<div class='main-header'><h1>🏥 لوحة معلومات العيادة</h1><p>مرحباً بك في نظام إدارة العيادة المتكامل</p></div>""", unsafe_allow_html=True)
-    
-    # قسم المهام السريعة
-    QuickActions.render()
+
+    # التحديث التلقائي يخص لوحات المواعيد والتنبيهات فقط، ولا يعيد الاستعلامات المالية.
+    # كل اللوحات تقرأ لقطة مشتركة تحدثها خدمة في الخلفية، لذا لا تكلف قاعدة البيانات شيئاً
+    refresh_label = st.selectbox("🔄 التحديث التلقائي", list(REFRESH_INTERVALS), key="dashboard_refresh")
+    run_every = REFRESH_INTERVALS[refresh_label]
+
+    # كل لوحة fragment مستقل: التفاعل داخلها يعيد تشغيلها وحدها
+    st.fragment(render_quick_actions)()
     st.markdown("<hr>", unsafe_allow_html=True)
-    
-    # مقارنة الأداء الشهري
+
+    st.fragment(render_monthly_comparison)()
+    st.markdown("<hr>", unsafe_allow_html=True)
+
+    st.fragment(render_summary)()
+
+    # مواعيد اليوم والتنبيهات
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.fragment(render_today_appointments, run_every=run_every)()
+
+    with col2:
+        st.fragment(render_alerts, run_every=run_every)()
+
+def render_quick_actions():
+    """قسم المهام السريعة"""
+    QuickActions.render()
+
+def render_monthly_comparison():
+    """مقارنة الأداء الشهري"""
     st.markdown("### 📈 مقارنة الأداء الشهري")
-    monthly_comparison = crud.get_monthly_comparison()
-    
+    monthly_comparison = dashboard_snapshots.get().monthly_comparison
+
     def render_metric(label, current, previous):
         change = ((current - previous) / previous * 100) if previous > 0 else 0
         st.metric(label, f"{current:,.0f} ج.م", f"{change:.1f}%")
@@ -28,12 +61,12 @@ def render():
     with col3:
         st.metric("📅 المواعيد", f"{monthly_comparison['current_appointments']}", f"{monthly_comparison['appointments_change']:.1f}%")
 
-    st.markdown("<hr>", unsafe_allow_html=True)
-    
-    # الإحصائيات الرئيسية
-    stats = crud.get_dashboard_stats()
-    financial_summary = crud.get_financial_summary()
-    
+def render_summary():
+    """الإحصائيات الرئيسية"""
+    snapshot = dashboard_snapshots.get()
+    stats = snapshot.stats
+    financial_summary = snapshot.financial_summary
+
     st.markdown("### 📊 الملخص العام")
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -45,33 +78,63 @@ def render():
     with col4:
         st.metric("💰 صافي الربح", f"{financial_summary['net_profit']:,.0f} ج.م")
 
-    # مواعيد اليوم والتنبيهات
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("### 📅 مواعيد اليوم")
-        today_appointments = crud.get_appointments_by_date(date.today().isoformat())
-        if not today_appointments.empty:
-            st.dataframe(
-                today_appointments[[
-                    'patient_name', 'doctor_name', 'appointment_time', 'status'
-                ]],
-                use_container_width=True,
-                hide_index=True
+def render_today_appointments():
+    """مواعيد اليوم مع تحديث الحالة من نفس اللوحة"""
+    st.markdown("### 📅 مواعيد اليوم")
+    snapshot = dashboard_snapshots.get()
+    today_appointments = snapshot.today_appointments
+    if not today_appointments.empty:
+        st.dataframe(
+            today_appointments[[
+                'patient_name', 'doctor_name', 'appointment_time', 'status'
+            ]],
+            use_container_width=True,
+            hide_index=True
+        )
+
+        # تغيير الحالة يعيد تشغيل هذه اللوحة فقط
+        col1, col2, col3 = st.columns([2, 2, 1])
+        with col1:
+            labels = {
+                appointment_id: f"{appointment_time} - {patient_name}"
+                for appointment_id, appointment_time, patient_name in zip(
+                    today_appointments['id'], today_appointments['appointment_time'], today_appointments['patient_name']
+                )
+            }
+            appointment_id = st.selectbox(
+                "الموعد",
+                list(labels),
+                format_func=labels.get,
+                key="dashboard_status_appointment"
             )
-        else:
-            st.info("لا توجد مواعيد اليوم")
-    
-    with col2:
-        st.markdown("### ⚠️ التنبيهات المهمة")
-        low_stock = crud.get_low_stock_items()
-        if not low_stock.empty:
-            st.warning(f"يوجد {len(low_stock)} عنصر بمخزون منخفض")
-        else:
-            st.success("✅ المخزون في المستوى الآمن")
-        
-        expiring = crud.get_expiring_inventory(days=30)
-        if not expiring.empty:
-            st.error(f"يوجد {len(expiring)} صنف ينتهي خلال 30 يوم")
-        else:
-            st.success("✅ لا توجد أصناف قريبة من الانتهاء")
\ No newline at end of file
+        with col2:
+            new_status = st.selectbox("الحالة", ["مجدول", "مؤكد", "مكتمل", "ملغي"], key="dashboard_status_value")
+        with col3:
+            st.write("")
+            # التحديث في on_click يسبق إعادة تشغيل اللوحة فيظهر الجدول بالحالة الجديدة
+            st.button(
+                "✅ تحديث", key="dashboard_status_update", use_container_width=True,
+                on_click=update_appointment_status, args=(appointment_id, new_status)
+            )
+    else:
+        st.info("لا توجد مواعيد اليوم")
+    st.caption(f"آخر تحديث: {snapshot.taken_at.strftime('%H:%M:%S')}")
+
+def update_appointment_status(appointment_id, status):
+    """تحديث الحالة ثم اللقطة فوراً ليراها المستخدم في نفس اللحظة"""
+    crud.update_appointment_status(appointment_id, status)
+    dashboard_snapshots.refresh()
+
+def render_alerts():
+    """التنبيهات المهمة"""
+    st.markdown("### ⚠️ التنبيهات المهمة")
+    snapshot = dashboard_snapshots.get()
+    if snapshot.low_stock_count:
+        st.warning(f"يوجد {snapshot.low_stock_count} عنصر بمخزون منخفض")
+    else:
+        st.success("✅ المخزون في المستوى الآمن")
+
+    if snapshot.expiring_count:
+        st.error(f"يوجد {snapshot.expiring_count} صنف ينتهي خلال 30 يوم")
+    else:
+        st.success("✅ لا توجد أصناف قريبة من الانتهاء")
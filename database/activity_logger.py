@@ -0,0 +1,133 @@
+import atexit
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from .models import db
+
+class ActivityLogWriter:
+    """كاتب سجل الأنشطة على دفعات.
+
+    العمليات تضيف السجلات إلى ذاكرة مؤقتة وتعود فوراً، وخيط في الخلفية يكتبها
+    بـ executemany في معاملة واحدة كلما امتلأت دفعة أو مرت مدة الانتظار.
+    ما يتبقى في الذاكرة يُكتب عند إغلاق التطبيق.
+    """
+
+    def __init__(self, database, batch_size=100, flush_interval_ms=500, max_buffer=10000):
+        self.db = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_buffer = max_buffer
+
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+        # عدادات
+        self.buffered = 0
+        self.flushed = 0
+        self.dropped = 0
+
+    def log(self, action, table_name=None, record_id=None, details=None, user_name="النظام"):
+        """إضافة نشاط للذاكرة المؤقتة، وإرجاع False إذا أُسقط لامتلائها"""
+        created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        entry = (action, table_name, record_id, details, user_name, created_at)
+
+        with self._condition:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return False
+            self._buffer.append(entry)
+            self.buffered += 1
+            self._ensure_thread()
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def flush(self):
+        """كتابة كل ما في الذاكرة الآن من الخيط الحالي"""
+        with self._write_lock:
+            with self._condition:
+                batch = list(self._buffer)
+                self._buffer.clear()
+            self._write(batch)
+
+    def stop(self):
+        """إيقاف خيط الكتابة بعد تفريغ الذاكرة"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        """عدادات الكاتب"""
+        with self._condition:
+            pending = len(self._buffer)
+        return {
+            'buffered': self.buffered,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'pending': pending
+        }
+
+    def _ensure_thread(self):
+        if self._thread is None and not self._stopping:
+            self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._buffer) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            # قفل الكتابة من السحب حتى الكتابة في المسارين: لا تُكتب دفعة أحدث قبل دفعة سُحبت قبلها
+            # فتبقى أرقام id بترتيب الإضافة
+            with self._write_lock:
+                with self._condition:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                written = self._write(batch)
+            if not written:
+                # قاعدة البيانات مشغولة: انتظار قبل إعادة المحاولة
+                with self._condition:
+                    if not self._stopping:
+                        self._condition.wait(self.flush_interval)
+
+    def _write(self, batch):
+        # يُستدعى والمستدعي ماسك _write_lock
+        if not batch:
+            return True
+        try:
+            conn = self.db.get_connection()
+            try:
+                conn.executemany('''
+                    INSERT INTO activity_log (action, table_name, record_id, details, user_name, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', batch)
+                conn.commit()
+            finally:
+                conn.close()
+            self.flushed += len(batch)
+            return True
+        except Exception as e:
+            print(f"Activity log flush error: {e}")
+            self._requeue(batch)
+            return False
+
+    def _requeue(self, batch):
+        """إعادة دفعة فشلت كتابتها لمقدمة الذاكرة، وإسقاط ما يزيد عن السعة"""
+        with self._condition:
+            if self._stopping:
+                self.dropped += len(batch)
+                return
+            room = max(self.max_buffer - len(self._buffer), 0)
+            self.dropped += max(len(batch) - room, 0)
+            self._buffer.extendleft(reversed(batch[:room]))
+
+activity_logger = ActivityLogWriter(db)
+atexit.register(activity_logger.stop)
@@ -0,0 +1,26 @@
+import re
+
+# الجداول التي لها عمود name_search (الاسم الموحد) مفهرس للبحث والترتيب
+NAME_SEARCH_TABLES = ('patients', 'doctors', 'treatments', 'suppliers')
+
+# التشكيل والتطويل
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_SPACES = re.compile(r'\s+')
+_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه'
+})
+
+def normalize_name(text):
+    """توحيد كتابة الاسم للبحث والترتيب: حذف التشكيل وتوحيد الهمزات والتاء المربوطة والمسافات.
+
+    بعد التوحيد يصبح ترتيب الحروف بأرقامها في Unicode هو الترتيب الأبجدي (أ ب ت ... ه و ي)،
+    فالترتيب الثنائي للقيمة الموحدة صحيح بلا collation خاصة، والمسافة قبل كل الحروف
+    فيأتي "محمد علي" قبل "محمدين".
+    """
+    if not text:
+        return ""
+    text = _DIACRITICS.sub('', str(text)).translate(_LETTERS).lower()
+    return _SPACES.sub(' ', text).strip()
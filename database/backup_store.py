@@ -0,0 +1,367 @@
+import hashlib
+import json
+import lzma
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from .models import db
+
+# رمز الضغط في أول بايت من ملف القطعة
+CODECS = {
+    'zlib': (b'z', lambda data: zlib.compress(data, 6)),
+    'lzma': (b'x', lambda data: lzma.compress(data, preset=6)),
+}
+DECOMPRESS = {
+    b'z': zlib.decompress,
+    b'x': lzma.decompress,
+    b'r': lambda data: data,
+}
+
+# قواعد الاحتفاظ: اسم القاعدة -> صيغة الفترة التي تُبقى منها أحدث نسخة
+RETENTION_PERIODS = {
+    'hourly': '%Y-%m-%d %H',
+    'daily': '%Y-%m-%d',
+    'monthly': '%Y-%m',
+}
+
+@dataclass
+class BackupResult:
+    """نتيجة إضافة نسخة إلى المستودع"""
+    backup_id: str
+    size: int
+    chunks: int
+    new_chunks: int
+    new_bytes: int
+    seconds: float
+
+def _page_size(header):
+    """حجم صفحة SQLite من ترويسة الملف (البايتات 16-17، والقيمة 1 تعني 65536)"""
+    if not header.startswith(b"SQLite format 3\x00"):
+        return 4096
+    value = int.from_bytes(header[16:18], 'big')
+    return 65536 if value == 1 else value
+
+def iter_chunks(path, min_pages=4, avg_pages=16, max_pages=64):
+    """تقسيم ملف القاعدة إلى قطع حدودها من المحتوى (content-defined) على حدود الصفحات.
+
+    تنتهي القطعة بعد صفحة يحقق crc32 لها الشرط (بمتوسط قطعة كل avg_pages صفحة)،
+    فإضافة صفحات أو حذفها لا تزيح حدود بقية الملف، وتعديل صفحة لا يغير إلا قطعتها.
+    الحدود على مستوى الصفحة لأن SQLite يعدل الصفحات في مكانها، والقرار لكل صفحة
+    عملية C واحدة بدلاً من hash متدحرج لكل بايت.
+    """
+    mask = avg_pages - 1
+    with open(path, 'rb') as f:
+        page_size = _page_size(f.read(100))
+        f.seek(0)
+        pages = []
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            pages.append(page)
+            if len(pages) >= max_pages or (len(pages) >= min_pages and zlib.crc32(page) & mask == 0):
+                yield b''.join(pages)
+                pages = []
+        if pages:
+            yield b''.join(pages)
+
+class BackupStore:
+    """مستودع نسخ احتياطية بدون تكرار: كل نسخة قائمة قطع (manifest) والقطع مشتركة بين النسخ.
+
+    القطعة تُحفظ مرة واحدة مضغوطة باسم sha256 لمحتواها في chunks/، فالنسخة الجديدة تكتب
+    القطع المتغيرة منذ آخر نسخة فقط. قاعدة الأرشيف ملف ثانٍ في نفس القائمة (المفتاح archive)
+    لأن السجلات القديمة بعد الأرشفة موجودة فيها وحدها. قواعد الاحتفاظ تحذف القوائم القديمة، ثم يحذف جمع
+    القطع (gc) كل قطعة لا تشير إليها قائمة. الاستعادة تقرأ القطع وتفك ضغطها وتتحقق من
+    sha256 لكل قطعة بالتوازي (zlib وlzma وhashlib تحرر GIL) وتكتبها في مواضعها.
+    """
+
+    def __init__(self, database, compression='zlib', workers=None):
+        self.db = database
+        self.compression = compression
+        self.workers = workers or min(8, os.cpu_count() or 2)
+        # الإضافة والجمع في نفس العملية لا يتداخلان
+        self._lock = threading.Lock()
+
+    @property
+    def root(self):
+        return os.path.join(self.db.backup_dir, "store")
+
+    @property
+    def chunks_dir(self):
+        return os.path.join(self.root, "chunks")
+
+    @property
+    def manifests_dir(self):
+        return os.path.join(self.root, "manifests")
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def _write_chunk(self, digest, data):
+        tag, compress = CODECS[self.compression]
+        packed = compress(data)
+        if len(packed) >= len(data):
+            tag, packed = b'r', data
+        path = self._chunk_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # الكتابة في ملف مؤقت ثم إعادة التسمية، فلا تبقى قطعة ناقصة بعد توقف مفاجئ
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(tag + packed)
+        os.replace(temp_path, path)
+        return len(packed) + 1
+
+    # ========================
+    # إضافة نسخة
+    # ========================
+
+    def create_backup(self, kind='manual'):
+        """أخذ نسخة متسقة من القاعدة وقاعدة الأرشيف (sqlite3 backup API) وإضافتها للمستودع"""
+        started = time.perf_counter()
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        backup_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        snapshot_path = os.path.join(self.root, f"{backup_id}.snapshot")
+        archive_snapshot_path = self.db.archive_path_for(snapshot_path)
+        conn = self.db.get_connection()
+        try:
+            base_seq = self.db.snapshot(conn, snapshot_path, archive_snapshot_path)
+            with self._lock:
+                result = self._ingest(snapshot_path, archive_snapshot_path, backup_id, kind, base_seq, started)
+            conn.execute("INSERT INTO backup_log (backup_type, backup_path, status, base_seq) VALUES (?, ?, 'success', ?)",
+                         (f"store:{kind}", os.path.join(self.manifests_dir, f"{backup_id}.json"), base_seq))
+            conn.commit()
+            return result
+        finally:
+            conn.close()
+            for path in (snapshot_path, archive_snapshot_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _ingest(self, path, archive_path, backup_id, kind, base_seq, started):
+        seen = set()
+        in_flight = deque()
+        new_chunks = new_bytes = 0
+        files = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for name, file_path in (('main', path), ('archive', archive_path)):
+                if not os.path.exists(file_path):
+                    continue
+                chunks = []
+                size = 0
+                for data in iter_chunks(file_path):
+                    digest = hashlib.sha256(data).hexdigest()
+                    chunks.append([digest, len(data)])
+                    size += len(data)
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                    chunk_path = self._chunk_path(digest)
+                    if os.path.exists(chunk_path):
+                        # تحديث الوقت يحمي القطعة المعاد استخدامها من جمع يعمل في عملية أخرى
+                        os.utime(chunk_path)
+                        continue
+                    # الضغط بالتوازي مع عدد محدود من القطع في الذاكرة
+                    if len(in_flight) >= self.workers * 4:
+                        new_bytes += in_flight.popleft().result()
+                    in_flight.append(pool.submit(self._write_chunk, digest, data))
+                    new_chunks += 1
+                files[name] = {'size': size, 'chunks': chunks}
+            while in_flight:
+                new_bytes += in_flight.popleft().result()
+
+        manifest = {
+            'id': backup_id,
+            'kind': kind,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'source': os.path.abspath(self.db.db_path),
+            'base_seq': base_seq,
+            'size': files['main']['size'],
+            'compression': self.compression,
+            'chunks': files['main']['chunks'],
+        }
+        if 'archive' in files:
+            manifest['archive'] = files['archive']
+        manifest_path = os.path.join(self.manifests_dir, f"{backup_id}.json")
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+        total_chunks = sum(len(entry['chunks']) for entry in files.values())
+        total_size = sum(entry['size'] for entry in files.values())
+        return BackupResult(backup_id, total_size, total_chunks, new_chunks, new_bytes, time.perf_counter() - started)
+
+    # ========================
+    # القوائم والاستعادة
+    # ========================
+
+    def manifests(self):
+        """قوائم النسخ من الأحدث"""
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        result = []
+        for name in os.listdir(self.manifests_dir):
+            if name.endswith('.json'):
+                with open(os.path.join(self.manifests_dir, name), encoding='utf-8') as f:
+                    result.append(json.load(f))
+        return sorted(result, key=lambda manifest: manifest['id'], reverse=True)
+
+    @staticmethod
+    def manifest_files(manifest):
+        """ملفات النسخة: main دائماً و archive إن أُخذت معها -> (الحجم، القطع)"""
+        files = {'main': (manifest['size'], manifest['chunks'])}
+        if 'archive' in manifest:
+            files['archive'] = (manifest['archive']['size'], manifest['archive']['chunks'])
+        return files
+
+    def get_manifest(self, backup_id):
+        path = os.path.join(self.manifests_dir, f"{backup_id}.json")
+        if not os.path.exists(path):
+            raise ValueError(f"النسخة {backup_id} غير موجودة في المستودع")
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _read_chunk(self, digest, size):
+        with open(self._chunk_path(digest), 'rb') as f:
+            packed = f.read()
+        data = DECOMPRESS[packed[:1]](packed[1:])
+        if len(data) != size or hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"القطعة {digest} تالفة")
+        return data
+
+    def restore(self, backup_id, output_path):
+        """إعادة تجميع نسخة في ملف مع التحقق من كل قطعة، وإرجاع المدة بالثواني.
+
+        قاعدة الأرشيف في النسخة تُكتب بجانب output_path (Database.archive_path_for).
+        """
+        started = time.perf_counter()
+        files = self.manifest_files(self.get_manifest(backup_id))
+        self._restore_file(*files['main'], output_path)
+        if 'archive' in files:
+            self._restore_file(*files['archive'], self.db.archive_path_for(output_path))
+        return time.perf_counter() - started
+
+    def _restore_file(self, total_size, chunks, output_path):
+        offsets = []
+        offset = 0
+        for digest, size in chunks:
+            offsets.append(offset)
+            offset += size
+
+        temp_path = f"{output_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.truncate(total_size)
+        fd = os.open(temp_path, os.O_WRONLY)
+        try:
+            def restore_chunk(index):
+                digest, size = chunks[index]
+                os.pwrite(fd, self._read_chunk(digest, size), offsets[index])
+
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(restore_chunk, range(len(chunks))))
+            os.fsync(fd)
+        except Exception:
+            os.close(fd)
+            os.remove(temp_path)
+            raise
+        os.close(fd)
+        os.replace(temp_path, output_path)
+
+    def verify(self, backup_id=None):
+        """التحقق من كل القطع (أو قطع نسخة واحدة)، وإرجاع قائمة القطع التالفة أو المفقودة"""
+        manifests = [self.get_manifest(backup_id)] if backup_id else self.manifests()
+        chunks = {digest: size for manifest in manifests
+                  for _, file_chunks in self.manifest_files(manifest).values() for digest, size in file_chunks}
+
+        def check(item):
+            try:
+                self._read_chunk(*item)
+                return None
+            except (OSError, ValueError, KeyError, zlib.error, lzma.LZMAError):
+                return item[0]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return [digest for digest in pool.map(check, chunks.items()) if digest]
+
+    # ========================
+    # الاحتفاظ وجمع القطع
+    # ========================
+
+    def apply_retention(self, hourly=24, daily=7, monthly=12):
+        """حذف القوائم التي لا تبقيها قواعد الاحتفاظ، وإرجاع معرفاتها.
+
+        كل قاعدة تبقي أحدث نسخة في كل فترة (ساعة أو يوم أو شهر) لعدد الفترات المحدد،
+        وأحدث نسخة تبقى دائماً.
+        """
+        manifests = self.manifests()
+        keep = {manifests[0]['id']} if manifests else set()
+        for rule, count in (('hourly', hourly), ('daily', daily), ('monthly', monthly)):
+            periods = set()
+            for manifest in manifests:
+                period = datetime.fromisoformat(manifest['created_at']).strftime(RETENTION_PERIODS[rule])
+                if period in periods:
+                    continue
+                if len(periods) >= count:
+                    break
+                periods.add(period)
+                keep.add(manifest['id'])
+
+        removed = [manifest['id'] for manifest in manifests if manifest['id'] not in keep]
+        for backup_id in removed:
+            os.remove(os.path.join(self.manifests_dir, f"{backup_id}.json"))
+        return removed
+
+    def gc(self, grace_seconds=3600):
+        """حذف القطع التي لا تشير إليها أي قائمة، وإرجاع (عددها، حجمها).
+
+        القطع الأحدث من grace_seconds تبقى لأنها قد تخص نسخة لم تُكتب قائمتها بعد.
+        """
+        with self._lock:
+            referenced = {digest for manifest in self.manifests()
+                          for _, file_chunks in self.manifest_files(manifest).values() for digest, _ in file_chunks}
+            if not os.path.isdir(self.chunks_dir):
+                return 0, 0
+            cutoff = time.time() - grace_seconds
+            removed = freed = 0
+            for prefix in os.listdir(self.chunks_dir):
+                directory = os.path.join(self.chunks_dir, prefix)
+                for name in os.listdir(directory):
+                    path = os.path.join(directory, name)
+                    if name in referenced:
+                        continue
+                    stat = os.stat(path)
+                    if stat.st_mtime > cutoff:
+                        continue
+                    os.remove(path)
+                    removed += 1
+                    freed += stat.st_size
+            return removed, freed
+
+    def prune(self, hourly=24, daily=7, monthly=12, grace_seconds=3600):
+        """تطبيق قواعد الاحتفاظ ثم جمع القطع"""
+        removed = self.apply_retention(hourly, daily, monthly)
+        chunks, freed = self.gc(grace_seconds)
+        return {'backups': len(removed), 'chunks': chunks, 'bytes': freed}
+
+    def stats(self):
+        """حجم النسخ الكلي مقابل الحجم المخزن فعلاً"""
+        manifests = self.manifests()
+        stored = chunk_count = 0
+        if os.path.isdir(self.chunks_dir):
+            for prefix in os.listdir(self.chunks_dir):
+                for entry in os.scandir(os.path.join(self.chunks_dir, prefix)):
+                    stored += entry.stat().st_size
+                    chunk_count += 1
+        logical = sum(size for manifest in manifests for size, _ in self.manifest_files(manifest).values())
+        return {
+            'backups': len(manifests),
+            'logical_bytes': logical,
+            'stored_bytes': stored,
+            'chunks': chunk_count,
+            'ratio': logical / stored if stored else 0.0,
+        }
+
+backup_store = BackupStore(db)
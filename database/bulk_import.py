@@ -0,0 +1,496 @@
+import csv
+import os
+import time
+from datetime import date, datetime, time as dt_time
+from dataclasses import dataclass, field
+import pandas as pd
+from utils.helpers import validate_phones, validate_emails
+from .models import db
+from .activity_logger import activity_logger
+from .reference_data import reference_data
+from .arabic_text import normalize_name
+from .money import to_piasters
+
+# أسماء الأعمدة المقبولة في الملفات (عربي أو إنجليزي) -> اسم العمود في الاستيراد
+COLUMN_ALIASES = {
+    'الاسم': 'name', 'اسم المريض': 'name', 'الهاتف': 'phone', 'رقم الهاتف': 'phone',
+    'البريد الإلكتروني': 'email', 'العنوان': 'address', 'تاريخ الميلاد': 'date_of_birth',
+    'النوع': 'gender', 'التاريخ المرضي': 'medical_history', 'جهة الاتصال للطوارئ': 'emergency_contact',
+    'المريض': 'patient', 'الطبيب': 'doctor', 'العلاج': 'treatment', 'التاريخ': 'date', 'الوقت': 'time',
+    'الحالة': 'status', 'ملاحظات': 'notes', 'التكلفة': 'total_cost', 'المبلغ': 'amount',
+    'طريقة الدفع': 'payment_method', 'تاريخ الدفع': 'payment_date', 'رقم الموعد': 'appointment_id',
+    'appointment_date': 'date', 'appointment_time': 'time', 'patient_id': 'patient', 'doctor_id': 'doctor',
+    'treatment_id': 'treatment',
+}
+
+ENTITY_COLUMNS = {
+    'patients': {
+        'required': ['name'],
+        'optional': ['phone', 'email', 'address', 'date_of_birth', 'gender', 'medical_history', 'emergency_contact'],
+    },
+    'appointments': {
+        'required': ['patient', 'doctor', 'date', 'time'],
+        'optional': ['treatment', 'status', 'notes', 'total_cost'],
+    },
+    'payments': {
+        'required': ['patient', 'amount', 'payment_method', 'payment_date'],
+        'optional': ['appointment_id', 'notes'],
+    },
+}
+
+@dataclass
+class ImportResult:
+    """نتيجة استيراد ملف (تتحدث بعد كل دفعة)"""
+    entity: str
+    total_rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    reject_path: str = None
+    reject_reasons: dict = field(default_factory=dict)
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.seconds if self.seconds else 0.0
+
+class BulkImporter:
+    """استيراد كميات كبيرة من المرضى والمواعيد والمدفوعات من CSV أو XLSX.
+
+    الملف يُقرأ على دفعات (pandas chunks للـ CSV وopenpyxl read-only للـ XLSX)، وكل
+    دفعة يُتحقق منها عموداً عموداً، وتُحول أسماء المرضى والأطباء وهواتفهم إلى معرفات من
+    خرائط في الذاكرة، ثم تُكتب بـ executemany في معاملة واحدة مع قيودها المالية.
+    الصفوف المرفوضة تُكتب في ملف CSV مع سبب الرفض.
+    """
+
+    def __init__(self, database, chunk_size=5000):
+        self.db = database
+        self.chunk_size = chunk_size
+
+    def import_file(self, entity, source, file_name=None, reject_path=None, progress=None):
+        """استيراد ملف (مسار أو ملف مفتوح) وإرجاع ImportResult.
+
+        progress(result) تُستدعى بعد كل دفعة.
+        """
+        if entity not in ENTITY_COLUMNS:
+            raise ValueError(f"نوع بيانات غير مدعوم: {entity}")
+        file_name = file_name or (source if isinstance(source, str) else getattr(source, 'name', ''))
+
+        result = ImportResult(entity, reject_path=reject_path)
+        started = time.perf_counter()
+        maps = self._reference_maps() if entity != 'patients' else None
+        validate = getattr(self, f"_validate_{entity}")
+        insert = getattr(self, f"_insert_{entity}")
+        reject_writer = None
+        reject_file = None
+
+        conn = self.db.get_connection()
+        try:
+            for chunk in self.read_chunks(source, file_name):
+                chunk = chunk.reset_index(drop=True)
+                rows, rejects = validate(self._prepare(chunk, entity), maps)
+                # ملف الرفض بأعمدة الملف الأصلية حتى يُصحح ويُعاد استيراده كما هو
+                rejects = chunk.loc[rejects.index].assign(reject_reason=rejects['reject_reason'])
+
+                if len(rows):
+                    cursor = conn.cursor()
+                    cursor.execute("BEGIN IMMEDIATE")
+                    try:
+                        insert(cursor, rows)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+
+                if len(rejects) and reject_path:
+                    if reject_writer is None:
+                        # utf-8-sig حتى يفتح Excel الملف بالعربي صحيحاً
+                        reject_file = open(reject_path, 'w', newline='', encoding='utf-8-sig')
+                        reject_writer = csv.writer(reject_file)
+                        reject_writer.writerow(list(rejects.columns))
+                    reject_writer.writerows(rejects.itertuples(index=False, name=None))
+
+                if len(rejects):
+                    reasons = rejects['reject_reason'].str.split('؛ ').explode().value_counts()
+                    for reason, count in reasons.items():
+                        result.reject_reasons[reason] = result.reject_reasons.get(reason, 0) + int(count)
+                result.total_rows += len(chunk)
+                result.imported += len(rows)
+                result.rejected += len(rejects)
+                result.seconds = time.perf_counter() - started
+                if progress:
+                    progress(result)
+        finally:
+            conn.close()
+            if reject_file:
+                reject_file.close()
+
+        if result.rejected == 0 or not reject_path:
+            result.reject_path = None
+        if result.imported:
+            if entity == 'patients':
+                reference_data.invalidate('patients')
+            activity_logger.log("استيراد بيانات", entity, None,
+                                f"{result.imported} صف من {os.path.basename(str(file_name))}، رفض {result.rejected}")
+        return result
+
+    # ========== قراءة الملفات ==========
+    def read_chunks(self, source, file_name):
+        """قراءة الملف دفعة دفعة كـ DataFrame كل قيمه نصوص"""
+        if str(file_name).lower().endswith(('.xlsx', '.xlsm')):
+            yield from self._read_xlsx(source)
+        else:
+            yield from pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=self.chunk_size,
+                                   encoding='utf-8-sig', skipinitialspace=True)
+
+    def _read_xlsx(self, source):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [str(value).strip() if value is not None else f"column_{i}" for i, value in enumerate(header)]
+            batch = []
+            for row in rows:
+                if all(value is None or value == '' for value in row):
+                    continue
+                row = list(row[:len(header)]) + [None] * (len(header) - len(row))
+                batch.append([self._cell_text(value) for value in row])
+                if len(batch) >= self.chunk_size:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _cell_text(value):
+        """قيمة خلية Excel كنص بنفس صيغة ملفات CSV"""
+        if value is None:
+            return ''
+        if isinstance(value, datetime):
+            if value.hour or value.minute:
+                return value.strftime('%Y-%m-%d %H:%M')
+            return value.strftime('%Y-%m-%d')
+        if isinstance(value, date):
+            return value.strftime('%Y-%m-%d')
+        if isinstance(value, dt_time):
+            return value.strftime('%H:%M')
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value).strip()
+
+    def _prepare(self, chunk, entity):
+        """توحيد أسماء الأعمدة وقص المسافات والتأكد من وجود الأعمدة المطلوبة"""
+        chunk = chunk.rename(columns=lambda name: COLUMN_ALIASES.get(str(name).strip(), str(name).strip()))
+        columns = ENTITY_COLUMNS[entity]
+        missing = [name for name in columns['required'] if name not in chunk.columns]
+        if missing:
+            raise ValueError(f"أعمدة مطلوبة غير موجودة في الملف: {', '.join(missing)}")
+        for name in columns['required'] + columns['optional']:
+            if name not in chunk.columns:
+                chunk[name] = ''
+            chunk[name] = chunk[name].fillna('').astype(str).str.strip()
+        return chunk
+
+    # ========== التحقق ==========
+    @staticmethod
+    def _flag(reasons, mask, message):
+        """إضافة سبب رفض للصفوف المحددة"""
+        return reasons.mask(mask, (reasons + '؛ ' + message).str.lstrip('؛ '))
+
+    @staticmethod
+    def _parse_dates(values):
+        """YYYY-MM-DD أو DD/MM/YYYY، و NaT لغير ذلك"""
+        parsed = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+        return parsed.fillna(pd.to_datetime(values, format='%d/%m/%Y', errors='coerce'))
+
+    @staticmethod
+    def _parse_times(values):
+        parsed = pd.to_datetime(values, format='%H:%M', errors='coerce')
+        return parsed.fillna(pd.to_datetime(values, format='%H:%M:%S', errors='coerce'))
+
+    def _split(self, chunk, reasons, columns):
+        """الصفوف السليمة بالأعمدة المطلوبة، والمرفوضة بأعمدتها الأصلية وسبب الرفض"""
+        bad = reasons != ''
+        rejects = chunk.loc[bad].copy()
+        rejects['reject_reason'] = reasons[bad]
+        return columns.loc[~bad], rejects
+
+    def _validate_patients(self, chunk, maps=None):
+        reasons = pd.Series('', index=chunk.index)
+        reasons = self._flag(reasons, chunk['name'] == '', "الاسم مطلوب")
+        reasons = self._flag(reasons, (chunk['phone'] != '') & ~validate_phones(chunk['phone']), "رقم هاتف غير صحيح")
+        reasons = self._flag(reasons, (chunk['email'] != '') & ~validate_emails(chunk['email']), "بريد إلكتروني غير صحيح")
+        birth = self._parse_dates(chunk['date_of_birth'])
+        reasons = self._flag(reasons, (chunk['date_of_birth'] != '') & birth.isna(), "تاريخ ميلاد غير صحيح")
+
+        rows = pd.DataFrame({
+            'name': chunk['name'],
+            'phone': chunk['phone'],
+            'email': chunk['email'],
+            'address': chunk['address'],
+            'date_of_birth': birth.dt.strftime('%Y-%m-%d').where(birth.notna(), None),
+            'gender': chunk['gender'],
+            'medical_history': chunk['medical_history'],
+            'emergency_contact': chunk['emergency_contact'],
+            'name_search': chunk['name'].map(normalize_name),
+        })
+        return self._split(chunk, reasons, rows)
+
+    def _validate_appointments(self, chunk, maps):
+        reasons = pd.Series('', index=chunk.index)
+        patient_ids = self._resolve_patients(chunk['patient'], maps)
+        doctor_ids = self._resolve_by_name(chunk['doctor'], maps['doctors'])
+        treatment_ids = self._resolve_by_name(chunk['treatment'], maps['treatments'])
+        dates = self._parse_dates(chunk['date'])
+        times = self._parse_times(chunk['time'])
+        costs = pd.to_numeric(chunk['total_cost'].replace('', '0'), errors='coerce')
+
+        reasons = self._flag(reasons, patient_ids.isna(), "المريض غير موجود أو غير محدد")
+        reasons = self._flag(reasons, doctor_ids.isna(), "الطبيب غير موجود")
+        reasons = self._flag(reasons, (chunk['treatment'] != '') & treatment_ids.isna(), "العلاج غير موجود")
+        reasons = self._flag(reasons, dates.isna(), "تاريخ غير صحيح")
+        reasons = self._flag(reasons, times.isna(), "وقت غير صحيح")
+        reasons = self._flag(reasons, costs.isna() | (costs < 0), "تكلفة غير صحيحة")
+        reasons = self._flag(reasons, self._in_closed_period(dates, maps), "الفترة المحاسبية مقفلة")
+
+        rows = pd.DataFrame({
+            'patient_id': patient_ids,
+            'doctor_id': doctor_ids,
+            'treatment_id': treatment_ids,
+            'appointment_date': dates.dt.strftime('%Y-%m-%d'),
+            'appointment_time': times.dt.strftime('%H:%M'),
+            'status': chunk['status'].where(chunk['status'] != '', 'مجدول'),
+            'notes': chunk['notes'],
+            'total_cost': costs.map(to_piasters),
+        })
+        return self._split(chunk, reasons, rows)
+
+    def _validate_payments(self, chunk, maps):
+        reasons = pd.Series('', index=chunk.index)
+        patient_ids = self._resolve_patients(chunk['patient'], maps)
+        amounts = pd.to_numeric(chunk['amount'], errors='coerce')
+        dates = self._parse_dates(chunk['payment_date'])
+        appointment_ids = pd.to_numeric(chunk['appointment_id'].replace('', None), errors='coerce')
+
+        reasons = self._flag(reasons, patient_ids.isna(), "المريض غير موجود أو غير محدد")
+        reasons = self._flag(reasons, amounts.isna() | (amounts <= 0), "مبلغ غير صحيح")
+        reasons = self._flag(reasons, chunk['payment_method'] == '', "طريقة الدفع مطلوبة")
+        reasons = self._flag(reasons, dates.isna(), "تاريخ دفع غير صحيح")
+        reasons = self._flag(reasons, self._in_closed_period(dates, maps), "الفترة المحاسبية مقفلة")
+        known = appointment_ids.isin(self._existing_ids('appointments', appointment_ids.dropna()))
+        reasons = self._flag(reasons, (chunk['appointment_id'] != '') & ~known, "رقم موعد غير موجود")
+
+        rows = pd.DataFrame({
+            'appointment_id': appointment_ids,
+            'patient_id': patient_ids,
+            'amount': amounts.map(to_piasters),
+            'payment_method': chunk['payment_method'],
+            'payment_date': dates.dt.strftime('%Y-%m-%d'),
+            'notes': chunk['notes'],
+        })
+        return self._split(chunk, reasons, rows)
+
+    @staticmethod
+    def _in_closed_period(dates, maps):
+        """الصفوف المؤرخة في شهر مقفل (مشغلات الإقفال سترفضها وتُسقط الدفعة كلها)"""
+        return dates.dt.strftime('%Y-%m').isin(maps['closed_periods'])
+
+    # ========== ربط المراجع ==========
+    def _reference_maps(self):
+        """خرائط المعرفات والهواتف والأسماء الموحدة للمرضى والأطباء والعلاجات، والشهور المقفلة"""
+        conn = self.db.get_connection()
+        try:
+            patients = pd.read_sql_query("SELECT id, phone, name_search FROM patients", conn)
+            doctors = pd.read_sql_query("SELECT id, name FROM doctors", conn)
+            treatments = pd.read_sql_query("SELECT id, name FROM treatments", conn)
+            closed_periods = {row[0] for row in conn.execute("SELECT period FROM accounting_periods")}
+        finally:
+            conn.close()
+
+        def unique_map(keys, ids):
+            # الأسماء المكررة لا تصلح للربط، فتُستبعد ويُرفض الصف بدلاً من ربطه بمريض خطأ
+            frame = pd.DataFrame({'key': keys, 'id': ids})
+            frame = frame[frame['key'].fillna('') != '']
+            frame = frame.drop_duplicates('key', keep=False)
+            return pd.Series(frame['id'].values, index=frame['key'].values)
+
+        return {
+            'patient_ids': pd.Series(patients['id'].values, index=patients['id'].astype(str).values),
+            'patient_phones': unique_map(patients['phone'].fillna('').str.replace(r'\D', '', regex=True), patients['id']),
+            'patient_names': unique_map(patients['name_search'], patients['id']),
+            'doctors': self._name_map(doctors),
+            'treatments': self._name_map(treatments),
+            'closed_periods': closed_periods,
+        }
+
+    def _existing_ids(self, table, ids):
+        """المعرفات الموجودة فعلاً من قائمة (استعلام واحد لكل دفعة)"""
+        ids = [int(value) for value in pd.unique(ids)]
+        if not ids:
+            return []
+        conn = self.db.get_connection()
+        try:
+            found = []
+            # حد عدد المتغيرات في SQLite
+            for start in range(0, len(ids), 900):
+                part = ids[start:start + 900]
+                placeholders = ', '.join('?' * len(part))
+                found += [row[0] for row in conn.execute(f"SELECT id FROM {table} WHERE id IN ({placeholders})", part)]
+            return found
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _name_map(frame):
+        keys = pd.concat([frame['id'].astype(str), frame['name'].map(normalize_name)])
+        ids = pd.concat([frame['id'], frame['id']])
+        mapping = pd.DataFrame({'key': keys.values, 'id': ids.values}).drop_duplicates('key', keep=False)
+        return pd.Series(mapping['id'].values, index=mapping['key'].values)
+
+    def _resolve_patients(self, values, maps):
+        """المريض بالمعرف ثم الهاتف ثم الاسم الموحد"""
+        ids = values.map(maps['patient_ids'])
+        phones = values.str.replace(r'\D', '', regex=True)
+        ids = ids.fillna(phones.where(phones.str.len() >= 7).map(maps['patient_phones']))
+        ids = ids.fillna(values.map(normalize_name).map(maps['patient_names']))
+        return ids.astype('Int64')
+
+    @staticmethod
+    def _resolve_by_name(values, mapping):
+        """المعرف أو الاسم الموحد"""
+        ids = values.map(mapping)
+        ids = ids.fillna(values.map(normalize_name).map(mapping))
+        return ids.astype('Int64')
+
+    # ========== الكتابة ==========
+    @staticmethod
+    def _records(rows):
+        """صفوف executemany مع تحويل القيم الفارغة إلى NULL"""
+        frame = rows.astype(object).where(rows.notna(), None)
+        return list(frame.itertuples(index=False, name=None))
+
+    def _insert_patients(self, cursor, rows):
+        cursor.executemany('''
+            INSERT INTO patients (name, phone, email, address, date_of_birth, gender,
+                                  medical_history, emergency_contact, name_search)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', self._records(rows))
+
+    def _insert_appointments(self, cursor, rows):
+        first_id = self._next_id(cursor, 'appointments')
+        cursor.executemany('''
+            INSERT INTO appointments (patient_id, doctor_id, treatment_id, appointment_date,
+                                      appointment_time, status, notes, total_cost)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', self._records(rows))
+
+        # تكلفة كل موعد مستحقات على حساب المريض كما في create_appointment (الحسابات بالجنيه)
+        self._post_ledger(cursor, '''
+            SELECT 'patient', patient_id, 'debit', total_cost / 100.0, 'تكلفة موعد', 'appointment', id,
+                   appointment_date, NULL, ''
+            FROM appointments WHERE id >= ? AND total_cost > 0 ORDER BY id
+        ''', (first_id,))
+
+    def _insert_payments(self, cursor, rows):
+        first_id = self._next_id(cursor, 'payments')
+        cursor.executemany('''
+            INSERT INTO payments (appointment_id, patient_id, amount, payment_method, payment_date, notes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', self._records(rows))
+
+        # الدفعة على حساب المريض، وحصة الطبيب على حسابه كما في create_payment
+        self._post_ledger(cursor, '''
+            SELECT * FROM (
+                SELECT 'patient', pay.patient_id, 'payment', pay.amount / 100.0, 'دفعة من المريض', 'payment', pay.id,
+                       pay.payment_date, pay.payment_method, pay.notes
+                FROM payments pay WHERE pay.id >= ?
+                UNION ALL
+                SELECT 'doctor', d.id, 'credit', pay.amount * d.commission_rate / 10000.0, 'حصة الطبيب من دفعة',
+                       'payment', pay.id, pay.payment_date, NULL, ''
+                FROM payments pay
+                JOIN appointments a ON a.id = pay.appointment_id
+                JOIN doctors d ON d.id = a.doctor_id
+                WHERE pay.id >= ? AND d.commission_rate > 0
+            ) ORDER BY 7
+        ''', (first_id, first_id))
+
+    @staticmethod
+    def _next_id(cursor, table):
+        # داخل BEGIN IMMEDIATE لا يكتب اتصال آخر، فالصفوف الجديدة هي ما بعد أكبر معرف حالي
+        return cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+
+    def _post_ledger(self, cursor, select_sql, params):
+        """تسجيل حركات مالية لدفعة كاملة بنفس منطق _post_transaction.
+
+        select_sql تعيد (نوع الحساب، صاحب الحساب، نوع الحركة، المبلغ، الوصف، نوع المرجع،
+        رقم المرجع، التاريخ، طريقة الدفع، ملاحظات) بترتيب التسجيل.
+        """
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS import_postings (
+                seq INTEGER PRIMARY KEY,
+                account_type TEXT, holder_id INTEGER, transaction_type TEXT, amount REAL,
+                description TEXT, reference_type TEXT, reference_id INTEGER, transaction_date DATE,
+                payment_method TEXT, notes TEXT, account_id INTEGER
+            )
+        ''')
+        cursor.execute("DELETE FROM temp.import_postings")
+        cursor.execute(f'''
+            INSERT INTO temp.import_postings (account_type, holder_id, transaction_type, amount, description,
+                                              reference_type, reference_id, transaction_date, payment_method, notes)
+            {select_sql}
+        ''', params)
+
+        # الحسابات غير الموجودة تُنشأ باسم صاحبها
+        for account_type, table in (('patient', 'patients'), ('doctor', 'doctors')):
+            cursor.execute(f'''
+                INSERT INTO accounts (account_type, account_holder_id, account_holder_name)
+                SELECT DISTINCT s.account_type, s.holder_id, COALESCE(h.name, s.holder_id)
+                FROM temp.import_postings s LEFT JOIN {table} h ON h.id = s.holder_id
+                WHERE s.account_type = ? AND NOT EXISTS (
+                    SELECT 1 FROM accounts acc WHERE acc.account_type = s.account_type AND acc.account_holder_id = s.holder_id
+                )
+            ''', (account_type,))
+        cursor.execute('''
+            UPDATE temp.import_postings SET account_id = (
+                SELECT id FROM accounts acc
+                WHERE acc.account_type = import_postings.account_type AND acc.account_holder_id = import_postings.holder_id
+            )
+        ''')
+
+        # الرصيد الجاري = رصيد الحساب الحالي + مجموع حركات الدفعة حتى الحركة
+        paid_types = "('payment', 'withdrawal')"
+        cursor.execute(f'''
+            INSERT INTO financial_transactions
+            (account_id, transaction_type, amount, running_balance, description, reference_type,
+             reference_id, transaction_date, payment_method, notes)
+            SELECT s.account_id, s.transaction_type, s.amount,
+                   acc.balance + SUM(CASE WHEN s.transaction_type IN {paid_types} THEN -s.amount ELSE s.amount END)
+                                 OVER (PARTITION BY s.account_id ORDER BY s.seq),
+                   s.description, s.reference_type, s.reference_id, s.transaction_date, s.payment_method, s.notes
+            FROM temp.import_postings s JOIN accounts acc ON acc.id = s.account_id
+            ORDER BY s.seq
+        ''')
+        cursor.execute(f'''
+            UPDATE accounts SET
+                total_dues = total_dues + totals.dues,
+                total_paid = total_paid + totals.paid,
+                balance = balance + totals.dues - totals.paid,
+                -- الصفوف التاريخية لا ترجع تاريخ آخر حركة للحساب للخلف
+                last_transaction_date = MAX(COALESCE(last_transaction_date, ''), totals.last_date),
+                updated_at = CURRENT_TIMESTAMP
+            FROM (
+                SELECT account_id, MAX(transaction_date) AS last_date,
+                       SUM(CASE WHEN transaction_type NOT IN {paid_types} THEN amount ELSE 0 END) AS dues,
+                       SUM(CASE WHEN transaction_type IN {paid_types} THEN amount ELSE 0 END) AS paid
+                FROM temp.import_postings GROUP BY account_id
+            ) AS totals
+            WHERE accounts.id = totals.account_id
+        ''')
+        cursor.execute("DELETE FROM temp.import_postings")
+
+bulk_importer = BulkImporter(db)
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+import pandas as pd
+from .models import db
+
+@dataclass(frozen=True)
+class Change:
+    """تغيير واحد في جدول متتبع: op هي insert أو update أو delete أو archive"""
+    seq: int
+    table_name: str
+    row_id: int
+    op: str
+    changed_at: str
+
+class ChangeFeed:
+    """قراءة سجل التغييرات (changes) للمستهلكين مثل الكاش والتجميعات والفهارس والتصدير.
+
+    المشغلات في models.py تضيف صفاً لكل تغيير برقم seq متزايد داخل معاملة التغيير نفسها،
+    وSQLite يسمح بكاتب واحد، فترتيب seq هو ترتيب الإيداع ولا تظهر أرقام أقدم بعد أحدث.
+    كل مستهلك له اسم وموضع (آخر seq أكمل معالجته) في change_consumers: يقرأ دفعة بعد
+    موضعه، يعالجها، ثم يثبت الموضع. الموضع يثبت بعد المعالجة، فالتسليم مرة واحدة على الأقل:
+    بعد توقف مفاجئ قد تُقرأ آخر دفعة مرة أخرى.
+    """
+
+    def __init__(self, database):
+        self.db = database
+
+    def latest_seq(self):
+        """آخر رقم تغيير مسجل (0 إذا كان السجل فارغاً)"""
+        conn = self.db.get_connection()
+        try:
+            # sqlite_sequence يحفظ آخر رقم حتى بعد ضغط السجل وحذف كل صفوفه
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+            return row[0] if row else 0
+        finally:
+            conn.close()
+
+    def register(self, consumer, from_seq=None):
+        """تسجيل مستهلك يبدأ بعد from_seq (افتراضياً من الآن)، وإرجاع موضعه.
+
+        المستهلك المسجل مسبقاً يحتفظ بموضعه. المستهلك الجديد يبني حالته من الجداول
+        مباشرة ثم يتابع التغييرات من موضع التسجيل.
+        """
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            # القراءة أولاً حتى لا تبدأ كل دفعة معاملة كتابة
+            row = cursor.execute("SELECT last_seq FROM change_consumers WHERE name = ?", (consumer,)).fetchone()
+            if row is None:
+                cursor.execute('''
+                    INSERT INTO change_consumers (name, last_seq)
+                    SELECT ?, COALESCE(?, (SELECT seq FROM sqlite_sequence WHERE name = 'changes'), 0) WHERE 1
+                    ON CONFLICT(name) DO NOTHING
+                ''', (consumer, from_seq))
+                conn.commit()
+                row = cursor.execute("SELECT last_seq FROM change_consumers WHERE name = ?", (consumer,)).fetchone()
+            return row[0]
+        finally:
+            conn.close()
+
+    def unregister(self, consumer):
+        """حذف مستهلك حتى لا يمنع موضعه القديم ضغط السجل"""
+        conn = self.db.get_connection()
+        try:
+            conn.execute("DELETE FROM change_consumers WHERE name = ?", (consumer,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def read(self, consumer, batch_size=1000, tables=None):
+        """الدفعة التالية من التغييرات بعد آخر موضع مثبت للمستهلك (يُسجل تلقائياً من الآن)"""
+        position = self.register(consumer)
+        return self.changes_since(position, batch_size, tables)
+
+    def changes_since(self, seq, batch_size=1000, tables=None):
+        """التغييرات بعد رقم معين بالترتيب، لمستهلك يحفظ موضعه بنفسه (في الذاكرة مثلاً)"""
+        query = "SELECT seq, table_name, row_id, op, changed_at FROM changes WHERE seq > ?"
+        params = [seq]
+        if tables:
+            query += f" AND table_name IN ({', '.join('?' * len(tables))})"
+            params.extend(tables)
+        query += " ORDER BY seq LIMIT ?"
+        params.append(batch_size)
+
+        conn = self.db.get_connection()
+        try:
+            return [Change(*row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    def commit(self, consumer, seq):
+        """تثبيت موضع المستهلك بعد معالجة التغييرات حتى seq (لا يرجع الموضع للخلف)"""
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE change_consumers SET last_seq = MAX(last_seq, ?), updated_at = CURRENT_TIMESTAMP
+                WHERE name = ?
+            ''', (seq, consumer))
+            if cursor.rowcount == 0:
+                raise ValueError(f"المستهلك {consumer} غير مسجل")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def consume(self, consumer, handler, batch_size=1000, tables=None, max_batches=None):
+        """استدعاء handler(changes) لكل دفعة وتثبيت الموضع بعدها حتى نهاية السجل، وإرجاع عدد التغييرات.
+
+        التصفية بالجداول لا تمنع تقدم الموضع: الموضع يثبت على آخر seq تمت قراءته.
+        """
+        processed = batches = 0
+        while max_batches is None or batches < max_batches:
+            position = self.register(consumer)
+            changes = self.changes_since(position, batch_size)
+            if not changes:
+                break
+            relevant = [change for change in changes if not tables or change.table_name in tables]
+            if relevant:
+                handler(relevant)
+            self.commit(consumer, changes[-1].seq)
+            processed += len(relevant)
+            batches += 1
+        return processed
+
+    def compact(self):
+        """حذف التغييرات التي استهلكها كل المستهلكين، وإرجاع عدد الصفوف المحذوفة.
+
+        بدون مستهلكين مسجلين لا يحتاج أحد السجل فيُحذف كله.
+        """
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM changes
+                WHERE seq <= COALESCE((SELECT MIN(last_seq) FROM change_consumers), (SELECT MAX(seq) FROM changes))
+            ''')
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+        finally:
+            conn.close()
+
+    def stats(self):
+        """المستهلكون ومواضعهم وعدد التغييرات المتبقية لكل منهم"""
+        conn = self.db.get_connection()
+        try:
+            return pd.read_sql_query('''
+                SELECT c.name, c.last_seq, c.updated_at,
+                       (SELECT COUNT(*) FROM changes WHERE seq > c.last_seq) AS pending
+                FROM change_consumers c
+                ORDER BY c.name
+            ''', conn)
+        finally:
+            conn.close()
+
+change_feed = ChangeFeed(db)
@@ -1,7 +1,15 @@
 import sqlite3
+import calendar
 import pandas as pd
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from .models import db
+from .sequences import voucher_numbers
+from .activity_logger import activity_logger
+from .reference_data import reference_data
+from .arabic_text import normalize_name
+from .money import MONEY_COLUMNS, to_piasters, from_piasters, money_frame, money_row
+from .frames import lean_frame
+from .date_keys import EPOCH, WEEKDAY_NAMES, epoch_day, month_key, day_ranges
 
 class CRUDOperations:
     def __init__(self):
@@ -14,28 +22,33 @@ class CRUDOperations:
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO doctors (name, specialization, phone, email, address, hire_date, salary, commission_rate)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (name, specialization, phone, email, address, hire_date, salary, commission_rate))
+            INSERT INTO doctors (name, specialization, phone, email, address, hire_date, salary, commission_rate,
+                                 name_search)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (name, specialization, phone, email, address, hire_date, to_piasters(salary), commission_rate,
+              normalize_name(name)))
         
         doctor_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        self.log_activity("إضافة طبيب", "doctors", doctor_id, name)
+        reference_data.refresh("doctors", doctor_id)
         return doctor_id
     
     def get_all_doctors(self):
         """الحصول على جميع الأطباء"""
         conn = self.db.get_connection()
-        df = pd.read_sql_query("SELECT * FROM doctors ORDER BY name", conn)
+        df = pd.read_sql_query(
+            "SELECT id, name, specialization, phone, email, salary, commission_rate FROM doctors ORDER BY name_search", conn)
         conn.close()
-        return df
+        return lean_frame(money_frame(df, MONEY_COLUMNS['doctors']), 'doctors', categories=('specialization',))
     
     def get_doctor_by_id(self, doctor_id):
         """الحصول على طبيب بواسطة ID"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM doctors WHERE id = ?", (doctor_id,))
-        result = cursor.fetchone()
+        result = money_row(cursor, cursor.fetchone(), MONEY_COLUMNS['doctors'])
         conn.close()
         return result
     
@@ -46,12 +59,16 @@ class CRUDOperations:
         
         cursor.execute('''
             UPDATE doctors 
-            SET name=?, specialization=?, phone=?, email=?, address=?, salary=?, commission_rate=?
+            SET name=?, specialization=?, phone=?, email=?, address=?, salary=?, commission_rate=?,
+                name_search=?
             WHERE id=?
-        ''', (name, specialization, phone, email, address, salary, commission_rate, doctor_id))
+        ''', (name, specialization, phone, email, address, to_piasters(salary), commission_rate,
+              normalize_name(name), doctor_id))
         
         conn.commit()
         conn.close()
+        self.log_activity("تحديث طبيب", "doctors", doctor_id, name)
+        reference_data.refresh("doctors", doctor_id)
     
     def delete_doctor(self, doctor_id):
         """حذف طبيب"""
@@ -60,6 +77,8 @@ class CRUDOperations:
         cursor.execute("DELETE FROM doctors WHERE id = ?", (doctor_id,))
         conn.commit()
         conn.close()
+        self.log_activity("حذف طبيب", "doctors", doctor_id)
+        reference_data.remove("doctors", doctor_id)
     
     # ========== عمليات المرضى ==========
     def create_patient(self, name, phone, email, address, date_of_birth, gender, medical_history="", emergency_contact=""):
@@ -68,21 +87,24 @@ class CRUDOperations:
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO patients (name, phone, email, address, date_of_birth, gender, medical_history, emergency_contact)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (name, phone, email, address, date_of_birth, gender, medical_history, emergency_contact))
+            INSERT INTO patients (name, phone, email, address, date_of_birth, gender, medical_history, emergency_contact, name_search)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (name, phone, email, address, date_of_birth, gender, medical_history, emergency_contact, normalize_name(name)))
         
         patient_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        self.log_activity("إضافة مريض", "patients", patient_id, name)
+        reference_data.refresh("patients", patient_id)
         return patient_id
     
     def get_all_patients(self):
         """الحصول على جميع المرضى"""
         conn = self.db.get_connection()
-        df = pd.read_sql_query("SELECT * FROM patients ORDER BY name", conn)
+        df = pd.read_sql_query(
+            "SELECT id, name, phone, email, gender, date_of_birth FROM patients ORDER BY name_search", conn)
         conn.close()
-        return df
+        return lean_frame(df, 'patients', categories=('gender',))
     
     def get_patient_by_id(self, patient_id):
         """الحصول على مريض بواسطة ID"""
@@ -93,6 +115,68 @@ class CRUDOperations:
         conn.close()
         return result
     
+    def search_patients(self, search_term):
+        """البحث عن مرضى بجزء من الاسم أو الهاتف أو البريد"""
+        conn = self.db.get_connection()
+        pattern = f"%{search_term}%"
+        df = pd.read_sql_query('''
+            SELECT id, name, phone, email, gender, date_of_birth FROM patients
+            WHERE name_search LIKE ? OR phone LIKE ? OR email LIKE ?
+            ORDER BY name_search
+        ''', conn, params=(f"%{normalize_name(search_term)}%", pattern, pattern))
+        conn.close()
+        return lean_frame(df, 'search_patients', categories=('gender',))
+    
+    def find_patients(self, query, limit=20):
+        """أول المرضى المطابقين لما يكتبه المستخدم (للاختيار السريع).
+
+        بالترتيب حتى يكتمل العدد: الأسماء التي تبدأ بالنص (مرتبة بالاسم)، ثم الهواتف التي تبدأ
+        به، ثم الأسماء التي تبدأ إحدى كلماتها بكل كلمة مكتوبة (فهرس الكلمات patients_name_fts).
+        كل خطوة تقرأ نطاق فهرس حتى LIMIT فقط، فلا يزيد الزمن مع عدد المرضى.
+        """
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        phone = query.strip()
+        
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        # نطاق البداية يستخدم الفهرس بعكس LIKE
+        cursor.execute('''
+            SELECT id, name, phone, name_search FROM patients
+            WHERE name_search >= ? AND name_search < ?
+            ORDER BY name_search
+            LIMIT ?
+        ''', (prefix, prefix + '\uffff', limit))
+        matches = cursor.fetchall()
+        
+        if len(matches) < limit:
+            found = [row[0] for row in matches] or [0]
+            cursor.execute(f'''
+                SELECT id, name, phone, name_search FROM patients
+                WHERE phone >= ? AND phone < ? AND id NOT IN ({', '.join('?' * len(found))})
+                ORDER BY phone
+                LIMIT ?
+            ''', [phone, phone + '\uffff'] + found + [limit - len(matches)])
+            matches += cursor.fetchall()
+        
+        if len(matches) < limit:
+            found = [row[0] for row in matches] or [0]
+            # كل كلمة بين علامتي تنصيص مع * (بحث بالبداية)، فلا تُفسر رموز يكتبها المستخدم كصيغة بحث.
+            # النتائج بترتيب الفهرس (id) حتى يقف LIMIT مبكراً، ثم تُرتب الدفعة بالاسم
+            words = ' '.join('"' + word.replace('"', '""') + '"*' for word in prefix.split())
+            cursor.execute(f'''
+                SELECT p.id, p.name, p.phone, p.name_search
+                FROM patients_name_fts
+                JOIN patients p ON p.id = patients_name_fts.rowid
+                WHERE patients_name_fts MATCH ? AND p.id NOT IN ({', '.join('?' * len(found))})
+                LIMIT ?
+            ''', [words] + found + [limit - len(matches)])
+            matches += sorted(cursor.fetchall(), key=lambda row: row[3] or "")
+        
+        conn.close()
+        return matches
+    
     def update_patient(self, patient_id, name, phone, email, address, date_of_birth, gender, medical_history, emergency_contact):
         """تحديث بيانات مريض"""
         conn = self.db.get_connection()
@@ -100,12 +184,16 @@ class CRUDOperations:
         
         cursor.execute('''
             UPDATE patients 
-            SET name=?, phone=?, email=?, address=?, date_of_birth=?, gender=?, medical_history=?, emergency_contact=?
+            SET name=?, phone=?, email=?, address=?, date_of_birth=?, gender=?, medical_history=?, emergency_contact=?,
+                name_search=?
             WHERE id=?
-        ''', (name, phone, email, address, date_of_birth, gender, medical_history, emergency_contact, patient_id))
+        ''', (name, phone, email, address, date_of_birth, gender, medical_history, emergency_contact,
+              normalize_name(name), patient_id))
         
         conn.commit()
         conn.close()
+        self.log_activity("تحديث مريض", "patients", patient_id, name)
+        reference_data.refresh("patients", patient_id)
     
     def delete_patient(self, patient_id):
         """حذف مريض"""
@@ -114,6 +202,8 @@ class CRUDOperations:
         cursor.execute("DELETE FROM patients WHERE id = ?", (patient_id,))
         conn.commit()
         conn.close()
+        self.log_activity("حذف مريض", "patients", patient_id)
+        reference_data.remove("patients", patient_id)
     
     # ========== عمليات العلاجات ==========
     def create_treatment(self, name, description, base_price, duration_minutes, category):
@@ -122,28 +212,33 @@ class CRUDOperations:
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO treatments (name, description, base_price, duration_minutes, category)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (name, description, base_price, duration_minutes, category))
+            INSERT INTO treatments (name, description, base_price, duration_minutes, category, name_search)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, description, to_piasters(base_price), duration_minutes, category, normalize_name(name)))
         
         treatment_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        self.log_activity("إضافة علاج", "treatments", treatment_id, name)
+        reference_data.refresh("treatments", treatment_id)
         return treatment_id
     
     def get_all_treatments(self):
         """الحصول على جميع العلاجات"""
         conn = self.db.get_connection()
-        df = pd.read_sql_query("SELECT * FROM treatments WHERE is_active = 1 ORDER BY name", conn)
+        df = pd.read_sql_query('''
+            SELECT id, name, category, base_price, duration_minutes FROM treatments
+            WHERE is_active = 1 ORDER BY name_search
+        ''', conn)
         conn.close()
-        return df
+        return lean_frame(money_frame(df, MONEY_COLUMNS['treatments']), 'treatments', categories=('category',))
     
     def get_treatment_by_id(self, treatment_id):
         """الحصول على علاج بواسطة ID"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM treatments WHERE id = ?", (treatment_id,))
-        result = cursor.fetchone()
+        result = money_row(cursor, cursor.fetchone(), MONEY_COLUMNS['treatments'])
         conn.close()
         return result
     
@@ -154,12 +249,15 @@ class CRUDOperations:
         
         cursor.execute('''
             UPDATE treatments 
-            SET name=?, description=?, base_price=?, duration_minutes=?, category=?
+            SET name=?, description=?, base_price=?, duration_minutes=?, category=?, name_search=?
             WHERE id=?
-        ''', (name, description, base_price, duration_minutes, category, treatment_id))
+        ''', (name, description, to_piasters(base_price), duration_minutes, category, normalize_name(name),
+              treatment_id))
         
         conn.commit()
         conn.close()
+        self.log_activity("تحديث علاج", "treatments", treatment_id, name)
+        reference_data.refresh("treatments", treatment_id)
     
     def delete_treatment(self, treatment_id):
         """حذف علاج (إلغاء تفعيل)"""
@@ -168,21 +266,31 @@ class CRUDOperations:
         cursor.execute("UPDATE treatments SET is_active = 0 WHERE id = ?", (treatment_id,))
         conn.commit()
         conn.close()
+        self.log_activity("حذف علاج", "treatments", treatment_id)
     
     # ========== عمليات المواعيد ==========
     def create_appointment(self, patient_id, doctor_id, treatment_id, appointment_date, appointment_time, notes="", total_cost=0.0):
         """إضافة موعد جديد"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
+        cost = to_piasters(total_cost)
         
         cursor.execute('''
             INSERT INTO appointments (patient_id, doctor_id, treatment_id, appointment_date, appointment_time, notes, total_cost)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (patient_id, doctor_id, treatment_id, appointment_date, appointment_time, notes, total_cost))
-        
+        ''', (patient_id, doctor_id, treatment_id, appointment_date, appointment_time, notes, cost))
+
         appointment_id = cursor.lastrowid
+
+        # تسجيل تكلفة الموعد كمستحقات على حساب المريض (الحسابات المالية بالجنيه)
+        if cost:
+            account_id = self._get_or_create_account(cursor, 'patient', patient_id)
+            self._post_transaction(cursor, account_id, 'debit', from_piasters(cost), "تكلفة موعد",
+                                   'appointment', appointment_id, appointment_date)
+
         conn.commit()
         conn.close()
+        self.log_activity("إضافة موعد", "appointments", appointment_id, f"{appointment_date} {appointment_time}")
         return appointment_id
     
     def get_all_appointments(self):
@@ -197,8 +305,7 @@ class CRUDOperations:
                 a.appointment_date,
                 a.appointment_time,
                 a.status,
-                a.total_cost,
-                a.notes
+                a.total_cost / 100.0 AS total_cost
             FROM appointments a
             LEFT JOIN patients p ON a.patient_id = p.id
             LEFT JOIN doctors d ON a.doctor_id = d.id
@@ -207,7 +314,9 @@ class CRUDOperations:
         '''
         df = pd.read_sql_query(query, conn)
         conn.close()
-        return df
+        return lean_frame(df, 'appointments',
+                          categories=('doctor_name', 'treatment_name', 'appointment_time', 'status'),
+                          dates=('appointment_date',))
     
     def get_appointments_by_date(self, target_date):
         """الحصول على مواعيد يوم محدد"""
@@ -220,18 +329,41 @@ class CRUDOperations:
                 t.name as treatment_name,
                 a.appointment_time,
                 a.status,
-                a.total_cost
+                a.total_cost / 100.0 AS total_cost
             FROM appointments a
             LEFT JOIN patients p ON a.patient_id = p.id
             LEFT JOIN doctors d ON a.doctor_id = d.id
             LEFT JOIN treatments t ON a.treatment_id = t.id
-            WHERE a.appointment_date = ?
-            ORDER BY a.appointment_time
+            WHERE a.appointment_day = ?
+            ORDER BY a.appointment_minute
         '''
-        df = pd.read_sql_query(query, conn, params=(target_date,))
+        df = pd.read_sql_query(query, conn, params=(epoch_day(target_date),))
         conn.close()
         return df
     
+    def get_patient_history(self, patient_id):
+        """كل مواعيد المريض الحالية والمؤرشفة، الأحدث أولاً"""
+        conn = self.db.get_connection(archive=True)
+        query = '''
+            SELECT
+                a.id,
+                a.appointment_date,
+                a.appointment_time,
+                d.name as doctor_name,
+                t.name as treatment_name,
+                a.status,
+                a.total_cost / 100.0 AS total_cost,
+                a.notes
+            FROM appointments_all a
+            LEFT JOIN doctors d ON a.doctor_id = d.id
+            LEFT JOIN treatments t ON a.treatment_id = t.id
+            WHERE a.patient_id = ?
+            ORDER BY a.appointment_day DESC, a.appointment_minute DESC
+        '''
+        df = pd.read_sql_query(query, conn, params=(patient_id,))
+        conn.close()
+        return df
+
     def update_appointment_status(self, appointment_id, status):
         """تحديث حالة الموعد"""
         conn = self.db.get_connection()
@@ -239,21 +371,44 @@ class CRUDOperations:
         cursor.execute("UPDATE appointments SET status = ? WHERE id = ?", (status, appointment_id))
         conn.commit()
         conn.close()
+        self.log_activity("تحديث حالة موعد", "appointments", appointment_id, status)
     
     # ========== عمليات المدفوعات ==========
     def create_payment(self, appointment_id, patient_id, amount, payment_method, payment_date, notes=""):
         """إضافة دفعة جديدة"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
+        # المبلغ بالقرش في جدول المدفوعات، والحسابات المالية تبقى بالجنيه
+        piasters = to_piasters(amount)
+        amount = from_piasters(piasters)
         
         cursor.execute('''
             INSERT INTO payments (appointment_id, patient_id, amount, payment_method, payment_date, notes)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (appointment_id, patient_id, amount, payment_method, payment_date, notes))
-        
+        ''', (appointment_id, patient_id, piasters, payment_method, payment_date, notes))
+
         payment_id = cursor.lastrowid
+
+        # تسجيل الدفعة في حساب المريض، وحصة الطبيب في حسابه إذا كانت مرتبطة بموعد
+        account_id = self._get_or_create_account(cursor, 'patient', patient_id)
+        self._post_transaction(cursor, account_id, 'payment', amount, "دفعة من المريض",
+                               'payment', payment_id, payment_date, payment_method, notes)
+
+        if appointment_id:
+            cursor.execute('''
+                SELECT d.id, d.commission_rate FROM appointments a
+                JOIN doctors d ON a.doctor_id = d.id
+                WHERE a.id = ?
+            ''', (appointment_id,))
+            doctor = cursor.fetchone()
+            if doctor and doctor[1]:
+                doctor_account_id = self._get_or_create_account(cursor, 'doctor', doctor[0])
+                self._post_transaction(cursor, doctor_account_id, 'credit', amount * doctor[1] / 100,
+                                       "حصة الطبيب من دفعة", 'payment', payment_id, payment_date)
+
         conn.commit()
         conn.close()
+        self.log_activity("إضافة دفعة", "payments", payment_id, f"{amount} - {payment_method}")
         return payment_id
     
     def get_all_payments(self):
@@ -263,18 +418,17 @@ class CRUDOperations:
             SELECT 
                 pay.id,
                 p.name as patient_name,
-                pay.amount,
+                pay.amount / 100.0 AS amount,
                 pay.payment_method,
                 pay.payment_date,
-                pay.status,
-                pay.notes
+                pay.status
             FROM payments pay
             LEFT JOIN patients p ON pay.patient_id = p.id
             ORDER BY pay.payment_date DESC
         '''
         df = pd.read_sql_query(query, conn)
         conn.close()
-        return df
+        return lean_frame(df, 'payments', categories=('payment_method', 'status'), dates=('payment_date',))
     
     # ========== عمليات المخزون ==========
     def create_inventory_item(self, item_name, category, quantity, unit_price, min_stock_level, supplier_id=None, expiry_date=None):
@@ -286,10 +440,18 @@ class CRUDOperations:
             INSERT INTO inventory (item_name, category, quantity, unit_price, min_stock_level, supplier_id, expiry_date)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (item_name, category, quantity, unit_price, min_stock_level, supplier_id, expiry_date))
-        
+
         item_id = cursor.lastrowid
+
+        # تسجيل قيمة المشتريات كمستحقات للمورد
+        if supplier_id and quantity and unit_price:
+            account_id = self._get_or_create_account(cursor, 'supplier', supplier_id)
+            self._post_transaction(cursor, account_id, 'purchase', quantity * unit_price,
+                                   f"شراء {item_name}", 'inventory', item_id)
+
         conn.commit()
         conn.close()
+        self.log_activity("إضافة صنف مخزون", "inventory", item_id, item_name)
         return item_id
     
     def get_all_inventory(self):
@@ -297,23 +459,32 @@ class CRUDOperations:
         conn = self.db.get_connection()
         query = '''
             SELECT 
-                i.*,
-                s.name as supplier_name
+                i.id,
+                i.item_name,
+                i.category,
+                i.quantity,
+                i.unit_price,
+                i.min_stock_level,
+                s.name as supplier_name,
+                i.expiry_date
             FROM inventory i
             LEFT JOIN suppliers s ON i.supplier_id = s.id
             ORDER BY i.item_name
         '''
         df = pd.read_sql_query(query, conn)
         conn.close()
-        return df
+        return lean_frame(df, 'inventory', categories=('category', 'supplier_name'))
     
     def get_low_stock_items(self):
         """الحصول على العناصر قليلة المخزون"""
         conn = self.db.get_connection()
-        query = "SELECT * FROM inventory WHERE quantity <= min_stock_level ORDER BY quantity"
+        query = '''
+            SELECT id, item_name, category, quantity, min_stock_level FROM inventory
+            WHERE quantity <= min_stock_level ORDER BY quantity
+        '''
         df = pd.read_sql_query(query, conn)
         conn.close()
-        return df
+        return lean_frame(df, 'low_stock', categories=('category',))
     
     def update_inventory_quantity(self, item_id, quantity):
         """تحديث كمية المخزون"""
@@ -322,6 +493,7 @@ class CRUDOperations:
         cursor.execute("UPDATE inventory SET quantity = ? WHERE id = ?", (quantity, item_id))
         conn.commit()
         conn.close()
+        self.log_activity("تحديث كمية مخزون", "inventory", item_id, str(quantity))
     
     # ========== عمليات الموردين ==========
     def create_supplier(self, name, contact_person, phone, email, address, payment_terms):
@@ -330,21 +502,24 @@ class CRUDOperations:
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO suppliers (name, contact_person, phone, email, address, payment_terms)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (name, contact_person, phone, email, address, payment_terms))
+            INSERT INTO suppliers (name, contact_person, phone, email, address, payment_terms, name_search)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (name, contact_person, phone, email, address, payment_terms, normalize_name(name)))
         
         supplier_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        self.log_activity("إضافة مورد", "suppliers", supplier_id, name)
+        reference_data.refresh("suppliers", supplier_id)
         return supplier_id
     
     def get_all_suppliers(self):
         """الحصول على جميع الموردين"""
         conn = self.db.get_connection()
-        df = pd.read_sql_query("SELECT * FROM suppliers ORDER BY name", conn)
+        df = pd.read_sql_query(
+            "SELECT id, name, contact_person, phone, email, payment_terms FROM suppliers ORDER BY name_search", conn)
         conn.close()
-        return df
+        return lean_frame(df, 'suppliers', categories=('payment_terms',))
     
     # ========== عمليات المصروفات ==========
     def create_expense(self, category, description, amount, expense_date, payment_method, receipt_number="", notes=""):
@@ -355,51 +530,943 @@ class CRUDOperations:
         cursor.execute('''
             INSERT INTO expenses (category, description, amount, expense_date, payment_method, receipt_number, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (category, description, amount, expense_date, payment_method, receipt_number, notes))
+        ''', (category, description, to_piasters(amount), expense_date, payment_method, receipt_number, notes))
         
         expense_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        self.log_activity("إضافة مصروف", "expenses", expense_id, f"{category} - {amount}")
         return expense_id
     
     def get_all_expenses(self):
         """الحصول على جميع المصروفات"""
         conn = self.db.get_connection()
-        df = pd.read_sql_query("SELECT * FROM expenses ORDER BY expense_date DESC", conn)
+        df = pd.read_sql_query('''
+            SELECT id, category, description, amount, expense_date, payment_method, receipt_number
+            FROM expenses ORDER BY expense_date DESC
+        ''', conn)
         conn.close()
-        return df
+        return lean_frame(money_frame(df, MONEY_COLUMNS['expenses']), 'expenses',
+                          categories=('category', 'payment_method'), dates=('expense_date',))
     
+    # ========== الحسابات المالية ==========
+    # لكل حساب صف رصيد حالي في accounts، وكل حركة تحمل الرصيد الجاري بعدها،
+    # فالرصيد قراءة صف واحد وكشف الحساب نافذة مرقمة بالمفتاح بدلاً من جمع السجل كله
+    PAID_TRANSACTION_TYPES = ('payment', 'withdrawal')
+    ACCOUNT_HOLDER_TABLES = {'patient': 'patients', 'doctor': 'doctors', 'supplier': 'suppliers'}
+
+    def _get_or_create_account(self, cursor, account_type, holder_id, holder_name=None):
+        """الحصول على رقم حساب أو إنشاؤه داخل المعاملة الحالية"""
+        cursor.execute("SELECT id FROM accounts WHERE account_type = ? AND account_holder_id = ?",
+                       (account_type, holder_id))
+        existing = cursor.fetchone()
+        if existing:
+            if holder_name:
+                cursor.execute("UPDATE accounts SET account_holder_name = ? WHERE id = ?", (holder_name, existing[0]))
+            return existing[0]
+
+        if holder_name is None:
+            table = self.ACCOUNT_HOLDER_TABLES.get(account_type)
+            row = cursor.execute(f"SELECT name FROM {table} WHERE id = ?", (holder_id,)).fetchone() if table else None
+            holder_name = row[0] if row else str(holder_id)
+
+        cursor.execute(
+            "INSERT INTO accounts (account_type, account_holder_id, account_holder_name) VALUES (?, ?, ?)",
+            (account_type, holder_id, holder_name)
+        )
+        return cursor.lastrowid
+
+    def _post_transaction(self, cursor, account_id, transaction_type, amount, description,
+                          reference_type=None, reference_id=None, transaction_date=None,
+                          payment_method=None, notes=""):
+        """تسجيل حركة وتحديث صف الرصيد في نفس المعاملة، وإرجاع (رقم الحركة، الرصيد الجاري)"""
+        if transaction_type in self.PAID_TRANSACTION_TYPES:
+            dues, paid = 0.0, amount
+        else:
+            dues, paid = amount, 0.0
+        transaction_date = transaction_date or date.today().isoformat()
+
+        # تحديث صف الرصيد أولاً يحجز قفل الكتابة، فلا يحسب اتصالان نفس الرصيد الجاري
+        cursor.execute('''
+            UPDATE accounts
+            SET total_dues = total_dues + ?, total_paid = total_paid + ?, balance = balance + ?,
+                last_transaction_date = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            RETURNING balance
+        ''', (dues, paid, dues - paid, transaction_date, account_id))
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"الحساب رقم {account_id} غير موجود")
+        running_balance = row[0]
+
+        cursor.execute('''
+            INSERT INTO financial_transactions
+            (account_id, transaction_type, amount, running_balance, description, reference_type,
+             reference_id, transaction_date, payment_method, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (account_id, transaction_type, amount, running_balance, description, reference_type,
+              reference_id, transaction_date, payment_method, notes))
+        return cursor.lastrowid, running_balance
+
+    def create_or_update_account(self, account_type, holder_id, holder_name):
+        """إنشاء حساب مالي أو تحديث اسم صاحبه"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        account_id = self._get_or_create_account(cursor, account_type, holder_id, holder_name)
+        conn.commit()
+        conn.close()
+        return account_id
+
+    def add_financial_transaction(self, account_id, transaction_type, amount, description,
+                                  reference_type=None, reference_id=None, payment_method=None, notes=""):
+        """إضافة حركة مالية لحساب"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            transaction_id, _ = self._post_transaction(
+                cursor, account_id, transaction_type, amount, description,
+                reference_type, reference_id, None, payment_method, notes
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return transaction_id
+
+    def create_voucher(self, voucher_type, account_id, amount, payment_method, description, created_by="النظام", notes=""):
+        """إنشاء سند قبض أو صرف وإرجاع رقمه"""
+        voucher_date = date.today()
+        voucher_number = voucher_numbers.next_number(voucher_type, voucher_date)
+
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO vouchers (voucher_type, voucher_number, account_id, amount, payment_method,
+                                  description, voucher_date, created_by, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (voucher_type, voucher_number, account_id, amount, payment_method,
+              description, voucher_date.isoformat(), created_by, notes))
+        voucher_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        self.log_activity("إضافة سند", "vouchers", voucher_id, voucher_number, created_by)
+        return voucher_number
+
+    def get_account_balance(self, account_type, holder_id):
+        """الرصيد الحالي لحساب (قراءة صف واحد)"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, total_dues, total_paid, balance, last_transaction_date
+            FROM accounts WHERE account_type = ? AND account_holder_id = ?
+        ''', (account_type, holder_id))
+        row = cursor.fetchone()
+        conn.close()
+
+        if row is None:
+            return {'account_id': None, 'total_dues': 0.0, 'total_paid': 0.0, 'balance': 0.0, 'last_transaction_date': None}
+        return {
+            'account_id': row[0],
+            'total_dues': row[1] or 0.0,
+            'total_paid': row[2] or 0.0,
+            'balance': row[3] or 0.0,
+            'last_transaction_date': row[4]
+        }
+
+    def get_account_statement(self, account_type, holder_id, before_id=None, limit=50):
+        """كشف حساب: نافذة من أحدث الحركات مع الرصيد الجاري بعد كل حركة.
+
+        للصفحة التالية مرر next_cursor من النتيجة السابقة في before_id.
+        """
+        conn = self.db.get_connection()
+        account = pd.read_sql_query(
+            "SELECT * FROM accounts WHERE account_type = ? AND account_holder_id = ?",
+            conn, params=(account_type, holder_id)
+        )
+        if account.empty:
+            conn.close()
+            return None
+
+        query = "SELECT * FROM financial_transactions WHERE account_id = ?"
+        params = [int(account.iloc[0]['id'])]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        transactions = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+
+        return {
+            'account': account.iloc[0].to_dict(),
+            'transactions': transactions,
+            'next_cursor': int(transactions['id'].iloc[-1]) if len(transactions) == limit else None
+        }
+
+    def get_patient_financial_summary(self, patient_id):
+        """الملخص المالي للمريض"""
+        balance = self.get_account_balance('patient', patient_id)
+        return {
+            'total_treatments_cost': balance['total_dues'],
+            'total_paid': balance['total_paid'],
+            'outstanding_balance': balance['balance'],
+            'last_transaction_date': balance['last_transaction_date']
+        }
+
+    def get_doctor_financial_summary(self, doctor_id):
+        """الملخص المالي للطبيب"""
+        balance = self.get_account_balance('doctor', doctor_id)
+        return {
+            'total_earnings': balance['total_dues'],
+            'total_withdrawn': balance['total_paid'],
+            'current_balance': balance['balance'],
+            'last_transaction_date': balance['last_transaction_date']
+        }
+
+    def get_supplier_financial_summary(self, supplier_id):
+        """الملخص المالي للمورد"""
+        balance = self.get_account_balance('supplier', supplier_id)
+        return {
+            'total_purchases': balance['total_dues'],
+            'total_paid': balance['total_paid'],
+            'outstanding_balance': balance['balance'],
+            'last_transaction_date': balance['last_transaction_date']
+        }
+
+    def get_all_accounts_summary(self):
+        """ملخص الأرصدة حسب نوع الحساب"""
+        conn = self.db.get_connection()
+        query = '''
+            SELECT
+                account_type,
+                COUNT(*) as accounts_count,
+                COALESCE(SUM(total_dues), 0) as total_dues,
+                COALESCE(SUM(total_paid), 0) as total_paid,
+                COALESCE(SUM(balance), 0) as total_balance
+            FROM accounts
+            GROUP BY account_type
+        '''
+        df = pd.read_sql_query(query, conn)
+        conn.close()
+        return df
+
+    # ========== إقفال الفترات المحاسبية ==========
+    # الشهر المقفل تُجمَّد إجمالياته في جداول اللقطات ويُمنع التعديل عليه (راجع المشغلات في models.py)،
+    # فتقارير أي فترة تقرأ اللقطات للشهور المقفلة ولا تجمع إلا حركات الفترة المفتوحة
+    def _split_report_range(self, cursor, start_date=None, end_date=None):
+        """تقسيم فترة تقرير إلى شهور مقفلة كاملة ونطاقات تواريخ مفتوحة (الاتصال مربوط بالأرشيف)"""
+        if not start_date or not end_date:
+            # MIN و MAX من كل جدول على حدة تقرأ طرف الفهرس، على عكس view السجل الكامل
+            bounds = cursor.execute('''
+                SELECT MIN(d), MAX(d) FROM (
+                    SELECT MIN(payment_date) AS d FROM main.payments UNION ALL SELECT MAX(payment_date) FROM main.payments
+                    UNION ALL SELECT MIN(payment_date) FROM archive.payments UNION ALL SELECT MAX(payment_date) FROM archive.payments
+                    UNION ALL SELECT MIN(expense_date) FROM main.expenses UNION ALL SELECT MAX(expense_date) FROM main.expenses
+                    UNION ALL SELECT MIN(expense_date) FROM archive.expenses UNION ALL SELECT MAX(expense_date) FROM archive.expenses
+                    UNION ALL SELECT MIN(transaction_date) FROM financial_transactions
+                    UNION ALL SELECT MAX(transaction_date) FROM financial_transactions
+                )
+            ''').fetchone()
+            if bounds[0] is None:
+                return [], []
+            start_date = start_date or bounds[0]
+            end_date = end_date or bounds[1]
+
+        start = date.fromisoformat(str(start_date)[:10])
+        end = date.fromisoformat(str(end_date)[:10])
+        closed = {row[0] for row in cursor.execute("SELECT period FROM accounting_periods")}
+
+        periods, ranges = [], []
+        month_start = start.replace(day=1)
+        while month_start <= end:
+            month_end = month_start.replace(day=calendar.monthrange(month_start.year, month_start.month)[1])
+            segment_start, segment_end = max(month_start, start), min(month_end, end)
+            if month_start.strftime('%Y-%m') in closed and (segment_start, segment_end) == (month_start, month_end):
+                periods.append(month_start.strftime('%Y-%m'))
+            elif ranges and ranges[-1][1] == segment_start - timedelta(days=1):
+                ranges[-1] = (ranges[-1][0], segment_end)
+            else:
+                ranges.append((segment_start, segment_end))
+            month_start = month_end + timedelta(days=1)
+
+        return periods, [(a.isoformat(), b.isoformat()) for a, b in ranges]
+
+    def _open_range_clause(self, column, ranges):
+        """شرط SQL يغطي نطاقات التواريخ المفتوحة فقط"""
+        if not ranges:
+            return "0", []
+        # column عمود رقم اليوم (payment_day مثلاً) مع day_ranges، أو عمود تاريخ نصي مع النطاقات كما هي
+        clause = " OR ".join(f"{column} BETWEEN ? AND ?" for _ in ranges)
+        return f"({clause})", [value for date_range in ranges for value in date_range]
+
+    def _snapshot_total(self, cursor, table, periods):
+        """مجموع إجماليات جدول لقطات لعدة شهور مقفلة"""
+        if not periods:
+            return 0
+        placeholders = ', '.join('?' * len(periods))
+        return cursor.execute(f"SELECT COALESCE(SUM(total), 0) FROM {table} WHERE period IN ({placeholders})",
+                              periods).fetchone()[0]
+
+    def close_period(self, period, closed_by="النظام"):
+        """إقفال شهر (YYYY-MM): تجميد إجمالياته في اللقطات ومنع التعديل عليه"""
+        period_start = datetime.strptime(period, '%Y-%m').date()
+        if period_start >= date.today().replace(day=1):
+            raise ValueError("لا يمكن إقفال الشهر الحالي أو شهر مستقبلي")
+        period_end = period_start.replace(day=calendar.monthrange(period_start.year, period_start.month)[1])
+        bounds = (period_start.isoformat(), period_end.isoformat())
+        paid_types = ', '.join(f"'{t}'" for t in self.PAID_TRANSACTION_TYPES)
+
+        conn = self.db.get_connection(archive=True)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            if cursor.execute("SELECT 1 FROM accounting_periods WHERE period = ?", (period,)).fetchone():
+                raise ValueError(f"الفترة {period} مقفلة بالفعل")
+
+            cursor.execute("INSERT INTO accounting_periods (period, closed_by) VALUES (?, ?)", (period, closed_by))
+            cursor.execute(f'''
+                INSERT INTO period_account_snapshots
+                (period, account_id, total_dues, total_paid, closing_balance, dues_count, paid_count)
+                SELECT ?, account_id,
+                       SUM(CASE WHEN transaction_type NOT IN ({paid_types}) THEN amount ELSE 0 END),
+                       SUM(CASE WHEN transaction_type IN ({paid_types}) THEN amount ELSE 0 END),
+                       -- بالتاريخ لا بترتيب الإدخال: running_balance يتراكم بترتيب id فلا يصح مع حركة بتاريخ سابق
+                       (SELECT SUM(CASE WHEN prior.transaction_type IN ({paid_types}) THEN -prior.amount ELSE prior.amount END)
+                        FROM financial_transactions prior
+                        WHERE prior.account_id = ft.account_id AND prior.transaction_date <= ?),
+                       SUM(transaction_type NOT IN ({paid_types})),
+                       SUM(transaction_type IN ({paid_types}))
+                FROM financial_transactions ft
+                WHERE transaction_date BETWEEN ? AND ?
+                GROUP BY account_id
+            ''', (period, period_end.isoformat()) + bounds)
+            cursor.execute('''
+                INSERT INTO period_payment_method_snapshots (period, payment_method, total, count)
+                SELECT ?, payment_method, SUM(amount), COUNT(*) FROM payments_all
+                WHERE payment_month = ?
+                GROUP BY payment_method
+            ''', (period, month_key(period_start)))
+            cursor.execute('''
+                INSERT INTO period_expense_category_snapshots (period, category, total, count)
+                SELECT ?, category, SUM(amount), COUNT(*) FROM expenses_all
+                WHERE expense_month = ?
+                GROUP BY category
+            ''', (period, month_key(period_start)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        self.log_activity("إقفال فترة", "accounting_periods", None, period, closed_by)
+
+    def reopen_period(self, period):
+        """إعادة فتح شهر مقفل وحذف لقطاته"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        for table in ('period_account_snapshots', 'period_payment_method_snapshots', 'period_expense_category_snapshots'):
+            cursor.execute(f"DELETE FROM {table} WHERE period = ?", (period,))
+        cursor.execute("DELETE FROM accounting_periods WHERE period = ?", (period,))
+        conn.commit()
+        conn.close()
+        self.log_activity("إعادة فتح فترة", "accounting_periods", None, period)
+
+    def get_closed_periods(self):
+        """الشهور المقفلة مع إجمالياتها"""
+        conn = self.db.get_connection()
+        query = '''
+            SELECT
+                ap.period,
+                ap.closed_by,
+                ap.closed_at,
+                (SELECT COALESCE(SUM(total), 0) / 100.0 FROM period_payment_method_snapshots WHERE period = ap.period) as total_revenue,
+                (SELECT COALESCE(SUM(total), 0) / 100.0 FROM period_expense_category_snapshots WHERE period = ap.period) as total_expenses
+            FROM accounting_periods ap
+            ORDER BY ap.period DESC
+        '''
+        df = pd.read_sql_query(query, conn)
+        conn.close()
+        return df
+
+    # ========== سجل الأنشطة ==========
+    def log_activity(self, action, table_name=None, record_id=None, details=None, user_name="النظام"):
+        """تسجيل نشاط؛ يُكتب على دفعات في الخلفية دون انتظار قاعدة البيانات"""
+        activity_logger.log(action, table_name, record_id, details, user_name)
+
+    def _activity_log_tables(self, cursor, start_date=None, end_date=None, before_id=None):
+        """الجداول التي قد تحتوي نتائج البحث: الجدول الحالي ثم الأقسام من الأحدث للأقدم"""
+        query = "SELECT table_name FROM activity_log_partitions WHERE 1=1"
+        params = []
+        if start_date:
+            query += " AND period >= ?"
+            params.append(str(start_date)[:7])
+        if end_date:
+            query += " AND period <= ?"
+            params.append(str(end_date)[:7])
+        if before_id is not None:
+            query += " AND min_id < ?"
+            params.append(before_id)
+        query += " ORDER BY period DESC"
+        return ['activity_log'] + [row[0] for row in cursor.execute(query, params)]
+
+    def get_activity_log(self, limit=100, action=None, table_name=None, user_name=None, record_id=None,
+                         start_date=None, end_date=None, search_text=None, before_id=None):
+        """الأنشطة الأحدث أولاً مع فلاتر تُنفذ في قاعدة البيانات.
+
+        للصفحة التالية مرر id آخر صف في before_id. يشمل البحث الأقسام الشهرية المؤرشفة.
+        """
+        # كتابة الأنشطة المعلقة أولاً حتى يرى المستخدم عملياته الأخيرة
+        activity_logger.flush()
+
+        conditions, params = [], []
+        if action:
+            conditions.append("action = ?")
+            params.append(action)
+        if table_name:
+            conditions.append("table_name = ?")
+            params.append(table_name)
+        if user_name:
+            conditions.append("user_name = ?")
+            params.append(user_name)
+        if record_id is not None:
+            conditions.append("record_id = ?")
+            params.append(record_id)
+        if start_date:
+            conditions.append("created_at >= ?")
+            params.append(str(start_date))
+        if end_date:
+            conditions.append("created_at < ?")
+            params.append((date.fromisoformat(str(end_date)[:10]) + timedelta(days=1)).isoformat())
+        if search_text:
+            conditions.append("details LIKE ?")
+            params.append(f"%{search_text}%")
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        where = " AND ".join(conditions) or "1=1"
+
+        conn = self.db.get_connection()
+        frames = []
+        remaining = limit
+        # المعرفات متزايدة والأقسام أقدم من الجدول الحالي، فالقراءة بالترتيب تكفي حتى يكتمل العدد
+        for table in self._activity_log_tables(conn.cursor(), start_date, end_date, before_id):
+            df = pd.read_sql_query(f"SELECT * FROM {table} WHERE {where} ORDER BY id DESC LIMIT ?",
+                                   conn, params=params + [remaining])
+            if not df.empty:
+                frames.append(df)
+                remaining -= len(df)
+            if remaining <= 0:
+                break
+        conn.close()
+
+        if not frames:
+            return pd.DataFrame(columns=['id', 'action', 'table_name', 'record_id', 'details', 'user_name', 'created_at'])
+        return pd.concat(frames, ignore_index=True)
+
+    def get_activity_log_filter_values(self):
+        """القيم المتاحة لفلاتر النشاط والجدول والمستخدم.
+
+        قيم الأقسام المؤرشفة محفوظة في activity_log_partition_values، فلا يُمسح إلا الجدول الحالي.
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        values = {column: set() for column in self.db.ACTIVITY_LOG_FILTER_COLUMNS}
+        for column, value in cursor.execute("SELECT DISTINCT column_name, value FROM activity_log_partition_values"):
+            values[column].add(value)
+        for column in values:
+            values[column].update(row[0] for row in cursor.execute(
+                f"SELECT DISTINCT {column} FROM activity_log WHERE {column} IS NOT NULL"))
+        conn.close()
+        return {column: sorted(found) for column, found in values.items()}
+
+    def archive_activity_log(self, older_than_days=90, batch_size=5000):
+        """نقل الأنشطة الأقدم من المدة المحددة إلى أقسام شهرية على دفعات، وإرجاع عدد السجلات المنقولة"""
+        cutoff = (date.today() - timedelta(days=older_than_days)).isoformat()
+        moved = 0
+
+        while True:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                row = cursor.execute(
+                    "SELECT substr(created_at, 1, 7) FROM activity_log WHERE created_at < ? ORDER BY created_at LIMIT 1",
+                    (cutoff,)
+                ).fetchone()
+                if row is None:
+                    conn.commit()
+                    break
+
+                period = row[0]
+                period_start = f"{period}-01"
+                next_month = (date.fromisoformat(period_start) + timedelta(days=31)).replace(day=1).isoformat()
+                period_end = min(next_month, cutoff)
+                partition = self.db.create_activity_log_partition(cursor, period)
+
+                # نفس الشرط للنسخ والحذف داخل معاملة واحدة يضمن نقل نفس السجلات
+                max_id = cursor.execute('''
+                    SELECT MAX(id) FROM (
+                        SELECT id FROM activity_log WHERE created_at >= ? AND created_at < ?
+                        ORDER BY id LIMIT ?
+                    )
+                ''', (period_start, period_end, batch_size)).fetchone()[0]
+                batch_filter = "created_at >= ? AND created_at < ? AND id <= ?"
+                batch_params = (period_start, period_end, max_id)
+
+                cursor.execute(f"INSERT INTO {partition} SELECT * FROM activity_log WHERE {batch_filter}", batch_params)
+                count = cursor.rowcount
+                for column in self.db.ACTIVITY_LOG_FILTER_COLUMNS:
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO activity_log_partition_values (column_name, value, period)
+                        SELECT DISTINCT ?, {column}, ? FROM activity_log WHERE {batch_filter} AND {column} IS NOT NULL
+                    ''', (column, period) + batch_params)
+                cursor.execute(f"DELETE FROM activity_log WHERE {batch_filter}", batch_params)
+                cursor.execute(f'''
+                    INSERT INTO activity_log_partitions (period, table_name, min_id, max_id, row_count)
+                    SELECT ?, ?, MIN(id), MAX(id), COUNT(*) FROM {partition} WHERE 1
+                    ON CONFLICT(period) DO UPDATE SET
+                        min_id = excluded.min_id, max_id = excluded.max_id,
+                        row_count = excluded.row_count, updated_at = CURRENT_TIMESTAMP
+                ''', (period, partition))
+                conn.commit()
+                moved += count
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+        return moved
+
+    def get_activity_log_writer_stats(self):
+        """عدادات كاتب سجل الأنشطة"""
+        return activity_logger.stats()
+
+    # ========== أرشفة السجلات القديمة ==========
+    # المدفوعات المكتملة والمواعيد المنتهية والمصروفات الأقدم من المدة المحددة تُنقل إلى قاعدة الأرشيف
+    # (راجع attach_archive في models.py)، فعمليات اليوم تقرأ الجداول الحالية فقط بينما سجل المريض
+    # والتقارير تقرأ views السجل الكامل {table}_all. المدفوعات أولاً حتى لا يبقى موعد مؤرشف له دفعة حالية.
+    ARCHIVE_CONDITIONS = {
+        'payments': "payment_day < ? AND status = 'مكتمل'",
+        'appointments': "appointment_day < ? AND status IN ('مكتمل', 'ملغي') AND NOT EXISTS "
+                        "(SELECT 1 FROM main.payments p WHERE p.appointment_id = appointments.id)",
+        'expenses': "expense_day < ?",
+    }
+
+    def archive_old_records(self, older_than_days=3 * 365, batch_size=2000):
+        """نقل السجلات الأقدم من المدة المحددة إلى قاعدة الأرشيف على دفعات، وإرجاع عدد المنقول لكل جدول"""
+        cutoff = epoch_day(date.today() - timedelta(days=older_than_days))
+        moved = {}
+
+        for table, condition in self.ARCHIVE_CONDITIONS.items():
+            moved[table] = 0
+            while True:
+                conn = self.db.get_connection(archive=True)
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    # معرفات الدفعة من فهرس رقم اليوم، ثم نفس المعرفات للنسخ والحذف داخل المعاملة
+                    cursor.execute("DROP TABLE IF EXISTS temp.archive_batch")
+                    cursor.execute(f"CREATE TEMP TABLE archive_batch AS SELECT id FROM main.{table} WHERE {condition} LIMIT ?",
+                                   (cutoff, batch_size))
+                    count = cursor.execute("SELECT COUNT(*) FROM temp.archive_batch").fetchone()[0]
+                    if not count:
+                        conn.commit()
+                        break
+
+                    # الأعمدة المولدة (hidden != 0) تُحسب في جدول الأرشيف ولا تُنسخ
+                    columns = ', '.join(row[1] for row in cursor.execute(f"PRAGMA main.table_xinfo({table})") if row[6] == 0)
+                    batch_filter = "id IN (SELECT id FROM temp.archive_batch)"
+                    cursor.execute(f"INSERT INTO archive.{table} ({columns}) SELECT {columns} FROM main.{table} "
+                                   f"WHERE {batch_filter}")
+
+                    # النقل للأرشيف ليس تعديلاً على فترة مقفلة: علم داخل المعاملة يتجاوز مشغل منع الحذف
+                    # (بدون DDL، فلا يتغير المخطط ولا تبطل الجمل المحضرة في الاتصالات الأخرى)
+                    cursor.execute("INSERT INTO main.maintenance_flags (name) VALUES ('archive')")
+                    last_seq = cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM main.changes").fetchone()[0]
+                    cursor.execute(f"DELETE FROM main.{table} WHERE {batch_filter}")
+                    cursor.execute("DELETE FROM main.maintenance_flags WHERE name = 'archive'")
+                    # الصفوف باقية في views السجل الكامل: المستهلكون يرون archive لا delete
+                    cursor.execute("UPDATE main.changes SET op = 'archive' WHERE seq > ? AND op = 'delete'", (last_seq,))
+                    conn.commit()
+                    moved[table] += count
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.close()
+
+        if any(moved.values()):
+            self.log_activity("أرشفة السجلات القديمة", None, None,
+                              ", ".join(f"{table}: {count}" for table, count in moved.items()))
+        return moved
+
+    def get_archive_stats(self):
+        """عدد الصفوف الحالية والمؤرشفة وأقدم تاريخ حالي لكل جدول مؤرشف"""
+        conn = self.db.get_connection(archive=True)
+        cursor = conn.cursor()
+        stats = []
+        for table, date_column in self.db.ARCHIVED_TABLES.items():
+            current, oldest = cursor.execute(f"SELECT COUNT(*), MIN({date_column}) FROM main.{table}").fetchone()
+            archived, newest_archived = cursor.execute(
+                f"SELECT COUNT(*), MAX({date_column}) FROM archive.{table}").fetchone()
+            stats.append({'table_name': table, 'current_rows': current, 'archived_rows': archived,
+                          'oldest_current': oldest, 'newest_archived': newest_archived})
+        conn.close()
+        return pd.DataFrame(stats)
+
     # ========== تقارير وإحصائيات ==========
     def get_financial_summary(self, start_date=None, end_date=None):
         """الحصول على ملخص مالي"""
+        conn = self.db.get_connection(archive=True)
+        cursor = conn.cursor()
+        periods, ranges = self._split_report_range(cursor, start_date, end_date)
+
+        # إجمالي المدفوعات: لقطات الشهور المقفلة + حركات الفترات المفتوحة فقط
+        total_payments = self._snapshot_total(cursor, 'period_payment_method_snapshots', periods)
+        clause, params = self._open_range_clause('payment_day', day_ranges(ranges))
+        total_payments += cursor.execute(f"SELECT COALESCE(SUM(amount), 0) FROM payments_all WHERE {clause}", params).fetchone()[0]
+
+        # إجمالي المصروفات
+        total_expenses = self._snapshot_total(cursor, 'period_expense_category_snapshots', periods)
+        clause, params = self._open_range_clause('expense_day', day_ranges(ranges))
+        total_expenses += cursor.execute(f"SELECT COALESCE(SUM(amount), 0) FROM expenses_all WHERE {clause}", params).fetchone()[0]
+
+        conn.close()
+
+        # الجمع بالقرش دقيق، والتحويل للجنيه مرة واحدة في النهاية
+        return {
+            'total_revenue': from_piasters(total_payments),
+            'total_expenses': from_piasters(total_expenses),
+            'net_profit': from_piasters(total_payments - total_expenses)
+        }
+
+    def get_payment_methods_stats(self, start_date=None, end_date=None):
+        """الإيرادات حسب طريقة الدفع"""
+        conn = self.db.get_connection(archive=True)
+        periods, ranges = self._split_report_range(conn.cursor(), start_date, end_date)
+        clause, params = self._open_range_clause('payment_day', day_ranges(ranges))
+        placeholders = ', '.join('?' * len(periods)) or 'NULL'
+        query = f'''
+            SELECT payment_method, SUM(total) / 100.0 as total, SUM(count) as count
+            FROM (
+                SELECT payment_method, total, count FROM period_payment_method_snapshots
+                WHERE period IN ({placeholders})
+                UNION ALL
+                SELECT payment_method, SUM(amount), COUNT(*) FROM payments_all
+                WHERE {clause}
+                GROUP BY payment_method
+            )
+            GROUP BY payment_method
+            ORDER BY total DESC
+        '''
+        df = pd.read_sql_query(query, conn, params=list(periods) + params)
+        conn.close()
+        return df
+
+    def get_expenses_by_category(self, start_date=None, end_date=None):
+        """المصروفات حسب الفئة"""
+        conn = self.db.get_connection(archive=True)
+        periods, ranges = self._split_report_range(conn.cursor(), start_date, end_date)
+        clause, params = self._open_range_clause('expense_day', day_ranges(ranges))
+        placeholders = ', '.join('?' * len(periods)) or 'NULL'
+        query = f'''
+            SELECT category, SUM(total) / 100.0 as total, SUM(count) as count
+            FROM (
+                SELECT category, total, count FROM period_expense_category_snapshots
+                WHERE period IN ({placeholders})
+                UNION ALL
+                SELECT category, SUM(amount), COUNT(*) FROM expenses_all
+                WHERE {clause}
+                GROUP BY category
+            )
+            GROUP BY category
+            ORDER BY total DESC
+        '''
+        df = pd.read_sql_query(query, conn, params=list(periods) + params)
+        conn.close()
+        return df
+
+    def get_comprehensive_financial_report(self, start_date, end_date):
+        """تقرير مالي شامل لفترة"""
+        conn = self.db.get_connection(archive=True)
+        periods, ranges = self._split_report_range(conn.cursor(), start_date, end_date)
+        clause, params = self._open_range_clause('ft.transaction_date', ranges)
+        placeholders = ', '.join('?' * len(periods)) or 'NULL'
+        paid_types = ', '.join(f"'{t}'" for t in self.PAID_TRANSACTION_TYPES)
+
+        # مستحقات الأطباء من حساباتهم: لقطات الشهور المقفلة + حركات الفترات المفتوحة
+        doctor_earnings = pd.read_sql_query(f'''
+            SELECT a.account_holder_name as doctor_name,
+                   SUM(e.earnings) as total_earnings,
+                   SUM(e.payment_count) as payment_count
+            FROM (
+                SELECT account_id, total_dues as earnings, dues_count as payment_count
+                FROM period_account_snapshots
+                WHERE period IN ({placeholders})
+                UNION ALL
+                SELECT ft.account_id, SUM(ft.amount), COUNT(*)
+                FROM financial_transactions ft
+                WHERE ft.transaction_type NOT IN ({paid_types}) AND {clause}
+                GROUP BY ft.account_id
+            ) e
+            JOIN accounts a ON a.id = e.account_id
+            WHERE a.account_type = 'doctor'
+            GROUP BY a.id
+            ORDER BY total_earnings DESC
+        ''', conn, params=list(periods) + params)
+        conn.close()
+
+        summary = self.get_financial_summary(start_date, end_date)
+        total_doctor_earnings = float(doctor_earnings['total_earnings'].sum()) if not doctor_earnings.empty else 0.0
+
+        return {
+            'clinic_earnings': {
+                'total_revenue': summary['total_revenue'],
+                'total_doctor_earnings': total_doctor_earnings,
+                'total_clinic_earnings': summary['total_revenue'] - total_doctor_earnings
+            },
+            'total_expenses': summary['total_expenses'],
+            'payment_methods': self.get_payment_methods_stats(start_date, end_date),
+            'expense_categories': self.get_expenses_by_category(start_date, end_date),
+            'doctor_earnings': doctor_earnings
+        }
+
+    def get_revenue_by_period(self, start_date, end_date, group_by='month'):
+        """الإيرادات مجمعة بالشهر أو الأسبوع (يبدأ السبت) أو اليوم أو يوم الأسبوع.
+
+        التجميع على أعمدة payment_month و payment_day الرقمية من فهارسها، والتسمية
+        النصية لكل مجموعة تُحسب بعد التجميع.
+        """
+        keys = {
+            'month': "payment_month",
+            'week': "payment_day - (payment_day + 5) % 7",
+            'day': "payment_day",
+            'weekday': "(payment_day + 4) % 7",
+        }
+        if group_by not in keys:
+            raise ValueError(f"تجميع غير معروف: {group_by}")
+
+        conn = self.db.get_connection(archive=True)
+        df = pd.read_sql_query(f'''
+            SELECT {keys[group_by]} AS period_key, SUM(amount) / 100.0 AS total_revenue, COUNT(*) AS payment_count
+            FROM payments_all
+            WHERE payment_month BETWEEN ? AND ? AND payment_day BETWEEN ? AND ?
+            GROUP BY period_key
+            ORDER BY period_key
+        ''', conn, params=(month_key(start_date), month_key(end_date), epoch_day(start_date), epoch_day(end_date)))
+        conn.close()
+
+        if group_by == 'month':
+            labels = df['period_key'].map(lambda key: f"{key // 100:04d}-{key % 100:02d}")
+        elif group_by == 'weekday':
+            labels = df['period_key'].map(lambda key: WEEKDAY_NAMES[key])
+        else:
+            labels = df['period_key'].map(lambda key: (EPOCH + timedelta(days=int(key))).isoformat())
+        df.insert(0, 'period', labels)
+        return df.drop(columns='period_key')
+
+    def get_daily_revenue_comparison(self, days=30):
+        """الإيرادات اليومية لآخر عدد من الأيام"""
+        conn = self.db.get_connection()
+        today = epoch_day(date.today())
+        df = pd.read_sql_query('''
+            SELECT payment_day, SUM(amount) / 100.0 AS daily_revenue, COUNT(*) AS payment_count
+            FROM payments
+            WHERE payment_day BETWEEN ? AND ?
+            GROUP BY payment_day
+            ORDER BY payment_day
+        ''', conn, params=(today - days + 1, today))
+        conn.close()
+        df.insert(0, 'payment_date', df.pop('payment_day').map(lambda key: (EPOCH + timedelta(days=int(key))).isoformat()))
+        return df
+
+    # ========== الإعدادات ==========
+    def get_all_settings(self):
+        """كل إعدادات العيادة (key, value)"""
+        conn = self.db.get_connection()
+        df = pd.read_sql_query("SELECT key, value FROM settings ORDER BY key", conn)
+        conn.close()
+        return df
+    
+    def update_setting(self, key, value):
+        """حفظ قيمة إعداد (إضافة أو تحديث)"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO settings (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+        ''', (key, value))
+        conn.commit()
+        conn.close()
+        self.log_activity("تحديث إعداد", "settings", None, key)
+    
+    # ========== الإشعارات ==========
+    def create_notification(self, notification_type, title, message, priority="normal"):
+        """إضافة إشعار"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO notifications (notification_type, title, message, priority)
+            VALUES (?, ?, ?, ?)
+        ''', (notification_type, title, message, priority))
+        notification_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return notification_id
+    
+    def get_all_notifications(self, limit=50):
+        """أحدث الإشعارات"""
+        conn = self.db.get_connection()
+        df = pd.read_sql_query('''
+            SELECT id, notification_type, title, message, priority, is_read, created_at
+            FROM notifications ORDER BY id DESC LIMIT ?
+        ''', conn, params=(limit,))
+        conn.close()
+        return df
+    
+    def get_unread_notifications(self, limit=10):
+        """أحدث الإشعارات غير المقروءة"""
         conn = self.db.get_connection()
+        df = pd.read_sql_query('''
+            SELECT id, notification_type, title, message, priority, created_at
+            FROM notifications WHERE is_read = 0 ORDER BY id DESC LIMIT ?
+        ''', conn, params=(limit,))
+        conn.close()
+        return df
+    
+    def mark_notification_as_read(self, notification_id):
+        """تحديد إشعار كمقروء"""
+        conn = self.db.get_connection()
+        conn.execute("UPDATE notifications SET is_read = 1 WHERE id = ?", (int(notification_id),))
+        conn.commit()
+        conn.close()
+    
+    def mark_all_notifications_as_read(self):
+        """تحديد كل الإشعارات كمقروءة"""
+        conn = self.db.get_connection()
+        conn.execute("UPDATE notifications SET is_read = 1 WHERE is_read = 0")
+        conn.commit()
+        conn.close()
+    
+    def generate_daily_notifications(self):
+        """إشعارات اليوم: المواعيد والمخزون المنخفض والأصناف قريبة الانتهاء، وإرجاع عدد المضاف.
+
+        الإشعار لا يتكرر إذا أُضيف بنفس النوع والعنوان اليوم.
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        today = epoch_day(date.today())
+        appointments, low_stock, expiring = cursor.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM appointments WHERE appointment_day = ?),
+                (SELECT COUNT(*) FROM inventory WHERE quantity <= min_stock_level),
+                (SELECT COUNT(*) FROM inventory WHERE expiry_day BETWEEN ? AND ?)
+        ''', (today, today, today + 30)).fetchone()
         
-        # إجمالي المدفوعات
-        payments_query = "SELECT COALESCE(SUM(amount), 0) as total_payments FROM payments"
-        if start_date and end_date:
-            payments_query += f" WHERE payment_date BETWEEN '{start_date}' AND '{end_date}'"
+        candidates = []
+        if appointments:
+            candidates.append(("appointment", "مواعيد اليوم", f"لديك {appointments} موعد اليوم", "normal"))
+        if low_stock:
+            candidates.append(("inventory", "مخزون منخفض", f"{low_stock} صنف وصل للحد الأدنى", "high"))
+        if expiring:
+            candidates.append(("inventory", "أصناف تنتهي قريباً", f"{expiring} صنف ينتهي خلال 30 يوم", "urgent"))
         
-        # إجمالي المصروفات
-        expenses_query = "SELECT COALESCE(SUM(amount), 0) as total_expenses FROM expenses"
-        if start_date and end_date:
-            expenses_query += f" WHERE expense_date BETWEEN '{start_date}' AND '{end_date}'"
+        created = 0
+        for notification_type, title, message, priority in candidates:
+            cursor.execute('''
+                INSERT INTO notifications (notification_type, title, message, priority)
+                SELECT ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM notifications
+                    WHERE notification_type = ? AND title = ? AND created_at >= date('now')
+                )
+            ''', (notification_type, title, message, priority, notification_type, title))
+            created += cursor.rowcount
+        conn.commit()
+        conn.close()
+        return created
+    
+    # ========== لوحة التحكم ==========
+    def get_dashboard_stats(self):
+        """إحصائيات لوحة التحكم"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        today = epoch_day(date.today())
+        cursor.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM patients),
+                (SELECT COUNT(*) FROM doctors),
+                (SELECT COUNT(*) FROM appointments WHERE appointment_day = ?),
+                (SELECT COUNT(*) FROM inventory WHERE quantity <= min_stock_level),
+                (SELECT COUNT(*) FROM inventory WHERE expiry_day BETWEEN ? AND ?),
+                (SELECT COALESCE(SUM(amount), 0) FROM payments WHERE payment_day >= ?)
+        ''', (today, today, today + 30, epoch_day(date.today().replace(day=1))))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return {
+            'total_patients': row[0],
+            'total_doctors': row[1],
+            'today_appointments': row[2],
+            'low_stock_items': row[3],
+            'expiring_items': row[4],
+            'this_month_revenue': from_piasters(row[5])
+        }
+    
+    def get_monthly_comparison(self):
+        """مقارنة الشهر الحالي بالشهر السابق"""
+        today = date.today()
+        current_start = today.replace(day=1)
+        last_start = (current_start - timedelta(days=1)).replace(day=1)
         
-        total_payments = pd.read_sql_query(payments_query, conn).iloc[0]['total_payments']
-        total_expenses = pd.read_sql_query(expenses_query, conn).iloc[0]['total_expenses']
+        current = self.get_financial_summary(current_start.isoformat(), today.isoformat())
+        last = self.get_financial_summary(last_start.isoformat(), (current_start - timedelta(days=1)).isoformat())
         
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT
+                SUM(CASE WHEN appointment_day >= ? THEN 1 ELSE 0 END),
+                SUM(CASE WHEN appointment_day < ? THEN 1 ELSE 0 END)
+            FROM appointments
+            WHERE appointment_day BETWEEN ? AND ?
+        ''', (epoch_day(current_start), epoch_day(current_start), epoch_day(last_start), epoch_day(today)))
+        current_appointments, last_appointments = [value or 0 for value in cursor.fetchone()]
         conn.close()
         
         return {
-            'total_revenue': total_payments,
-            'total_expenses': total_expenses,
-            'net_profit': total_payments - total_expenses
+            'current_revenue': current['total_revenue'],
+            'last_revenue': last['total_revenue'],
+            'current_expenses': current['total_expenses'],
+            'last_expenses': last['total_expenses'],
+            'current_appointments': current_appointments,
+            'last_appointments': last_appointments,
+            'appointments_change': ((current_appointments - last_appointments) / last_appointments * 100)
+                                   if last_appointments > 0 else 0
         }
     
+    def get_expiring_inventory(self, days=30):
+        """الأصناف التي تنتهي صلاحيتها خلال عدد الأيام المحدد"""
+        conn = self.db.get_connection()
+        today = epoch_day(date.today())
+        df = pd.read_sql_query('''
+            SELECT *, expiry_day - ? as days_to_expire
+            FROM inventory
+            WHERE expiry_day BETWEEN ? AND ?
+            ORDER BY expiry_day
+        ''', conn, params=(today, today, today + days))
+        conn.close()
+        return df
+
     def get_daily_appointments_count(self):
         """عدد المواعيد اليومية"""
         conn = self.db.get_connection()
-        today = date.today().isoformat()
-        query = "SELECT COUNT(*) as count FROM appointments WHERE appointment_date = ?"
+        today = epoch_day(date.today())
+        query = "SELECT COUNT(*) as count FROM appointments WHERE appointment_day = ?"
         result = pd.read_sql_query(query, conn, params=(today,))
         conn.close()
         return result.iloc[0]['count'] if not result.empty else 0
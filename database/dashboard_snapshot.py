@@ -0,0 +1,110 @@
+import atexit
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+import pandas as pd
+from .crud import crud
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    """لقطة ثابتة من بيانات لوحة التحكم (للقراءة فقط، مشتركة بين الجلسات)"""
+    taken_at: datetime
+    stats: dict
+    monthly_comparison: dict
+    financial_summary: dict
+    today_appointments: pd.DataFrame
+    low_stock_count: int
+    expiring_count: int
+
+class DashboardSnapshotService:
+    """خدمة لقطات لوحة التحكم على مستوى العملية.
+
+    خيط واحد في الخلفية يعيد حساب اللقطة كل refresh_seconds، أو فور تغير بيانات
+    قاعدة البيانات (PRAGMA data_version)، وكل الجلسات تقرأ آخر لقطة جاهزة دون أي
+    استعلام. عدد الجلسات المفتوحة لا يغير الحمل على قاعدة البيانات.
+    """
+
+    def __init__(self, crud_operations, refresh_seconds=30, poll_seconds=1.0, min_interval_seconds=2.0):
+        self.crud = crud_operations
+        self.refresh_seconds = refresh_seconds
+        self.poll_seconds = poll_seconds
+        self.min_interval_seconds = min_interval_seconds
+
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+
+        # عدادات
+        self.refresh_count = 0
+        self.last_error = None
+
+    def get(self):
+        """آخر لقطة، وتُحسب مباشرة في أول طلب فقط"""
+        self._ensure_thread()
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def refresh(self):
+        """حساب لقطة جديدة الآن (مثلاً بعد عملية يجب أن تظهر فوراً)"""
+        with self._refresh_lock:
+            today = date.today().isoformat()
+            today_appointments = self.crud.get_appointments_by_date(today)
+            stats = self.crud.get_dashboard_stats()
+            snapshot = DashboardSnapshot(
+                taken_at=datetime.now(),
+                stats=stats,
+                monthly_comparison=self.crud.get_monthly_comparison(),
+                financial_summary=self.crud.get_financial_summary(),
+                today_appointments=today_appointments,
+                low_stock_count=stats['low_stock_items'],
+                expiring_count=stats['expiring_items']
+            )
+            self._snapshot = snapshot
+            self.refresh_count += 1
+            return snapshot
+
+    def stop(self):
+        """إيقاف خيط التحديث"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stop_event.is_set():
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="dashboard-snapshot", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        # اتصال خاص بالمراقبة: data_version يتغير عند أي commit من اتصال آخر
+        conn = sqlite3.connect(self.crud.db.db_path, check_same_thread=False)
+        try:
+            last_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            last_refresh = time.monotonic() if self._snapshot is not None else 0.0
+            while not self._stop_event.wait(self.poll_seconds):
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                elapsed = time.monotonic() - last_refresh
+                changed = version != last_version
+                if elapsed >= self.refresh_seconds or (changed and elapsed >= self.min_interval_seconds):
+                    try:
+                        self.refresh()
+                        self.last_error = None
+                    except Exception as e:
+                        self.last_error = str(e)
+                        print(f"Dashboard snapshot refresh error: {e}")
+                    last_version = version
+                    last_refresh = time.monotonic()
+        finally:
+            conn.close()
+
+dashboard_snapshots = DashboardSnapshotService(crud)
+atexit.register(dashboard_snapshots.stop)
@@ -0,0 +1,62 @@
+from datetime import date
+
+# التواريخ والأوقات مخزنة نصاً (YYYY-MM-DD و HH:MM)، ولكل منها أعمدة مولدة رقمية
+# مفهرسة: رقم اليوم منذ 1970-01-01 والشهر YYYYMM ودقيقة اليوم. مقارنة النطاقات
+# والتجميع بالشهر أو يوم الأسبوع تتم على أعداد صحيحة من الفهرس بدلاً من strftime لكل صف.
+EPOCH = date(1970, 1, 1)
+
+# اسم العمود المولد -> (النوع، العمود النصي) لكل جدول
+DATE_KEY_COLUMNS = {
+    'appointments': {
+        'appointment_day': ('day', 'appointment_date'),
+        'appointment_month': ('month', 'appointment_date'),
+        'appointment_minute': ('minute', 'appointment_time'),
+    },
+    'payments': {
+        'payment_day': ('day', 'payment_date'),
+        'payment_month': ('month', 'payment_date'),
+    },
+    'expenses': {
+        'expense_day': ('day', 'expense_date'),
+        'expense_month': ('month', 'expense_date'),
+    },
+    'inventory': {
+        'expiry_day': ('day', 'expiry_date'),
+    },
+}
+
+DATE_KEY_INDEXES = {
+    'appointments': [('appointment_day', 'appointment_minute'), ('appointment_month',)],
+    'payments': [('payment_day',), ('payment_month', 'payment_day')],
+    'expenses': [('expense_day',), ('expense_month', 'expense_day')],
+    'inventory': [('expiry_day',)],
+}
+
+# أيام الأسبوع بترتيب strftime('%w'): الأحد = 0
+WEEKDAY_NAMES = ["الأحد", "الاثنين", "الثلاثاء", "الأربعاء", "الخميس", "الجمعة", "السبت"]
+
+def key_expression(kind, column):
+    """تعبير SQL للعمود المولد من العمود النصي"""
+    if kind == 'day':
+        return f"CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+    if kind == 'month':
+        return f"CAST(substr({column}, 1, 4) || substr({column}, 6, 2) AS INTEGER)"
+    if kind == 'minute':
+        return f"substr({column}, 1, 2) * 60 + substr({column}, 4, 2)"
+    raise ValueError(f"نوع عمود غير معروف: {kind}")
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+def epoch_day(value):
+    """تاريخ (date أو نص ISO) إلى رقم اليوم كما في أعمدة *_day"""
+    return _as_date(value).toordinal() - EPOCH.toordinal()
+
+def month_key(value):
+    """تاريخ إلى الشهر YYYYMM كما في أعمدة *_month"""
+    value = _as_date(value)
+    return value.year * 100 + value.month
+
+def day_ranges(ranges):
+    """نطاقات تواريخ ISO إلى نطاقات أرقام أيام"""
+    return [(epoch_day(start), epoch_day(end)) for start, end in ranges]
@@ -0,0 +1,59 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+# القوائم الكبيرة تُقرأ بالأعمدة التي تعرضها الصفحات فقط، ثم تُضغط أنواعها في الذاكرة:
+# القيم المتكررة (الحالة، طريقة الدفع، التصنيف، اسم الطبيب ...) category بدل نص لكل صف،
+# والتواريخ category مرتبة فتبقى المقارنة بنص ISO وmax والترتيب كما هي، والأعداد الصحيحة
+# int32. المبالغ تبقى float64 لأن float32 يفقد القروش في المبالغ الكبيرة.
+
+@dataclass
+class FrameMemory:
+    """ذاكرة DataFrame واحد قبل ضغط الأنواع وبعده"""
+    name: str
+    rows: int
+    bytes_before: int
+    bytes_after: int
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_before - self.bytes_after
+
+_collector = threading.local()
+
+@contextmanager
+def memory_report():
+    """جمع تقرير ذاكرة لكل DataFrame يُحمّل داخل الكتلة (في نفس الخيط).
+
+    القياس (memory_usage(deep=True)) يمر على كل نص، فلا يتم إلا داخل هذه الكتلة.
+    """
+    reports = []
+    previous = getattr(_collector, 'reports', None)
+    _collector.reports = reports
+    try:
+        yield reports
+    finally:
+        _collector.reports = previous
+
+def lean_frame(df, name, categories=(), dates=()):
+    """ضغط أنواع أعمدة DataFrame مقروء من قاعدة البيانات وإرجاعه"""
+    reports = getattr(_collector, 'reports', None)
+    before = int(df.memory_usage(deep=True).sum()) if reports is not None else 0
+
+    for column in categories:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in dates:
+        if column in df.columns:
+            values = df[column]
+            df[column] = pd.Categorical(values, categories=sorted(values.dropna().unique()), ordered=True)
+    for column in df.select_dtypes(include='int64').columns:
+        values = df[column]
+        if values.empty or (values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max):
+            df[column] = values.astype('int32')
+
+    if reports is not None:
+        reports.append(FrameMemory(name, len(df), before, int(df.memory_usage(deep=True).sum())))
+    return df
@@ -0,0 +1,500 @@
+import atexit
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from .backup_store import backup_store
+from .change_feed import change_feed
+from .models import db
+from .reference_data import reference_data
+from .sequences import sequence_allocator, voucher_numbers
+
+@dataclass
+class RestoreResult:
+    """نتيجة استعادة لنقطة زمنية"""
+    target_time: str
+    target_seq: int
+    base_backup: str
+    base_seq: int
+    output_path: str
+    replayed: int
+    rows_written: int
+    seconds: float
+    journal_bytes: int
+
+    @property
+    def changes_per_second(self):
+        return self.replayed / self.seconds if self.seconds else 0.0
+
+class ChangeJournal:
+    """سجل دائم لكل تغيير مودع، ومنه الاستعادة لأي لحظة: أقرب نسخة احتياطية + إعادة التغييرات.
+
+    مشغلات changes في models.py تحفظ صورة الصف كاملة (JSON) مع وقت التغيير بتوقيت UTC.
+    الخدمة مستهلك باسم 'journal' في سجل التغييرات: تنقل التغييرات إلى ملف مستقل في مجلد
+    backups ثم تضغط changes، فيبقى السجل الكامل خارج قاعدة العمل. لأن الصور كاملة، حالة كل
+    صف عند اللحظة المطلوبة هي آخر صورة له قبلها، فالإعادة تتم بجملتي SQL لكل جدول بدلاً من
+    تنفيذ التغييرات واحداً واحداً. journal_gaps تحفظ مدى التغييرات الملغاة بعد استبدال
+    القاعدة الحالية بنسخة مستعادة، فلا تدخل في أي استعادة لاحقة.
+    """
+
+    CONSUMER = 'journal'
+
+    def __init__(self, database, poll_seconds=1.0):
+        self.db = database
+        self.poll_seconds = poll_seconds
+        self._ship_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.last_error = None
+
+    @property
+    def journal_path(self):
+        stem = os.path.splitext(os.path.basename(self.db.db_path))[0]
+        return os.path.join(self.db.backup_dir, f"{stem}_journal.db")
+
+    def _connect(self):
+        os.makedirs(self.db.backup_dir, exist_ok=True)
+        conn = sqlite3.connect(self.journal_path)
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY,
+                changed_at TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                data TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_journal_changed_at ON journal (changed_at);
+            CREATE TABLE IF NOT EXISTS journal_gaps (
+                from_seq INTEGER NOT NULL,
+                to_seq INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS journal_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            );
+        ''')
+        return conn
+
+    # ========================
+    # نقل التغييرات إلى السجل
+    # ========================
+
+    def ship(self, batch_size=5000):
+        """نقل التغييرات الجديدة إلى ملف السجل، وإرجاع عددها"""
+        with self._ship_lock:
+            journal = self._connect()
+            try:
+                position = change_feed.register(self.CONSUMER)
+                # بداية تغطية السجل: النسخ الأقدم منها لا تصلح أساساً للاستعادة
+                journal.execute("INSERT OR IGNORE INTO journal_meta (key, value) VALUES ('start_seq', ?)", (position,))
+                journal.commit()
+
+                shipped = 0
+                conn = self.db.get_connection()
+                try:
+                    while True:
+                        rows = conn.execute('''
+                            SELECT seq, changed_at, table_name, row_id, op, data FROM changes
+                            WHERE seq > ? ORDER BY seq LIMIT ?
+                        ''', (position, batch_size)).fetchall()
+                        if not rows:
+                            break
+                        # الإدخال مع التجاهل: إعادة الدفعة بعد توقف مفاجئ لا تكررها
+                        journal.executemany("INSERT OR IGNORE INTO journal VALUES (?, ?, ?, ?, ?, ?)", rows)
+                        journal.commit()
+                        position = rows[-1][0]
+                        change_feed.commit(self.CONSUMER, position)
+                        shipped += len(rows)
+                finally:
+                    conn.close()
+            finally:
+                journal.close()
+            if shipped:
+                change_feed.compact()
+            return shipped
+
+    def start(self):
+        """بدء خيط ينقل التغييرات فور إيداعها (PRAGMA data_version)"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="change-journal", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """إيقاف الخيط بعد نقل آخر التغييرات"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.ship()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db.db_path, check_same_thread=False)
+        try:
+            last_version = None
+            while True:
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version != last_version:
+                    try:
+                        self.ship()
+                        self.last_error = None
+                    except Exception as e:
+                        self.last_error = str(e)
+                        print(f"Change journal error: {e}")
+                    last_version = version
+                if self._stop_event.wait(self.poll_seconds):
+                    break
+        finally:
+            conn.close()
+
+    # ========================
+    # النسخ الأساسية
+    # ========================
+
+    def _gaps(self, journal):
+        return journal.execute("SELECT from_seq, to_seq FROM journal_gaps").fetchall()
+
+    @staticmethod
+    def _in_gap(seq, gaps):
+        return any(from_seq <= seq <= to_seq for from_seq, to_seq in gaps)
+
+    def list_backups(self):
+        """النسخ الاحتياطية في مجلد backups ومستودع النسخ مع base_seq لكل منها، من الأحدث.
+
+        النسخة من المستودع تظهر بالمسار store:<المعرف>.
+        """
+        backups = [(f"store:{manifest['id']}", manifest['base_seq']) for manifest in backup_store.manifests()]
+        if not os.path.isdir(self.db.backup_dir):
+            return backups
+        stem = os.path.splitext(os.path.basename(self.db.db_path))[0]
+        for name in os.listdir(self.db.backup_dir):
+            if not (name.startswith(f"{stem}_backup_") and name.endswith(".db")) or name.endswith("_archive.db"):
+                continue
+            path = os.path.join(self.db.backup_dir, name)
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+            except sqlite3.Error:
+                continue
+            finally:
+                conn.close()
+            backups.append((path, row[0] if row else 0))
+        return sorted(backups, key=lambda backup: backup[1], reverse=True)
+
+    def _base_backup(self, journal, target_seq):
+        """أحدث نسخة يغطي السجل ما بعدها حتى target_seq، ولا تقع في مدى ملغى"""
+        row = journal.execute("SELECT value FROM journal_meta WHERE key = 'start_seq'").fetchone()
+        start_seq = row[0] if row else None
+        gaps = self._gaps(journal)
+        for path, base_seq in self.list_backups():
+            if start_seq is not None and start_seq <= base_seq <= target_seq and not self._in_gap(base_seq, gaps):
+                return path, base_seq
+        raise ValueError("لا توجد نسخة احتياطية قبل هذه اللحظة يغطيها سجل التغييرات")
+
+    # ========================
+    # الاستعادة
+    # ========================
+
+    def restore(self, target_time, output_path=None):
+        """بناء نسخة من القاعدة كما كانت في target_time (نص 'YYYY-MM-DD HH:MM:SS' بتوقيت UTC).
+
+        تُنسخ أقرب نسخة احتياطية قبلها إلى output_path (افتراضياً في مجلد backups) ثم تُطبق
+        آخر صورة لكل صف تغير بعدها. قاعدة الأرشيف تُبنى من أرشيف النسخة نفسها مضافاً إليه ما
+        أُرشف بعدها حتى اللحظة المطلوبة. النسخ الأقدم التي لم يؤخذ الأرشيف معها تستخدم الأرشيف
+        الحالي بدون السجلات التي أُرشفت بعد اللحظة، لأنها كانت وقتها في القاعدة الأساسية.
+        يُفترض أن مخطط الجداول في النسخة الأساسية هو نفسه وقت التغييرات.
+        """
+        self.ship()
+        started = time.perf_counter()
+        journal = self._connect()
+        try:
+            gaps = self._gaps(journal)
+            gap_filter = "NOT EXISTS (SELECT 1 FROM journal_gaps g WHERE seq BETWEEN g.from_seq AND g.to_seq)"
+            row = journal.execute(f"SELECT MAX(seq) FROM journal WHERE changed_at <= ? AND {gap_filter}",
+                                  (target_time,)).fetchone()
+            start_row = journal.execute("SELECT value FROM journal_meta WHERE key = 'start_seq'").fetchone()
+            target_seq = row[0] if row[0] is not None else (start_row[0] if start_row else 0)
+            base_path, base_seq = self._base_backup(journal, target_seq)
+            archive_events = journal.execute(
+                f"SELECT table_name, row_id FROM journal WHERE op = 'archive' AND seq > ? AND {gap_filter}",
+                (target_seq,)
+            ).fetchall()
+        finally:
+            journal.close()
+
+        if output_path is None:
+            stamp = target_time.replace('-', '').replace(':', '').replace(' ', '_')[:15]
+            stem = os.path.splitext(os.path.basename(self.db.db_path))[0]
+            output_path = os.path.join(self.db.backup_dir, f"{stem}_restored_{stamp}.db")
+        archive_output = self.db.archive_path_for(output_path)
+        for path in (output_path, f"{output_path}-wal", f"{output_path}-shm", archive_output):
+            if os.path.exists(path):
+                os.remove(path)
+        if base_path.startswith("store:"):
+            backup_store.restore(base_path[len("store:"):], output_path)
+        else:
+            shutil.copyfile(base_path, output_path)
+            base_archive = self.db.archive_path_for(base_path)
+            if os.path.exists(base_archive):
+                shutil.copyfile(base_archive, archive_output)
+        has_base_archive = os.path.exists(archive_output)
+
+        conn = sqlite3.connect(output_path, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("ATTACH DATABASE ? AS j", (self.journal_path,))
+            if has_base_archive:
+                conn.execute("ATTACH DATABASE ? AS archive", (archive_output,))
+                conn.execute("PRAGMA archive.journal_mode = OFF")
+            conn.execute("BEGIN")
+            # مشغلات قفل الفترات المغلقة وسجل التغييرات تُحذف أثناء الإعادة ثم تُعاد كما كانت.
+            # مشغلات فهرس الأسماء (patients_name_fts) تبقى لتتبع الصفوف المحذوفة والمعادة
+            triggers = [
+                (name, sql) for name, sql in
+                conn.execute("SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger'")
+                if '_period_lock_' in name or '_change_' in name
+            ]
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+
+            conn.execute('''
+                CREATE TEMP TABLE restore_last AS
+                SELECT table_name, row_id, MAX(seq) AS seq FROM j.journal
+                WHERE seq > ? AND seq <= ? AND table_name != '*'
+                  AND NOT EXISTS (SELECT 1 FROM j.journal_gaps g WHERE seq BETWEEN g.from_seq AND g.to_seq)
+                GROUP BY table_name, row_id
+            ''', (base_seq, target_seq))
+            replayed = conn.execute('''
+                SELECT COUNT(*) FROM j.journal
+                WHERE seq > ? AND seq <= ? AND table_name != '*'
+                  AND NOT EXISTS (SELECT 1 FROM j.journal_gaps g WHERE seq BETWEEN g.from_seq AND g.to_seq)
+            ''', (base_seq, target_seq)).fetchone()[0]
+            if has_base_archive:
+                # قبل حذف الصفوف المتغيرة، لأن صورة الصف المؤرشف قد تكون صفه في النسخة نفسها
+                self._replay_archived(conn, base_seq, target_seq)
+
+            # حذف كل الصفوف المتغيرة أولاً ثم إدخال صورها، فلا تتعارض القيود الفريدة مؤقتاً
+            rows_written = 0
+            tables = [row[0] for row in conn.execute("SELECT DISTINCT table_name FROM temp.restore_last")]
+            for table in tables:
+                conn.execute(f"DELETE FROM main.{table} WHERE rowid IN "
+                             f"(SELECT row_id FROM temp.restore_last WHERE table_name = ?)", (table,))
+                columns = [row[1] for row in conn.execute(f"PRAGMA main.table_xinfo({table})") if row[6] == 0]
+                values = ", ".join(f"json_extract(jr.data, '$.{column}')" for column in columns)
+                # rowid صراحة لجداول مفتاحها ليس INTEGER PRIMARY KEY (sequences) حتى تطابق row_id في السجل
+                cursor = conn.execute(f'''
+                    INSERT INTO main.{table} (rowid, {", ".join(columns)})
+                    SELECT r.row_id, {values}
+                    FROM temp.restore_last r JOIN j.journal jr ON jr.seq = r.seq
+                    WHERE r.table_name = ? AND jr.op IN ('insert', 'update')
+                ''', (table,))
+                rows_written += cursor.rowcount
+
+            # سجل التغييرات في النسخة المستعادة يبدأ من اللحظة المطلوبة
+            conn.execute("DELETE FROM main.changes")
+            self._set_change_seq(conn, target_seq)
+            conn.execute("UPDATE main.change_consumers SET last_seq = ?", (target_seq,))
+            # سجل سابق لتسجيل sequences لا يحمل تغييرات العدادات، فتُرفع فوق أرقام السندات المستعادة
+            voucher_numbers.sync(conn)
+            for _, sql in triggers:
+                conn.execute(sql)
+            conn.execute("COMMIT")
+            conn.execute("DETACH DATABASE j")
+            if has_base_archive:
+                conn.execute("DETACH DATABASE archive")
+        finally:
+            conn.close()
+
+        if not has_base_archive and os.path.exists(self.db.archive_path):
+            self._restore_archive(archive_output, archive_events)
+
+        return RestoreResult(
+            target_time=target_time,
+            target_seq=target_seq,
+            base_backup=base_path,
+            base_seq=base_seq,
+            output_path=output_path,
+            replayed=replayed,
+            rows_written=rows_written,
+            seconds=time.perf_counter() - started,
+            journal_bytes=os.path.getsize(self.journal_path)
+        )
+
+    @staticmethod
+    def _set_change_seq(conn, seq):
+        """ضبط آخر رقم في changes حتى لا تتكرر أرقام السجل بعد الاستعادة"""
+        cursor = conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'changes'", (seq,))
+        if cursor.rowcount == 0:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('changes', ?)", (seq,))
+
+    @staticmethod
+    def _replay_archived(conn, base_seq, target_seq):
+        """نقل الصفوف التي أُرشفت بعد النسخة الأساسية وحتى target_seq إلى أرشيف النسخة المستعادة.
+
+        صورة الصف عند أرشفته هي آخر صورة له في السجل قبل حدث الأرشفة، أو صفه في النسخة
+        الأساسية إن لم يتغير بعدها. حذفه من الجداول الحالية يتم مع بقية الصفوف المتغيرة.
+        """
+        gap_filter = "NOT EXISTS (SELECT 1 FROM j.journal_gaps g WHERE seq BETWEEN g.from_seq AND g.to_seq)"
+        conn.execute('''
+            CREATE TEMP TABLE restore_archived (
+                table_name TEXT, row_id INTEGER, seq INTEGER, image_seq INTEGER,
+                PRIMARY KEY (table_name, row_id)
+            )
+        ''')
+        conn.execute(f'''
+            INSERT INTO temp.restore_archived (table_name, row_id, seq)
+            SELECT table_name, row_id, MAX(seq) FROM j.journal
+            WHERE seq > ? AND seq <= ? AND op = 'archive' AND {gap_filter}
+            GROUP BY table_name, row_id
+        ''', (base_seq, target_seq))
+        conn.execute(f'''
+            UPDATE temp.restore_archived SET image_seq = images.seq
+            FROM (
+                SELECT jr.table_name, jr.row_id, MAX(jr.seq) AS seq
+                FROM j.journal jr JOIN temp.restore_archived a USING (table_name, row_id)
+                WHERE jr.seq > ? AND jr.seq < a.seq AND jr.op IN ('insert', 'update')
+                  AND NOT EXISTS (SELECT 1 FROM j.journal_gaps g WHERE jr.seq BETWEEN g.from_seq AND g.to_seq)
+                GROUP BY jr.table_name, jr.row_id
+            ) AS images
+            WHERE images.table_name = restore_archived.table_name AND images.row_id = restore_archived.row_id
+        ''', (base_seq,))
+
+        tables = [row[0] for row in conn.execute("SELECT DISTINCT table_name FROM temp.restore_archived")]
+        for table in tables:
+            # أعمدة جدول الأرشيف قد تنقص عن الحالي إذا أُضيفت أعمدة بعد إنشائه
+            archived = {row[1] for row in conn.execute(f"PRAGMA archive.table_xinfo({table})") if row[6] == 0}
+            columns = [row[1] for row in conn.execute(f"PRAGMA main.table_xinfo({table})")
+                       if row[6] == 0 and row[1] in archived]
+            column_list = ", ".join(columns)
+            values = ", ".join(f"json_extract(jr.data, '$.{column}')" for column in columns)
+            conn.execute(f'''
+                INSERT INTO archive.{table} (rowid, {column_list})
+                SELECT t.rowid, {", ".join(f"t.{column}" for column in columns)}
+                FROM temp.restore_archived a JOIN main.{table} t ON t.rowid = a.row_id
+                WHERE a.table_name = ? AND a.image_seq IS NULL
+            ''', (table,))
+            conn.execute(f'''
+                INSERT INTO archive.{table} (rowid, {column_list})
+                SELECT a.row_id, {values}
+                FROM temp.restore_archived a JOIN j.journal jr ON jr.seq = a.image_seq
+                WHERE a.table_name = ?
+            ''', (table,))
+
+    def _restore_archive(self, archive_output, archive_events):
+        """نسخ قاعدة الأرشيف الحالية بجانب النسخة المستعادة بدون ما أُرشف بعد اللحظة المطلوبة"""
+        source = self.db.get_connection()
+        target = sqlite3.connect(archive_output)
+        try:
+            source.execute("ATTACH DATABASE ? AS archive", (self.db.archive_path,))
+            source.backup(target, name='archive')
+            for table, row_id in archive_events:
+                target.execute(f"DELETE FROM {table} WHERE rowid = ?", (row_id,))
+            target.commit()
+        finally:
+            target.close()
+            source.close()
+
+    def replace_database(self, result):
+        """استبدال القاعدة الحالية (والأرشيف) بنسخة مستعادة، وإرجاع مسار نسخة الأمان.
+
+        قبل الاستبدال تُؤخذ نسخة احتياطية من الحالة الحالية. تغييرات ما بعد اللحظة المستعادة
+        تُسجل مدى ملغى في السجل، ويُضاف تغيير بعلامة '*' ونوع restore لمستهلكي سجل التغييرات.
+        ما تحفظه العملية في ذاكرتها من القاعدة السابقة (كتل العدادات وخرائط الأسماء) يُسقط هنا.
+        """
+        self.ship()
+        safety_backup = self.db.backup_database('pre_restore')
+        if safety_backup is None:
+            raise RuntimeError("تعذر أخذ نسخة أمان قبل الاستبدال")
+        latest_seq = change_feed.latest_seq()
+
+        source = sqlite3.connect(result.output_path)
+        target = self.db.get_connection()
+        try:
+            source.backup(target)
+            self._set_change_seq(target, latest_seq)
+            target.execute("UPDATE change_consumers SET last_seq = ?", (latest_seq,))
+            target.execute('''
+                INSERT INTO changes (table_name, row_id, op, changed_at)
+                VALUES ('*', 0, 'restore', strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            ''')
+            target.commit()
+        finally:
+            target.close()
+            source.close()
+        # الكتل المحجوزة في الذاكرة من عدادات القاعدة السابقة، وأسماء سجلاتها في القوائم
+        sequence_allocator.reset()
+        reference_data.invalidate()
+
+        archive_output = self.db.archive_path_for(result.output_path)
+        if os.path.exists(archive_output):
+            source = sqlite3.connect(archive_output)
+            target = sqlite3.connect(self.db.archive_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+
+        if result.target_seq < latest_seq:
+            journal = self._connect()
+            try:
+                journal.execute("INSERT INTO journal_gaps (from_seq, to_seq) VALUES (?, ?)",
+                                (result.target_seq + 1, latest_seq))
+                journal.commit()
+            finally:
+                journal.close()
+        self.ship()
+        return safety_backup
+
+    # ========================
+    # الحجم والصيانة
+    # ========================
+
+    def stats(self):
+        """حجم السجل وعدد التغييرات ومداها الزمني ومتوسط حجم التغيير"""
+        journal = self._connect()
+        try:
+            entries, oldest, newest = journal.execute(
+                "SELECT COUNT(*), MIN(changed_at), MAX(changed_at) FROM journal").fetchone()
+        finally:
+            journal.close()
+        size = os.path.getsize(self.journal_path)
+        return {
+            'journal_path': self.journal_path,
+            'journal_bytes': size,
+            'entries': entries,
+            'bytes_per_entry': size / entries if entries else 0.0,
+            'oldest': oldest,
+            'newest': newest,
+            'backups': len(self.list_backups())
+        }
+
+    def prune(self):
+        """حذف التغييرات الأقدم من أقدم نسخة احتياطية صالحة، وإرجاع عددها"""
+        journal = self._connect()
+        try:
+            row = journal.execute("SELECT value FROM journal_meta WHERE key = 'start_seq'").fetchone()
+            if row is None:
+                return 0
+            gaps = self._gaps(journal)
+            bases = [base_seq for _, base_seq in self.list_backups()
+                     if base_seq >= row[0] and not self._in_gap(base_seq, gaps)]
+            if not bases:
+                return 0
+            oldest = min(bases)
+            cursor = journal.execute("DELETE FROM journal WHERE seq <= ?", (oldest,))
+            journal.execute("UPDATE journal_meta SET value = ? WHERE key = 'start_seq'", (oldest,))
+            journal.execute("DELETE FROM journal_gaps WHERE to_seq <= ?", (oldest,))
+            journal.commit()
+            journal.execute("VACUUM")
+            return cursor.rowcount
+        finally:
+            journal.close()
+
+change_journal = ChangeJournal(db)
+atexit.register(change_journal.stop)
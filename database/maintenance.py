@@ -0,0 +1,277 @@
+import atexit
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+import pandas as pd
+from .models import db
+
+@dataclass
+class MaintenanceResult:
+    """نتيجة مهمة صيانة واحدة: status هي ok أو skipped أو timeout أو error"""
+    task: str
+    status: str
+    seconds: float
+    bytes_reclaimed: int = 0
+    details: str = ""
+
+class MaintenanceScheduler:
+    """صيانة دورية لقاعدة البيانات في ساعات الهدوء.
+
+    المهام بالترتيب: ANALYZE للجداول التي تغير عدد صفوفها عن آخر إحصاءات ثم PRAGMA optimize،
+    تحويل القاعدة القديمة إلى auto_vacuum=INCREMENTAL (VACUUM مرة واحدة)، incremental_vacuum
+    لإرجاع الصفحات الحرة للنظام، ثم wal_checkpoint(TRUNCATE) إذا كانت القاعدة بوضع WAL.
+    كل تشغيل له حد زمني: progress handler يقطع الجملة الجارية عند تجاوزه (SQLite يتراجع عنها
+    كاملة) وتُسجل المهمة timeout. خيط في الخلفية يشغل الصيانة مرة كل interval_hours داخل
+    نافذة window (ساعات محلية) بعد أن تبقى القاعدة بلا كتابة idle_seconds (PRAGMA data_version).
+    VACUUM الكامل لا يُقطع جزئياً، فيُتخطى في التشغيل المحدود إذا كان حجم الملف لا يسمح بإنهائه
+    في الوقت الباقي (بمعدل vacuum_bytes_per_second)، ويُشغل من الإعدادات بلا حد عبر convert_auto_vacuum.
+    """
+
+    TASKS = ('analyze', 'auto_vacuum', 'incremental_vacuum', 'wal_checkpoint')
+
+    def __init__(self, database, window=(2, 5), interval_hours=20, idle_seconds=300, poll_seconds=60,
+                 time_limit_seconds=300, drift_ratio=0.1, drift_rows=100,
+                 vacuum_bytes_per_second=10 * 1024 * 1024):
+        self.db = database
+        self.window = window
+        self.interval_hours = interval_hours
+        self.idle_seconds = idle_seconds
+        self.poll_seconds = poll_seconds
+        self.time_limit_seconds = time_limit_seconds
+        # إعادة التحليل عند تغير عدد الصفوف بأكثر من النسبة أو العدد
+        self.drift_ratio = drift_ratio
+        self.drift_rows = drift_rows
+        # تقدير متحفظ لسرعة VACUUM على أقراص أجهزة العيادة
+        self.vacuum_bytes_per_second = vacuum_bytes_per_second
+
+        self._run_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.last_error = None
+
+    # ========================
+    # التشغيل
+    # ========================
+
+    def run(self, time_limit_seconds=None, tasks=None):
+        """تشغيل مهام الصيانة الآن خلال الحد الزمني، وتسجيل النتائج وإرجاعها"""
+        deadline = time.monotonic() + (time_limit_seconds or self.time_limit_seconds)
+        run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        results = []
+        with self._run_lock:
+            # autocommit: VACUUM و incremental_vacuum لا يعملان داخل معاملة
+            conn = sqlite3.connect(self.db.db_path, isolation_level=None)
+            try:
+                conn.execute("PRAGMA busy_timeout = 5000")
+                if deadline != math.inf:
+                    conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+                for task in tasks or self.TASKS:
+                    started = time.perf_counter()
+                    if time.monotonic() > deadline:
+                        results.append(MaintenanceResult(task, 'timeout', 0.0, details="لم يبق وقت"))
+                        continue
+                    try:
+                        result = getattr(self, f"_{task}")(conn, deadline)
+                    except sqlite3.OperationalError as e:
+                        status = 'timeout' if 'interrupt' in str(e) else 'error'
+                        result = MaintenanceResult(task, status, 0.0, details=str(e))
+                    result.seconds = time.perf_counter() - started
+                    results.append(result)
+            finally:
+                conn.close()
+            self._log(run_id, results)
+        return results
+
+    def convert_auto_vacuum(self):
+        """التحويل إلى auto_vacuum=INCREMENTAL الآن بلا حد زمني (الكتابة متوقفة حتى ينتهي VACUUM)"""
+        return self.run(time_limit_seconds=math.inf, tasks=('auto_vacuum',))[0]
+
+    def _log(self, run_id, results):
+        conn = self.db.get_connection()
+        try:
+            conn.executemany('''
+                INSERT INTO maintenance_log (run_id, task, status, duration_ms, bytes_reclaimed, details)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(run_id, r.task, r.status, int(r.seconds * 1000), r.bytes_reclaimed, r.details) for r in results])
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ========================
+    # المهام
+    # ========================
+
+    def _analyze(self, conn, deadline):
+        # analysis_limit يجعل ANALYZE يقرأ عينة من كل فهرس بدلاً من كل صفوفه
+        conn.execute("PRAGMA analysis_limit = 1000")
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'").fetchone()
+        # أول رقم في stat هو عدد صفوف الجدول وقت آخر ANALYZE
+        analyzed_rows = {}
+        if has_stats:
+            for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+                analyzed_rows[table] = max(analyzed_rows.get(table, 0), int(stat.split()[0]))
+
+        changed = []
+        for table in tables:
+            rows = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            before = analyzed_rows.get(table)
+            if before is None:
+                if rows:
+                    changed.append(table)
+            elif abs(rows - before) > max(self.drift_rows, before * self.drift_ratio):
+                changed.append(table)
+        for table in changed:
+            conn.execute(f'ANALYZE "{table}"')
+        conn.execute("PRAGMA optimize")
+        return MaintenanceResult('analyze', 'ok', 0.0,
+                                 details=f"{len(changed)} جدول: {', '.join(changed)}" if changed else "الإحصاءات حديثة")
+
+    def _auto_vacuum(self, conn, deadline):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return MaintenanceResult('auto_vacuum', 'skipped', 0.0, details="INCREMENTAL مفعل")
+        # تغيير auto_vacuum لقاعدة فيها جداول يحتاج VACUUM كامل مرة واحدة
+        size_before = self._file_size()
+        needed = size_before / self.vacuum_bytes_per_second
+        remaining = deadline - time.monotonic()
+        if needed > remaining:
+            # قطعه عند الحد يضيع كل ما أنجزه، فلا يُبدأ إذا كان لن ينتهي
+            return MaintenanceResult('auto_vacuum', 'skipped', 0.0,
+                                     details=f"الملف {size_before / (1024 * 1024):,.1f} MB يحتاج نحو {needed:,.0f} ث "
+                                             f"والباقي {remaining:,.0f} ث، يُشغل التحويل من الإعدادات")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return MaintenanceResult('auto_vacuum', 'ok', 0.0, max(0, size_before - self._file_size()),
+                                 details="تم التحويل إلى INCREMENTAL")
+
+    def _incremental_vacuum(self, conn, deadline):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return MaintenanceResult('incremental_vacuum', 'skipped', 0.0, details="auto_vacuum غير مفعل")
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        status = 'ok'
+        # دفعات صغيرة، كل دفعة معاملة مستقلة، فالقطع عند الحد الزمني لا يضيع ما سبقه
+        while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            if time.monotonic() > deadline:
+                status = 'timeout'
+                break
+            try:
+                conn.execute("PRAGMA incremental_vacuum(2000)").fetchall()
+            except sqlite3.OperationalError as e:
+                if 'interrupt' not in str(e):
+                    raise
+                status = 'timeout'
+                break
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return MaintenanceResult('incremental_vacuum', status, 0.0, (free_before - free_after) * page_size,
+                                 details=f"{free_before - free_after:,} صفحة من {free_before:,}")
+
+    def _wal_checkpoint(self, conn, deadline):
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] != 'wal':
+            return MaintenanceResult('wal_checkpoint', 'skipped', 0.0, details="القاعدة ليست بوضع WAL")
+        wal_path = f"{self.db.db_path}-wal"
+        size_before = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        size_after = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        return MaintenanceResult('wal_checkpoint', 'timeout' if busy else 'ok', 0.0,
+                                 max(0, size_before - size_after),
+                                 details="قارئ نشط منع الاقتطاع" if busy else "")
+
+    def _file_size(self):
+        return os.path.getsize(self.db.db_path)
+
+    # ========================
+    # الجدولة
+    # ========================
+
+    def in_window(self, moment=None):
+        """هل الساعة المحلية داخل نافذة الصيانة (تدعم نافذة تعبر منتصف الليل)"""
+        hour = (moment or datetime.now()).hour
+        start, end = self.window
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def is_due(self):
+        """هل مر interval_hours منذ آخر تشغيل"""
+        conn = self.db.get_connection()
+        try:
+            row = conn.execute(
+                "SELECT (julianday('now') - julianday(MAX(started_at))) * 24 FROM maintenance_log").fetchone()
+        finally:
+            conn.close()
+        return row[0] is None or row[0] >= self.interval_hours
+
+    def start(self):
+        """بدء خيط الجدولة"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """إيقاف خيط الجدولة"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        conn = sqlite3.connect(self.db.db_path, check_same_thread=False)
+        try:
+            last_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            idle_since = time.monotonic()
+            while not self._stop_event.wait(self.poll_seconds):
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version != last_version:
+                    last_version = version
+                    idle_since = time.monotonic()
+                    continue
+                if time.monotonic() - idle_since < self.idle_seconds or not self.in_window():
+                    continue
+                try:
+                    if self.is_due():
+                        self.run()
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = str(e)
+                    print(f"Database maintenance error: {e}")
+        finally:
+            conn.close()
+
+    # ========================
+    # العرض
+    # ========================
+
+    def status(self):
+        """حالة المساحة والإحصاءات لعرضها في الإعدادات"""
+        conn = self.db.get_connection()
+        try:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            return {
+                'file_bytes': self._file_size(),
+                'free_bytes': conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+                'auto_vacuum': {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}[conn.execute("PRAGMA auto_vacuum").fetchone()[0]],
+                'journal_mode': conn.execute("PRAGMA journal_mode").fetchone()[0],
+            }
+        finally:
+            conn.close()
+
+    def history(self, limit=50):
+        """آخر نتائج الصيانة"""
+        conn = self.db.get_connection()
+        try:
+            return pd.read_sql_query('''
+                SELECT run_id, task, status, duration_ms, bytes_reclaimed, details, started_at
+                FROM maintenance_log ORDER BY id DESC LIMIT ?
+            ''', conn, params=(limit,))
+        finally:
+            conn.close()
+
+maintenance = MaintenanceScheduler(db)
+atexit.register(maintenance.stop)
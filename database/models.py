@@ -2,17 +2,32 @@ import sqlite3
 from datetime import datetime, date
 import os
 from datetime import timedelta
+import re
+from .arabic_text import NAME_SEARCH_TABLES, normalize_name
+from .money import MONEY_COLUMNS, PIASTERS_PER_POUND
+from .date_keys import DATE_KEY_COLUMNS, DATE_KEY_INDEXES, key_expression
 
 class Database:
     _instance = None
     
-    def __new__(cls, db_path="clinic.db"):
+    def __new__(cls, db_path=None):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
-            cls._instance.db_path = db_path
+            # CLINIC_DB_PATH يسمح بتشغيل التطبيق والأدوات على قاعدة بيانات أخرى
+            cls._instance.db_path = db_path or os.environ.get("CLINIC_DB_PATH", "clinic.db")
+            cls._instance.archive_path = os.environ.get("CLINIC_ARCHIVE_DB_PATH",
+                                                        cls.archive_path_for(cls._instance.db_path))
             cls._instance._initialized = False
+            # تعريفات views السجل الكامل المؤقتة، تُبنى مرة في initialize (راجع attach_archive)
+            cls._instance._archive_views = ()
         return cls._instance
     
+    @staticmethod
+    def archive_path_for(db_path):
+        """مسار قاعدة الأرشيف بجانب قاعدة أساسية (clinic.db -> clinic_archive.db)، ولنسخها كذلك"""
+        root, ext = os.path.splitext(db_path)
+        return f"{root}_archive{ext or '.db'}"
+
     def initialize(self):
         """إنشاء قاعدة البيانات والجداول إذا لم تكن موجودة"""
         if not self._initialized:
@@ -20,6 +35,10 @@ class Database:
                 with sqlite3.connect(self.db_path) as conn:
                     conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
                     cursor = conn.cursor()
+
+                    # القاعدة الجديدة تُنشأ بتفريغ تدريجي للصفحات الحرة، والقديمة تُحوّل في الصيانة
+                    if cursor.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone() is None:
+                        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
                     
                     # جدول الأطباء
                     cursor.execute('''
@@ -31,7 +50,7 @@ class Database:
                             email TEXT,
                             address TEXT,
                             hire_date DATE,
-                            salary REAL,
+                            salary INTEGER,
                             commission_rate REAL DEFAULT 0.0,
                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                         )
@@ -59,7 +78,7 @@ class Database:
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             name TEXT NOT NULL,
                             description TEXT,
-                            base_price REAL NOT NULL,
+                            base_price INTEGER NOT NULL,
                             duration_minutes INTEGER,
                             category TEXT,
                             is_active BOOLEAN DEFAULT 1,
@@ -78,7 +97,7 @@ class Database:
                             appointment_time TIME NOT NULL,
                             status TEXT DEFAULT 'مجدول',
                             notes TEXT,
-                            total_cost REAL,
+                            total_cost INTEGER,
                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                             FOREIGN KEY (patient_id) REFERENCES patients (id),
                             FOREIGN KEY (doctor_id) REFERENCES doctors (id),
@@ -92,7 +111,7 @@ class Database:
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             appointment_id INTEGER,
                             patient_id INTEGER NOT NULL,
-                            amount REAL NOT NULL,
+                            amount INTEGER NOT NULL,
                             payment_method TEXT NOT NULL,
                             payment_date DATE NOT NULL,
                             status TEXT DEFAULT 'مكتمل',
@@ -139,7 +158,7 @@ class Database:
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             category TEXT NOT NULL,
                             description TEXT NOT NULL,
-                            amount REAL NOT NULL,
+                            amount INTEGER NOT NULL,
                             expense_date DATE NOT NULL,
                             payment_method TEXT,
                             receipt_number TEXT,
@@ -163,21 +182,557 @@ class Database:
                         )
                     ''')
                     
+                    # المبالغ بالقرش في قواعد البيانات الأقدم
+                    self.migrate_money_columns(conn, cursor)
+
+                    # سجل الأنشطة
+                    self.create_activity_log_tables(cursor)
+
+                    # إعدادات العيادة والإشعارات
+                    self.create_settings_tables(cursor)
+
+                    # الجداول المالية
+                    self.create_financial_tables(cursor)
+                    
                     # إضافة بيانات تجريبية
                     self.add_sample_data(conn, cursor)
+
+                    # أعمدة البحث بالأسماء
+                    self.create_search_columns(conn, cursor)
+
+                    # أعمدة التواريخ الرقمية للنطاقات والتجميع
+                    self.create_date_key_columns(cursor)
+
+                    # سجل المريض الكامل، وفحص الدفعات المرتبطة بالموعد قبل أرشفته
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments (patient_id, appointment_day)")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_appointment ON payments (appointment_id)")
+
+                    # سجل التغييرات للمستهلكين (CDC) بعد كل الأعمدة لأن صور الصفوف تشملها
+                    self.create_change_feed(cursor)
+
+                    # سجل النسخ الاحتياطي
+                    cursor.execute('''
+                        CREATE TABLE IF NOT EXISTS backup_log (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            backup_type TEXT NOT NULL,
+                            backup_path TEXT,
+                            status TEXT NOT NULL,
+                            base_seq INTEGER,
+                            notes TEXT,
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    ''')
+
+                    # سجل الصيانة الدورية (راجع maintenance.py)
+                    cursor.execute('''
+                        CREATE TABLE IF NOT EXISTS maintenance_log (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            run_id TEXT NOT NULL,
+                            task TEXT NOT NULL,
+                            status TEXT NOT NULL,
+                            duration_ms INTEGER,
+                            bytes_reclaimed INTEGER DEFAULT 0,
+                            details TEXT,
+                            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    ''')
+                    # جداول الأرشيف و views السجل الكامل مرة واحدة، والاتصالات بعدها تربط الأرشيف فقط
+                    self.prepare_archive(conn)
                     self._initialized = True
             except sqlite3.Error as e:
                 print(f"Database initialization error: {e}")
                 raise
     
+    def create_settings_tables(self, cursor):
+        """إعدادات العيادة (مفتاح/قيمة) والإشعارات"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                notification_type TEXT NOT NULL,
+                title TEXT NOT NULL,
+                message TEXT,
+                priority TEXT DEFAULT 'normal',
+                is_read INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # الشريط الجانبي يقرأ آخر غير المقروء في كل تشغيل
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_unread ON notifications (is_read, id)")
+
+    # أعمدة فلاتر البحث في صفحة سجل الأنشطة
+    ACTIVITY_LOG_FILTER_COLUMNS = ('action', 'table_name', 'user_name')
+
+    def create_activity_log_tables(self, cursor):
+        """إنشاء سجل الأنشطة الحالي وسجل أقسامه الشهرية المؤرشفة"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activity_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                action TEXT NOT NULL,
+                table_name TEXT,
+                record_id INTEGER,
+                details TEXT,
+                user_name TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self._create_activity_log_indexes(cursor, 'activity_log')
+
+        # الأنشطة القديمة تُنقل إلى جداول شهرية activity_log_YYYYMM مسجلة هنا
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activity_log_partitions (
+                period TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                min_id INTEGER,
+                max_id INTEGER,
+                row_count INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # قيم فلاتر البحث (النشاط والجدول والمستخدم) في كل قسم، تُجمع عند الأرشفة حتى لا
+        # تُمسح كل الأقسام لعرض قوائم الفلاتر
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activity_log_partition_values (
+                column_name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                period TEXT NOT NULL,
+                PRIMARY KEY (column_name, value, period)
+            ) WITHOUT ROWID
+        ''')
+        # الأقسام المؤرشفة قبل إضافة الجدول
+        pending = cursor.execute('''
+            SELECT period, table_name FROM activity_log_partitions p
+            WHERE NOT EXISTS (SELECT 1 FROM activity_log_partition_values v
+                              WHERE v.column_name = 'action' AND v.period = p.period)
+        ''').fetchall()
+        for period, table in pending:
+            for column in self.ACTIVITY_LOG_FILTER_COLUMNS:
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO activity_log_partition_values (column_name, value, period)
+                    SELECT DISTINCT ?, {column}, ? FROM {table} WHERE {column} IS NOT NULL
+                ''', (column, period))
+
+    def create_activity_log_partition(self, cursor, period):
+        """إنشاء قسم شهري لسجل الأنشطة (period بصيغة YYYY-MM) وإرجاع اسم جدوله"""
+        table = f"activity_log_{period.replace('-', '')}"
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                action TEXT NOT NULL,
+                table_name TEXT,
+                record_id INTEGER,
+                details TEXT,
+                user_name TEXT,
+                created_at TIMESTAMP
+            )
+        ''')
+        self._create_activity_log_indexes(cursor, table)
+        return table
+
+    def _create_activity_log_indexes(self, cursor, table):
+        """فهارس البحث في سجل الأنشطة (تُستخدم للجدول الحالي ولكل قسم)"""
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table} (created_at)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_action ON {table} (action)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_table_record ON {table} (table_name, record_id)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_user ON {table} (user_name)")
+
+    def create_financial_tables(self, cursor):
+        """إنشاء جداول الحسابات والحركات المالية"""
+        # جدول الحسابات - صف الرصيد الحالي لكل حساب
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS accounts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                account_type TEXT NOT NULL,
+                account_holder_id INTEGER NOT NULL,
+                account_holder_name TEXT NOT NULL,
+                total_dues REAL DEFAULT 0.0,
+                total_paid REAL DEFAULT 0.0,
+                balance REAL DEFAULT 0.0,
+                last_transaction_date DATE,
+                notes TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # جدول الحركات المالية - كل حركة تحمل الرصيد الجاري للحساب بعدها
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS financial_transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                account_id INTEGER NOT NULL,
+                transaction_type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                running_balance REAL NOT NULL DEFAULT 0.0,
+                description TEXT,
+                reference_type TEXT,
+                reference_id INTEGER,
+                transaction_date DATE NOT NULL,
+                payment_method TEXT,
+                receipt_number TEXT,
+                notes TEXT,
+                created_by TEXT DEFAULT 'النظام',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (account_id) REFERENCES accounts (id)
+            )
+        ''')
+        
+        # قواعد بيانات أقدم أُنشئت قبل عمود الرصيد الجاري
+        if self._add_column_if_missing(cursor, 'financial_transactions', 'running_balance', 'REAL NOT NULL DEFAULT 0.0'):
+            self._rebuild_running_balances(cursor)
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_accounts_holder ON accounts (account_type, account_holder_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_financial_transactions_account ON financial_transactions (account_id, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_financial_transactions_date ON financial_transactions (transaction_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_date ON payments (payment_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (expense_date)")
+
+        # جدول سندات القبض والصرف
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vouchers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                voucher_type TEXT NOT NULL,
+                voucher_number TEXT UNIQUE NOT NULL,
+                account_id INTEGER,
+                amount REAL NOT NULL,
+                payment_method TEXT,
+                description TEXT,
+                voucher_date DATE NOT NULL,
+                created_by TEXT,
+                approved_by TEXT,
+                status TEXT DEFAULT 'pending',
+                notes TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (account_id) REFERENCES accounts (id)
+            )
+        ''')
+
+        # عدادات الأرقام التسلسلية (أرقام السندات وغيرها)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sequences (
+                name TEXT PRIMARY KEY,
+                next_value INTEGER NOT NULL DEFAULT 1
+            )
+        ''')
+
+        self.create_period_tables(cursor)
+
+    # الجداول المقيدة بالفترات المقفلة وعمود التاريخ في كل منها
+    PERIOD_LOCKED_TABLES = {
+        'payments': 'payment_date',
+        'expenses': 'expense_date',
+        'financial_transactions': 'transaction_date'
+    }
+
+    def create_period_tables(self, cursor):
+        """إنشاء جداول إقفال الفترات المحاسبية ولقطات أرصدتها"""
+        # الفترات المقفلة (شهر بصيغة YYYY-MM)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS accounting_periods (
+                period TEXT PRIMARY KEY,
+                closed_by TEXT,
+                closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # إجماليات كل حساب في الفترة المقفلة
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS period_account_snapshots (
+                period TEXT NOT NULL,
+                account_id INTEGER NOT NULL,
+                total_dues REAL DEFAULT 0.0,
+                total_paid REAL DEFAULT 0.0,
+                closing_balance REAL DEFAULT 0.0,
+                dues_count INTEGER DEFAULT 0,
+                paid_count INTEGER DEFAULT 0,
+                PRIMARY KEY (period, account_id),
+                FOREIGN KEY (period) REFERENCES accounting_periods (period),
+                FOREIGN KEY (account_id) REFERENCES accounts (id)
+            )
+        ''')
+
+        # إجماليات الإيرادات حسب طريقة الدفع في الفترة المقفلة
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS period_payment_method_snapshots (
+                period TEXT NOT NULL,
+                payment_method TEXT NOT NULL,
+                total INTEGER DEFAULT 0,
+                count INTEGER DEFAULT 0,
+                PRIMARY KEY (period, payment_method),
+                FOREIGN KEY (period) REFERENCES accounting_periods (period)
+            )
+        ''')
+
+        # إجماليات المصروفات حسب الفئة في الفترة المقفلة
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS period_expense_category_snapshots (
+                period TEXT NOT NULL,
+                category TEXT NOT NULL,
+                total INTEGER DEFAULT 0,
+                count INTEGER DEFAULT 0,
+                PRIMARY KEY (period, category),
+                FOREIGN KEY (period) REFERENCES accounting_periods (period)
+            )
+        ''')
+
+        # أعلام تضيفها عملية صيانة داخل معاملتها لتتجاوز مشغلات الإقفال (الأرشفة مثلاً)، وتحذفها
+        # قبل الالتزام فلا تراها الاتصالات الأخرى، وبدون تعديل المخطط نفسه
+        cursor.execute("CREATE TABLE IF NOT EXISTS maintenance_flags (name TEXT PRIMARY KEY)")
+
+        # منع الإضافة والتعديل والحذف داخل فترة مقفلة
+        for table, date_column in self.PERIOD_LOCKED_TABLES.items():
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_period_lock_insert
+                BEFORE INSERT ON {table}
+                WHEN EXISTS (SELECT 1 FROM accounting_periods WHERE period = substr(NEW.{date_column}, 1, 7))
+                BEGIN
+                    SELECT RAISE(ABORT, 'الفترة المحاسبية مقفلة');
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_period_lock_update
+                BEFORE UPDATE ON {table}
+                WHEN EXISTS (SELECT 1 FROM accounting_periods
+                             WHERE period IN (substr(OLD.{date_column}, 1, 7), substr(NEW.{date_column}, 1, 7)))
+                BEGIN
+                    SELECT RAISE(ABORT, 'الفترة المحاسبية مقفلة');
+                END
+            ''')
+            # النقل للأرشيف ليس تعديلاً على فترة مقفلة
+            self._create_trigger(
+                cursor, f"trg_{table}_period_lock_delete",
+                f"CREATE TRIGGER trg_{table}_period_lock_delete BEFORE DELETE ON {table} "
+                f"WHEN EXISTS (SELECT 1 FROM accounting_periods WHERE period = substr(OLD.{date_column}, 1, 7)) "
+                f"AND NOT EXISTS (SELECT 1 FROM maintenance_flags WHERE name = 'archive') "
+                f"BEGIN SELECT RAISE(ABORT, 'الفترة المحاسبية مقفلة'); END"
+            )
+    
+    # الجداول التي تُسجل تغييراتها في changes. سجل الأنشطة وأقسامه سجل إضافة فقط يُقرأ بالمعرف،
+    # والإشعارات تنبيهات مؤقتة تُولد من البيانات نفسها.
+    # sequences مسجلة حتى تعود عدادات السندات مع vouchers عند الاستعادة لنقطة زمنية
+    CHANGE_TRACKED_TABLES = (
+        'doctors', 'patients', 'treatments', 'appointments', 'payments', 'inventory', 'suppliers', 'expenses',
+        'inventory_usage', 'accounts', 'financial_transactions', 'vouchers', 'sequences', 'accounting_periods',
+        'period_account_snapshots', 'period_payment_method_snapshots', 'period_expense_category_snapshots',
+        'settings'
+    )
+
+    def create_change_feed(self, cursor):
+        """جدول التغييرات ومشغلاته وجدول مواضع المستهلكين (راجع change_feed.py).
+
+        كل إضافة أو تعديل أو حذف في جدول متتبع يضيف صفاً (table_name, row_id, op) برقم seq
+        متزايد داخل نفس معاملة التغيير، فترتيب seq هو ترتيب الإيداع. الإضافة والتعديل يحفظان
+        صورة الصف بعد التغيير (JSON) في data، ومنها يُعاد بناء القاعدة لأي لحظة (راجع journal.py).
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                data TEXT,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self._add_column_if_missing(cursor, 'changes', 'data', 'TEXT')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_consumers (
+                name TEXT PRIMARY KEY,
+                last_seq INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        for table in self.CHANGE_TRACKED_TABLES:
+            # الأعمدة المولدة (hidden != 0) تُحسب عند الاستعادة ولا تدخل في الصورة
+            columns = [row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table})") if row[6] == 0]
+            image = "json_object(" + ", ".join(f"'{column}', NEW.{column}" for column in columns) + ")"
+            for op, row, data in (('insert', 'NEW', image), ('update', 'NEW', image), ('delete', 'OLD', 'NULL')):
+                name = f"trg_{table}_change_{op}"
+                sql = (f"CREATE TRIGGER {name} AFTER {op.upper()} ON {table} BEGIN "
+                       f"INSERT INTO changes (table_name, row_id, op, data, changed_at) VALUES "
+                       f"('{table}', {row}.rowid, '{op}', {data}, strftime('%Y-%m-%d %H:%M:%f', 'now')); END")
+                # يُعاد إنشاء المشغل إذا تغيرت أعمدة الجدول
+                self._create_trigger(cursor, name, sql)
+
+    def _create_trigger(self, cursor, name, sql):
+        """إنشاء مشغل، أو إعادة إنشائه إذا اختلف تعريفه المحفوظ عن sql"""
+        existing = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                  (name,)).fetchone()
+        if existing and existing[0] == sql:
+            return
+        if existing:
+            cursor.execute(f"DROP TRIGGER {name}")
+        cursor.execute(sql)
+
+    def create_search_columns(self, conn, cursor):
+        """عمود الاسم الموحد وفهرسه للبحث ببداية الاسم وللترتيب حسب الاسم.
+
+        القيمة تُحسب مرة واحدة عند الكتابة، فالقوائم المرتبة تقرأ الفهرس بترتيبه بدون خطوة فرز.
+        """
+        conn.create_function("normalize_name", 1, normalize_name, deterministic=True)
+        for table in NAME_SEARCH_TABLES:
+            self._add_column_if_missing(cursor, table, 'name_search', 'TEXT')
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_name_search ON {table} (name_search)")
+            # تعبئة الصفوف القديمة أو المضافة بدون العمود
+            cursor.execute(f"UPDATE {table} SET name_search = normalize_name(name) WHERE name_search IS NULL")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_patients_phone ON patients (phone)")
+
+        # فهرس كلمات الاسم الموحد (FTS5 بمحتوى خارجي) للبحث ببداية أي كلمة في الاسم،
+        # تتبعه المشغلات مع كل إضافة وتعديل وحذف أياً كان مصدرها (CRUD أو الاستيراد أو الاستعادة)
+        created = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'patients_name_fts'").fetchone() is None
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS patients_name_fts "
+            "USING fts5(name_search, content='patients', content_rowid='id')"
+        )
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_patients_name_fts_insert AFTER INSERT ON patients BEGIN
+                INSERT INTO patients_name_fts (rowid, name_search) VALUES (NEW.id, NEW.name_search);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_patients_name_fts_delete AFTER DELETE ON patients BEGIN
+                INSERT INTO patients_name_fts (patients_name_fts, rowid, name_search) VALUES ('delete', OLD.id, OLD.name_search);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_patients_name_fts_update AFTER UPDATE OF name_search ON patients BEGIN
+                INSERT INTO patients_name_fts (patients_name_fts, rowid, name_search) VALUES ('delete', OLD.id, OLD.name_search);
+                INSERT INTO patients_name_fts (rowid, name_search) VALUES (NEW.id, NEW.name_search);
+            END
+        ''')
+        if created:
+            cursor.execute("INSERT INTO patients_name_fts (patients_name_fts) VALUES ('rebuild')")
+    
+    def create_date_key_columns(self, cursor):
+        """أعمدة مولدة (VIRTUAL) لرقم اليوم والشهر والدقيقة مع فهارسها.
+
+        قيمها تُحسب من الأعمدة النصية ولا تُخزن في الجدول، لكنها تُخزن في الفهارس،
+        فلا تحتاج الجداول القديمة إعادة بناء ولا يحتاج كود الإدخال أي تغيير.
+        """
+        for table, columns in DATE_KEY_COLUMNS.items():
+            for column, (kind, source) in columns.items():
+                self._add_column_if_missing(
+                    cursor, table, column,
+                    f"INTEGER GENERATED ALWAYS AS ({key_expression(kind, source)}) VIRTUAL"
+                )
+            for index_columns in DATE_KEY_INDEXES[table]:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(index_columns)} "
+                               f"ON {table} ({', '.join(index_columns)})")
+
+    def migrate_money_columns(self, conn, cursor):
+        """تحويل أعمدة المبالغ من REAL بالجنيه إلى INTEGER بالقرش (مرة واحدة لكل جدول).
+
+        SQLite لا يغير نوع عمود، فيُعاد بناء الجدول: جدول جديد بنفس التعريف بعد تغيير
+        النوع، نسخ البيانات مع التحويل، ثم استبدال القديم وإعادة فهارسه ومشغلاته.
+        """
+        pending = {}
+        for table, columns in MONEY_COLUMNS.items():
+            types = {row[1]: row[2].upper() for row in cursor.execute(f"PRAGMA table_info({table})")}
+            real_columns = [column for column in columns if types.get(column) == 'REAL']
+            if real_columns:
+                pending[table] = (real_columns, list(types))
+        if not pending:
+            return
+
+        # DROP TABLE مع تفعيل المفاتيح الأجنبية يحذف الصفوف أولاً ويفشل بسبب الجداول المرتبطة
+        conn.commit()
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for table, (real_columns, all_columns) in pending.items():
+                self._rebuild_money_table(cursor, table, real_columns, all_columns)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("PRAGMA foreign_keys = ON")
+
+    def _rebuild_money_table(self, cursor, table, real_columns, all_columns):
+        create_sql = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        dependents = [row[0] for row in cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+            (table,)
+        )]
+        has_sequence = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone()
+        sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone() if has_sequence else None
+
+        new_table = f"{table}_money_migration"
+        new_sql = re.sub(rf"^CREATE TABLE\s+(IF NOT EXISTS\s+)?[\"'`\[]?{table}[\"'`\]]?",
+                         f"CREATE TABLE {new_table}", create_sql.strip(), flags=re.IGNORECASE)
+        for column in real_columns:
+            new_sql = re.sub(rf"\b{column}\s+REAL\b", f"{column} INTEGER", new_sql, flags=re.IGNORECASE)
+            new_sql = re.sub(rf"(\b{column}\s+INTEGER\b[^,]*?DEFAULT\s+)0\.0\b", r"\g<1>0", new_sql, flags=re.IGNORECASE)
+        cursor.execute(f"DROP TABLE IF EXISTS {new_table}")
+        cursor.execute(new_sql)
+
+        select_list = ', '.join(
+            f"CAST(ROUND({column} * {PIASTERS_PER_POUND}) AS INTEGER)" if column in real_columns else column
+            for column in all_columns
+        )
+        cursor.execute(f"INSERT INTO {new_table} ({', '.join(all_columns)}) SELECT {select_list} FROM {table}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        for sql in dependents:
+            cursor.execute(sql)
+        if sequence:
+            cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+
+    def _add_column_if_missing(self, cursor, table, column, definition):
+        """إضافة عمود لجدول موجود إذا لم يكن موجوداً، وإرجاع True إذا تمت الإضافة"""
+        # table_xinfo تشمل الأعمدة المولدة التي لا تظهر في table_info
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table})")]
+        if column in columns:
+            return False
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    
+    def _rebuild_running_balances(self, cursor):
+        """إعادة حساب الرصيد الجاري لكل الحركات وصف الرصيد لكل حساب (مرة واحدة عند الترحيل)"""
+        paid_types = "('payment', 'withdrawal')"
+        # UPDATE ... FROM يحسب النافذة مرة واحدة بدلاً من استعلام فرعي لكل صف
+        cursor.execute(f'''
+            UPDATE financial_transactions
+            SET running_balance = ledger.balance_after
+            FROM (
+                SELECT id, SUM(CASE WHEN transaction_type IN {paid_types} THEN -amount ELSE amount END)
+                       OVER (PARTITION BY account_id ORDER BY id) AS balance_after
+                FROM financial_transactions
+            ) AS ledger
+            WHERE ledger.id = financial_transactions.id
+        ''')
+        cursor.execute(f'''
+            UPDATE accounts SET
+                total_dues = COALESCE(totals.dues, 0),
+                total_paid = COALESCE(totals.paid, 0),
+                balance = COALESCE(totals.dues, 0) - COALESCE(totals.paid, 0),
+                last_transaction_date = totals.last_date
+            FROM (
+                SELECT account_id, MAX(transaction_date) AS last_date,
+                       SUM(CASE WHEN transaction_type NOT IN {paid_types} THEN amount ELSE 0 END) AS dues,
+                       SUM(CASE WHEN transaction_type IN {paid_types} THEN amount ELSE 0 END) AS paid
+                FROM financial_transactions
+                GROUP BY account_id
+            ) AS totals
+            WHERE totals.account_id = accounts.id
+        ''')
+    
     def add_sample_data(self, conn, cursor):
         """إضافة بيانات تجريبية"""
         cursor.execute("SELECT COUNT(*) FROM doctors")
         if cursor.fetchone()[0] == 0:
             # أطباء
             sample_doctors = [
-                ("د. أحمد محمد", "طب الأسنان العام", "01234567890", "ahmed@clinic.com", "القاهرة", "2023-01-01", 15000.0, 10.0),
-                ("د. فاطمة علي", "تقويم الأسنان", "01234567891", "fatma@clinic.com", "الجيزة", "2023-02-01", 18000.0, 15.0)
+                ("د. أحمد محمد", "طب الأسنان العام", "01234567890", "ahmed@clinic.com", "القاهرة", "2023-01-01", 1500000, 10.0),
+                ("د. فاطمة علي", "تقويم الأسنان", "01234567891", "fatma@clinic.com", "الجيزة", "2023-02-01", 1800000, 15.0)
             ]
             cursor.executemany('INSERT INTO doctors (name, specialization, phone, email, address, hire_date, salary, commission_rate) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', sample_doctors)
             
@@ -190,8 +745,8 @@ class Database:
             
             # علاجات
             sample_treatments = [
-                ("فحص وتنظيف", "فحص شامل وتنظيف الأسنان", 200.0, 60, "وقائي"),
-                ("حشو عادي", "حشو الأسنان", 300.0, 45, "علاجي")
+                ("فحص وتنظيف", "فحص شامل وتنظيف الأسنان", 20000, 60, "وقائي"),
+                ("حشو عادي", "حشو الأسنان", 30000, 45, "علاجي")
             ]
             cursor.executemany('INSERT INTO treatments (name, description, base_price, duration_minutes, category) VALUES (?, ?, ?, ?, ?)', sample_treatments)
             
@@ -199,9 +754,13 @@ class Database:
             today = date.today().isoformat()  # Explicitly using date.today() for clarity
             tomorrow = (date.today() + timedelta(days=1)).isoformat()
             cursor.execute('INSERT INTO appointments (patient_id, doctor_id, treatment_id, appointment_date, appointment_time, total_cost) VALUES (?, ?, ?, ?, ?, ?)',
-                          (1, 1, 1, today, "10:00", 200.0))
+                          (1, 1, 1, today, "10:00", 20000))
             cursor.execute('INSERT INTO appointments (patient_id, doctor_id, treatment_id, appointment_date, appointment_time, total_cost) VALUES (?, ?, ?, ?, ?, ?)',
-                          (2, 2, 2, tomorrow, "14:00", 300.0))
+                          (2, 2, 2, tomorrow, "14:00", 30000))
+            
+            # موردين
+            cursor.execute('INSERT INTO suppliers (name, contact_person, phone, email, address, payment_terms) VALUES (?, ?, ?, ?, ?, ?)',
+                          ("شركة المستلزمات", "علي عبدالله", "01234567894", "supplies@co.com", "القاهرة", "آجل 30 يوم"))
             
             # مخزون
             sample_inventory = [
@@ -210,17 +769,149 @@ class Database:
             ]
             cursor.executemany('INSERT INTO inventory (item_name, category, quantity, unit_price, min_stock_level, supplier_id, expiry_date) VALUES (?, ?, ?, ?, ?, ?, ?)', sample_inventory)
             
-            # موردين
-            cursor.execute('INSERT INTO suppliers (name, contact_person, phone, email, address, payment_terms) VALUES (?, ?, ?, ?, ?, ?)',
-                          ("شركة المستلزمات", "علي عبدالله", "01234567894", "supplies@co.com", "القاهرة", "آجل 30 يوم"))
-            
             # مصروفات
             cursor.execute('INSERT INTO expenses (category, description, amount, expense_date, payment_method) VALUES (?, ?, ?, ?, ?)',
-                          ("رواتب", "راتب أطباء", 30000.0, today, "تحويل بنكي"))
+                          ("رواتب", "راتب أطباء", 3000000, today, "تحويل بنكي"))
     
-    def get_connection(self):
-        """الحصول على اتصال بقاعدة البيانات"""
-        return sqlite3.connect(self.db_path)
+    @property
+    def backup_dir(self):
+        """مجلد النسخ الاحتياطية بجانب قاعدة البيانات"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), "backups")
+
+    def backup_database(self, backup_type="manual"):
+        """نسخة كاملة متسقة من القاعدة أثناء عملها (sqlite3 backup API) في مجلد backups.
+
+        قاعدة الأرشيف تُنسخ معها بجانبها (archive_path_for) من نفس لحظة القراءة، لأن السجلات
+        القديمة موجودة فيها فقط. تُسجل في backup_log مع base_seq: آخر تغيير في سجل التغييرات
+        داخل النسخة، ومنه تبدأ إعادة تشغيل سجل journal عند الاستعادة لنقطة زمنية. ترجع مسار
+        النسخة أو None عند الفشل.
+        """
+        os.makedirs(self.backup_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        backup_path = os.path.join(self.backup_dir, f"{stem}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.db")
+        conn = self.get_connection()
+        try:
+            base_seq = self.snapshot(conn, backup_path, self.archive_path_for(backup_path))
+            conn.execute("INSERT INTO backup_log (backup_type, backup_path, status, base_seq) VALUES (?, ?, 'success', ?)",
+                         (backup_type, backup_path, base_seq))
+            conn.commit()
+            return backup_path
+        except (sqlite3.Error, OSError) as e:
+            print(f"Backup error: {e}")
+            conn.execute("INSERT INTO backup_log (backup_type, backup_path, status, notes) VALUES (?, ?, 'failed', ?)",
+                         (backup_type, backup_path, str(e)))
+            conn.commit()
+            return None
+        finally:
+            conn.close()
+
+    def snapshot(self, conn, path, archive_path):
+        """نسخ القاعدة إلى path وقاعدة الأرشيف (إن وجدت) إلى archive_path من نفس اللحظة.
+
+        قراءة من القاعدتين داخل معاملة واحدة تثبت قفل القراءة على الاثنتين قبل النسخ، فلا تقع
+        دفعة أرشفة بين نسختيهما. ترجع base_seq للنسخة.
+        """
+        has_archive = os.path.exists(self.archive_path)
+        if has_archive:
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        try:
+            conn.execute("BEGIN")
+            conn.execute("SELECT 1 FROM main.sqlite_master LIMIT 1").fetchall()
+            if has_archive:
+                conn.execute("SELECT 1 FROM archive.sqlite_master LIMIT 1").fetchall()
+            target = sqlite3.connect(path)
+            try:
+                conn.backup(target, name='main')
+                row = target.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+                base_seq = row[0] if row else 0
+            finally:
+                target.close()
+            if has_archive:
+                target = sqlite3.connect(archive_path)
+                try:
+                    conn.backup(target, name='archive')
+                finally:
+                    target.close()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if has_archive:
+                conn.execute("DETACH DATABASE archive")
+        return base_seq
+
+    # الجداول التي تُنقل صفوفها القديمة إلى قاعدة الأرشيف -> عمود التاريخ
+    ARCHIVED_TABLES = {
+        'appointments': 'appointment_date',
+        'payments': 'payment_date',
+        'expenses': 'expense_date'
+    }
+
+    def get_connection(self, archive=False):
+        """الحصول على اتصال بقاعدة البيانات.
+
+        archive=True يربط قاعدة الأرشيف باسم archive ويعرّف لكل جدول مؤرشف view مؤقتة
+        {table}_all تجمع الصفوف الحالية والمؤرشفة (UNION ALL) لقراءات السجل الكامل.
+        """
+        conn = sqlite3.connect(self.db_path)
+        if archive:
+            self.attach_archive(conn)
+        return conn
+
+    def attach_archive(self, conn):
+        """ربط قاعدة الأرشيف بالاتصال وتعريف views السجل الكامل المؤقتة المحضرة في prepare_archive"""
+        conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        # views القاعدة الأساسية لا تشير لقاعدة أخرى، فتُعرّف مؤقتة لكل اتصال
+        for view_sql in self._archive_views:
+            conn.execute(view_sql)
+
+    def prepare_archive(self, conn):
+        """إنشاء جداول الأرشيف أو تحديث أعمدتها، وبناء تعريفات views السجل الكامل (مرة عند التهيئة)"""
+        conn.commit()
+        cursor = conn.cursor()
+        cursor.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        try:
+            self.create_archive_tables(cursor)
+            conn.commit()
+            views = []
+            for table in self.ARCHIVED_TABLES:
+                columns = [row[1] for row in cursor.execute(f"PRAGMA main.table_xinfo({table})")]
+                archived = {row[1] for row in cursor.execute(f"PRAGMA archive.table_xinfo({table})")}
+                views.append(f'''
+                    CREATE TEMP VIEW IF NOT EXISTS {table}_all AS
+                    SELECT {', '.join(columns)} FROM main.{table}
+                    UNION ALL
+                    SELECT {', '.join(column if column in archived else f"NULL AS {column}" for column in columns)}
+                    FROM archive.{table}
+                ''')
+            self._archive_views = tuple(views)
+        finally:
+            cursor.execute("DETACH DATABASE archive")
+
+    def create_archive_tables(self, cursor):
+        """جداول الأرشيف بنفس تعريف الجداول الأصلية وفهارسها، بدون المفاتيح الأجنبية والمشغلات"""
+        for table in self.ARCHIVED_TABLES:
+            if cursor.execute("SELECT 1 FROM archive.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+                # أعمدة أضيفت للجدول الأصلي بعد إنشاء الأرشيف (المولدة تبقى NULL في views السجل الكامل)
+                archived = {row[1] for row in cursor.execute(f"PRAGMA archive.table_xinfo({table})")}
+                for row in cursor.execute(f"PRAGMA main.table_xinfo({table})").fetchall():
+                    if row[1] not in archived and row[6] == 0:
+                        cursor.execute(f"ALTER TABLE archive.{table} ADD COLUMN {row[1]} {row[2]}")
+                continue
+            create_sql = cursor.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()[0]
+            create_sql = re.sub(rf"^CREATE TABLE\s+(IF NOT EXISTS\s+)?[\"'`\[]?{table}[\"'`\]]?",
+                                f"CREATE TABLE archive.{table}", create_sql.strip(), flags=re.IGNORECASE)
+            create_sql = re.sub(r",\s*FOREIGN KEY\s*\([^)]*\)\s*REFERENCES\s+[\w\"]+\s*\([^)]*\)", "",
+                                create_sql, flags=re.IGNORECASE)
+            cursor.execute(create_sql)
+            for (index_sql,) in cursor.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+            ).fetchall():
+                cursor.execute(re.sub(r"^CREATE (UNIQUE )?INDEX\s+(IF NOT EXISTS\s+)?", r"CREATE \1INDEX IF NOT EXISTS archive.",
+                                      index_sql.strip(), flags=re.IGNORECASE))
 
 # تأخير التهيئة حتى الاستدعاء الصريح
 db = Database()
@@ -0,0 +1,55 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import math
+
+# المبالغ تُخزن أعداداً صحيحة بالقرش، فالجمع في SQLite دقيق ولا يتراكم فيه خطأ الكسور.
+# CRUDOperations تستقبل وتعيد المبالغ بالجنيه كما كانت، والتحويل يتم عند حدودها فقط.
+PIASTERS_PER_POUND = 100
+
+# أعمدة المبالغ المخزنة بالقرش في كل جدول
+MONEY_COLUMNS = {
+    'doctors': ('salary',),
+    'treatments': ('base_price',),
+    'appointments': ('total_cost',),
+    'payments': ('amount',),
+    'expenses': ('amount',),
+    'period_payment_method_snapshots': ('total',),
+    'period_expense_category_snapshots': ('total',),
+}
+
+def to_piasters(amount):
+    """مبلغ بالجنيه (رقم أو نص) إلى عدد صحيح بالقرش مع التقريب لأقرب قرش"""
+    if amount is None or amount == '':
+        return None
+    if isinstance(amount, int):
+        return amount * PIASTERS_PER_POUND
+    if isinstance(amount, float) and math.isnan(amount):
+        return None
+    try:
+        # عبر النص حتى لا يظهر خطأ تمثيل الكسور (0.285 * 100 = 28.499...)
+        value = Decimal(str(amount).replace(',', '').strip())
+    except InvalidOperation:
+        raise ValueError(f"مبلغ غير صحيح: {amount}")
+    return int((value * PIASTERS_PER_POUND).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_piasters(piasters):
+    """عدد القروش إلى جنيه"""
+    if piasters is None:
+        return None
+    return piasters / PIASTERS_PER_POUND
+
+def money_frame(df, columns):
+    """تحويل أعمدة المبالغ في DataFrame مقروء من الجداول إلى جنيه"""
+    for column in columns:
+        if column in df.columns:
+            df[column] = df[column] / PIASTERS_PER_POUND
+    return df
+
+def money_row(cursor, row, columns):
+    """تحويل أعمدة المبالغ في صف من cursor.fetchone() إلى جنيه"""
+    if row is None:
+        return None
+    names = [description[0] for description in cursor.description]
+    return tuple(
+        from_piasters(value) if name in columns and value is not None else value
+        for name, value in zip(names, row)
+    )
@@ -0,0 +1,186 @@
+import sqlite3
+import threading
+import time
+from .models import db
+from .money import MONEY_COLUMNS, from_piasters
+
+class ReferenceData:
+    """خرائط id → بيانات العرض للمرضى والأطباء والعلاجات والموردين.
+
+    تُبنى كل خريطة مرة واحدة عند أول طلب وتبقى في ذاكرة العملية مشتركة بين كل
+    الجلسات، وتُحدّث صفاً بصف عند الإضافة والتعديل والحذف من CRUDOperations.
+    البحث بالمعرف O(1) بدلاً من مسح DataFrame كامل لكل خيار في القوائم.
+
+    الكتابة من عمليات أخرى (أدوات tools/ للاستيراد وتوليد البيانات والاستعادة) لا تمر بـ
+    CRUDOperations، فتُكتشف ببصمة (عدد الصفوف، أكبر معرف) لكل جدول تُقارن عند تغير
+    PRAGMA data_version، والخريطة التي تغيرت بصمتها تُسقط لتُبنى من جديد.
+    """
+
+    # أقل مدة بين فحصين لتغييرات العمليات الأخرى
+    CHECK_SECONDS = 2.0
+
+    # الأعمدة المحفوظة لكل جدول
+    FIELDS = {
+        'patients': ('name', 'phone', 'name_search'),
+        'doctors': ('name', 'specialization', 'commission_rate', 'name_search'),
+        'treatments': ('name', 'base_price', 'category', 'name_search'),
+        'suppliers': ('name', 'phone', 'name_search')
+    }
+
+    def __init__(self, database):
+        self.db = database
+        self._maps = {}
+        self._generations = {}
+        self._stamps = {}
+        self._lock = threading.Lock()
+        # اتصال دائم لقراءة data_version (قيمتها تخص الاتصال نفسه)
+        self._watch = None
+        self._watch_lock = threading.Lock()
+        self._data_version = None
+        self._checked_at = 0.0
+
+    def get(self, entity, record_id):
+        """بيانات العرض لسجل (قاموس) أو None إذا لم يوجد"""
+        return self._map(entity).get(record_id)
+
+    def name(self, entity, record_id, default="غير معروف"):
+        """اسم السجل للعرض"""
+        row = self._map(entity).get(record_id)
+        return row['name'] if row else default
+
+    def formatter(self, entity, with_id=False):
+        """دالة format_func جاهزة لـ st.selectbox"""
+        if with_id:
+            return lambda record_id: f"{self.name(entity, record_id)} (ID: {record_id})"
+        return lambda record_id: self.name(entity, record_id)
+
+    def ids(self, entity):
+        """معرفات السجلات مرتبة حسب الاسم الموحد (نفس ترتيب قوائم CRUDOperations)"""
+        entries = self._map(entity)
+        return sorted(entries, key=lambda record_id: entries[record_id]['name_search'] or "")
+
+    def generation(self, entity):
+        """عداد يزيد مع كل تعديل على الجدول (يصلح مفتاحاً لذاكرة مؤقتة تعتمد عليه)"""
+        self._check_external_changes()
+        return self._generations.get(entity, 0)
+
+    def refresh(self, entity, record_id):
+        """إعادة قراءة سجل واحد بعد إضافته أو تعديله"""
+        self._bump(entity)
+        if entity not in self._maps:
+            return
+        fields = self.FIELDS[entity]
+        conn = self.db.get_connection()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(fields)} FROM {entity} WHERE id = ?", (record_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            entries = self._maps.get(entity)
+            if entries is None:
+                return
+            if row is None:
+                if entries.pop(record_id, None) is not None:
+                    self._adjust_stamp(entity, -1, record_id)
+            else:
+                if record_id not in entries:
+                    self._adjust_stamp(entity, 1, record_id)
+                entries[record_id] = self._entry(entity, fields, row)
+
+    def remove(self, entity, record_id):
+        """حذف سجل من الخريطة بعد حذفه من قاعدة البيانات"""
+        self._bump(entity)
+        with self._lock:
+            if entity in self._maps and self._maps[entity].pop(record_id, None) is not None:
+                self._adjust_stamp(entity, -1, record_id)
+
+    def invalidate(self, entity=None):
+        """إسقاط خريطة (أو كل الخرائط) لتُبنى من جديد عند الطلب التالي"""
+        with self._lock:
+            for name in ([entity] if entity else list(self.FIELDS)):
+                self._drop(name)
+
+    @staticmethod
+    def _entry(entity, fields, values):
+        # المبالغ مخزنة بالقرش وتُعرض بالجنيه مثل نتائج CRUDOperations
+        money = MONEY_COLUMNS.get(entity, ())
+        return {field: from_piasters(value) if field in money and value is not None else value
+                for field, value in zip(fields, values)}
+
+    def _bump(self, entity):
+        with self._lock:
+            self._generations[entity] = self._generations.get(entity, 0) + 1
+
+    def _drop(self, entity):
+        # يُستدعى مع self._lock
+        self._maps.pop(entity, None)
+        self._stamps.pop(entity, None)
+        self._generations[entity] = self._generations.get(entity, 0) + 1
+
+    def _adjust_stamp(self, entity, delta, record_id):
+        """تعديل بصمة الجدول بتعديل من هذه العملية حتى لا يُحسب تغييراً من عملية أخرى"""
+        # يُستدعى مع self._lock
+        stamp = self._stamps.get(entity)
+        if stamp is not None:
+            count, max_id = stamp
+            self._stamps[entity] = (count + delta, max(max_id or 0, record_id) if delta > 0 else max_id)
+
+    def _check_external_changes(self):
+        """إسقاط الخرائط التي غيّرت عملية أخرى جداولها، مرة كل CHECK_SECONDS على الأكثر"""
+        now = time.monotonic()
+        if now - self._checked_at < self.CHECK_SECONDS or not self._watch_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            if self._watch is None:
+                self._watch = sqlite3.connect(self.db.db_path, check_same_thread=False)
+            version = self._watch.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return
+            self._data_version = version
+            for entity in self.FIELDS:
+                stamp = self._watch.execute(f"SELECT COUNT(*), MAX(id) FROM {entity}").fetchone()
+                with self._lock:
+                    known = self._stamps.get(entity)
+                    if known is None and entity not in self._maps:
+                        self._stamps[entity] = stamp
+                    elif known != stamp:
+                        # تعديل من هذه العملية بين الفحص وتحديث البصمة يسبب إعادة بناء زائدة فقط
+                        self._drop(entity)
+                        self._stamps[entity] = stamp
+        except sqlite3.Error as e:
+            print(f"Reference data check error: {e}")
+        finally:
+            self._watch_lock.release()
+
+    def _map(self, entity):
+        self._check_external_changes()
+        entries = self._maps.get(entity)
+        if entries is None:
+            entries = self._load(entity)
+        return entries
+
+    def _load(self, entity):
+        fields = self.FIELDS[entity]
+        with self._lock:
+            generation = self._generations.get(entity, 0)
+        conn = self.db.get_connection()
+        try:
+            rows = conn.execute(f"SELECT id, {', '.join(fields)} FROM {entity}").fetchall()
+        finally:
+            conn.close()
+        entries = {row[0]: self._entry(entity, fields, row[1:]) for row in rows}
+        with self._lock:
+            # خيط آخر قد يكون سبقنا في البناء
+            if entity in self._maps:
+                return self._maps[entity]
+            # refresh أو remove أثناء القراءة: قد لا تشمل الصفوف تعديلهما، فلا تُحفظ الخريطة
+            if self._generations.get(entity, 0) != generation:
+                return entries
+            self._maps[entity] = entries
+            self._stamps[entity] = (len(rows), max(entries) if entries else None)
+            return entries
+
+reference_data = ReferenceData(db)
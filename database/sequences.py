@@ -0,0 +1,82 @@
+import threading
+from datetime import date
+from .models import db
+
+class SequenceAllocator:
+    """مولد أرقام تسلسلية مخزنة في جدول sequences.
+
+    كل عملية تحجز كتلة من الأرقام بتحديث واحد (UPDATE ... RETURNING) في معاملة قصيرة
+    مستقلة، ثم توزع أرقام الكتلة من الذاكرة دون الرجوع لقاعدة البيانات. الأرقام فريدة
+    بين كل العمليات، وقد تظهر فجوات عند إعادة تشغيل التطبيق قبل استهلاك الكتلة.
+    """
+
+    def __init__(self, database, block_size=20):
+        self.db = database
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def next_value(self, name):
+        """الرقم التالي في التسلسل المحدد"""
+        with self._lock:
+            current, end = self._blocks.get(name, (0, 0))
+            if current >= end:
+                current, end = self._reserve_block(name)
+            self._blocks[name] = (current + 1, end)
+            return current
+
+    def _reserve_block(self, name):
+        """حجز كتلة جديدة من الأرقام وإرجاع (أول رقم، نهاية الكتلة)"""
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("INSERT OR IGNORE INTO sequences (name, next_value) VALUES (?, 1)", (name,))
+            cursor.execute('''
+                UPDATE sequences SET next_value = next_value + ?
+                WHERE name = ?
+                RETURNING next_value
+            ''', (self.block_size, name))
+            end = cursor.fetchone()[0]
+            conn.commit()
+        finally:
+            conn.close()
+        return end - self.block_size, end
+
+    def reset(self):
+        """نسيان الكتل المحجوزة في الذاكرة (تُحجز كتل جديدة عند الطلب)"""
+        with self._lock:
+            self._blocks.clear()
+
+class VoucherNumbers:
+    """أرقام السندات: بادئة لكل نوع وتسلسل مستقل لكل سنة، مثل RC-2025-000042"""
+
+    PREFIXES = {
+        'receipt': 'RC',
+        'payment': 'PV'
+    }
+
+    def __init__(self, allocator):
+        self.allocator = allocator
+
+    def next_number(self, voucher_type, voucher_date=None):
+        """رقم السند التالي لنوع السند وسنته"""
+        prefix = self.PREFIXES.get(voucher_type, voucher_type.upper()[:2])
+        year = (voucher_date or date.today()).year
+        value = self.allocator.next_value(f"voucher:{prefix}:{year}")
+        return f"{prefix}-{year}-{value:06d}"
+
+    @staticmethod
+    def sync(conn):
+        """رفع عداد كل بادئة وسنة فوق أكبر رقم سند موجود (بعد الاستعادة مثلاً)، بدون خفض أي عداد"""
+        conn.execute('''
+            INSERT INTO sequences (name, next_value)
+            SELECT 'voucher:' || substr(voucher_number, 1, 2) || ':' || substr(voucher_number, 4, 4),
+                   MAX(CAST(substr(voucher_number, 9) AS INTEGER)) + 1
+            FROM vouchers
+            WHERE voucher_number GLOB '[A-Z][A-Z]-[0-9][0-9][0-9][0-9]-[0-9]*'
+            GROUP BY 1
+            ON CONFLICT (name) DO UPDATE SET next_value = MAX(next_value, excluded.next_value)
+        ''')
+
+sequence_allocator = SequenceAllocator(db)
+voucher_numbers = VoucherNumbers(sequence_allocator)
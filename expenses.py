@@ -4,6 +4,7 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from database.crud import crud
+from utils.figure_cache import cached_figure
 
 def render():
     """صفحة إدارة المصروفات"""
@@ -137,7 +138,8 @@ def render_expense_analysis():
         with col2:
             st.markdown("#### التوزيع البياني")
             import plotly.express as px
-            fig = px.pie(
+            fig = cached_figure(
+                px.pie,
                 expenses_by_category, 
                 values='total', 
                 names='category',
@@ -2,8 +2,11 @@
 
 import streamlit as st
 import pandas as pd
-from datetime import date
+from datetime import date, timedelta
 from database.crud import crud
+from utils.figure_cache import cached_figure
+from database.reference_data import reference_data
+from components.patient_picker import PatientPicker
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -17,8 +20,7 @@ def patient_payment_dialog():
         st.error("لم يتم تحديد المريض. يرجى إغلاق النافذة واختيار مريض أولاً.")
         return
 
-    patients = crud.get_all_patients()
-    patient_name = patients[patients['id'] == patient_id]['name'].iloc[0]
+    patient_name = reference_data.name('patients', patient_id)
     
     st.info(f"**المريض:** {patient_name}")
     
@@ -147,20 +149,14 @@ def supplier_payment_dialog():
 def render_patient_accounts():
     st.markdown("### 👥 حسابات المرضى")
     
-    patients = crud.get_all_patients()
-    if patients.empty:
-        st.info("لا يوجد مرضى.")
-        return
-        
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        patient_id = st.selectbox(
-            "اختر المريض لعرض حسابه",
-            patients['id'].tolist(),
-            format_func=lambda x: f"{patients[patients['id'] == x]['name'].iloc[0]} (ID: {x})",
-            key="fin_patient_select"
-        )
+        patient_id = PatientPicker.render("اختر المريض لعرض حسابه", key="fin_patient_select")
+    
+    if patient_id is None:
+        st.info("ابحث عن المريض لعرض حسابه.")
+        return
     
     with col2:
         st.write("")
@@ -179,10 +175,31 @@ def render_patient_accounts():
     
     # كشف الحساب
     st.markdown("#### 📋 كشف الحساب التفصيلي")
-    account_id = crud.create_or_update_account('patient', patient_id, patients[patients['id'] == patient_id]['name'].iloc[0])
-    statement = crud.get_account_statement('patient', patient_id)
+    render_account_statement('patient', patient_id)
+
+def render_account_statement(account_type, holder_id):
+    """عرض كشف الحساب صفحة بصفحة مع الرصيد الجاري"""
+    cursor_key = f"statement_cursor_{account_type}_{holder_id}"
+    before_id = st.session_state.get(cursor_key)
+
+    statement = crud.get_account_statement(account_type, holder_id, before_id=before_id)
     if statement and not statement['transactions'].empty:
-        st.dataframe(statement['transactions'][['transaction_date', 'transaction_type', 'amount', 'description']], use_container_width=True, hide_index=True)
+        st.dataframe(
+            statement['transactions'][['transaction_date', 'transaction_type', 'amount', 'running_balance', 'description']],
+            use_container_width=True,
+            hide_index=True,
+            column_config={"running_balance": "الرصيد بعد الحركة"}
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if before_id and st.button("⏮️ أحدث الحركات", key=f"{cursor_key}_latest", use_container_width=True):
+                st.session_state[cursor_key] = None
+                st.rerun()
+        with col2:
+            if statement['next_cursor'] and st.button("⏭️ حركات أقدم", key=f"{cursor_key}_older", use_container_width=True):
+                st.session_state[cursor_key] = statement['next_cursor']
+                st.rerun()
     else:
         st.info("لا توجد حركات مالية مسجلة.")
 
@@ -200,7 +217,7 @@ def render_doctor_accounts():
         doctor_id = st.selectbox(
             "اختر الطبيب لعرض حسابه",
             doctors['id'].tolist(),
-            format_func=lambda x: f"{doctors[doctors['id'] == x]['name'].iloc[0]} (ID: {x})",
+            format_func=reference_data.formatter('doctors', with_id=True),
             key="fin_doctor_select"
         )
     
@@ -219,6 +236,9 @@ def render_doctor_accounts():
     col2.metric("إجمالي المسحوب", f"{summary.get('total_withdrawn', 0):,.2f} ج.م")
     col3.metric("الرصيد الحالي", f"{balance:,.2f} ج.م", delta=f"+{balance:,.2f}" if balance > 0 else None)
 
+    st.markdown("#### 📋 كشف الحساب التفصيلي")
+    render_account_statement('doctor', doctor_id)
+
 def render_supplier_accounts():
     st.markdown("### 🏪 حسابات الموردين")
     
@@ -233,7 +253,7 @@ def render_supplier_accounts():
         supplier_id = st.selectbox(
             "اختر المورد لعرض حسابه",
             suppliers['id'].tolist(),
-            format_func=lambda x: suppliers[suppliers['id'] == x]['name'].iloc[0],
+            format_func=reference_data.formatter('suppliers'),
             key="fin_supplier_select"
         )
     
@@ -252,6 +272,9 @@ def render_supplier_accounts():
     col2.metric("إجمالي المدفوع", f"{summary.get('total_paid', 0):,.2f} ج.م")
     col3.metric("المتبقي", f"{outstanding:,.2f} ج.م", delta=f"-{outstanding:,.2f}" if outstanding > 0 else "✅")
 
+    st.markdown("#### 📋 كشف الحساب التفصيلي")
+    render_account_statement('supplier', supplier_id)
+
 def render_clinic_account():
     """عرض حساب العيادة"""
     st.markdown("### 🏥 حساب العيادة العام")
@@ -292,19 +315,24 @@ def render_clinic_account():
     
     if isinstance(monthly_data, pd.DataFrame) and not monthly_data.empty:
         try:
-            fig = go.Figure()
-            fig.add_trace(go.Bar(name='الإيرادات', x=monthly_data['month'], y=monthly_data['revenue']))
-            fig.add_trace(go.Bar(name='المصروفات', x=monthly_data['month'], y=monthly_data['expenses']))
-            fig.add_trace(go.Scatter(name='الربح', x=monthly_data['month'], y=monthly_data['profit'],
-                                    mode='lines+markers', line=dict(width=3, color='green')))
-            
-            fig.update_layout(title="التدفق النقدي آخر 6 أشهر", barmode='group')
+            fig = cached_figure(build_cash_flow_figure, monthly_data)
             st.plotly_chart(fig, use_container_width=True)
         except Exception:
             st.warning("لا يمكن عرض الرسم البياني للتدفق النقدي")
     else:
         st.info("لا توجد بيانات كافية لعرض التدفق النقدي الشهري")
 
+def build_cash_flow_figure(monthly_data):
+    """رسم التدفق النقدي الشهري"""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name='الإيرادات', x=monthly_data['month'], y=monthly_data['revenue']))
+    fig.add_trace(go.Bar(name='المصروفات', x=monthly_data['month'], y=monthly_data['expenses']))
+    fig.add_trace(go.Scatter(name='الربح', x=monthly_data['month'], y=monthly_data['profit'],
+                            mode='lines+markers', line=dict(width=3, color='green')))
+    
+    fig.update_layout(title="التدفق النقدي آخر 6 أشهر", barmode='group')
+    return fig
+
 def render_general_summary(summary):
     """عرض ملخص عام لجميع الحسابات"""
     st.markdown("### 📊 ملخص عام للحسابات")
@@ -328,7 +356,8 @@ def render_general_summary(summary):
         st.markdown("#### 🥧 توزيع الأرصدة")
         
         try:
-            fig = px.pie(
+            fig = cached_figure(
+                px.pie,
                 summary,
                 values='total_balance',
                 names='account_type',
@@ -340,6 +369,58 @@ def render_general_summary(summary):
     else:
         st.info("لا توجد حسابات مسجلة لعرض ملخص")
 
+def render_period_close():
+    """إقفال الشهور المحاسبية وإعادة فتحها"""
+    st.markdown("### 🔒 إقفال الفترات المحاسبية")
+    st.info("الشهر المقفل تُجمَّد إجمالياته ولا يمكن إضافة أو تعديل حركات بتاريخه حتى يُعاد فتحه.")
+
+    closed_periods = crud.get_closed_periods()
+    closed = set(closed_periods['period']) if not closed_periods.empty else set()
+
+    # آخر 12 شهراً منتهية ولم تُقفل بعد
+    month_start = date.today().replace(day=1)
+    open_periods = []
+    for _ in range(12):
+        month_start = (month_start - timedelta(days=1)).replace(day=1)
+        if month_start.strftime('%Y-%m') not in closed:
+            open_periods.append(month_start.strftime('%Y-%m'))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if open_periods:
+            period = st.selectbox("الشهر المراد إقفاله", open_periods, key="close_period_select")
+            if st.button("🔒 إقفال الشهر", type="primary", use_container_width=True):
+                try:
+                    crud.close_period(period)
+                    st.success(f"✅ تم إقفال شهر {period}")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ خطأ أثناء الإقفال: {e}")
+        else:
+            st.success("✅ جميع الشهور السابقة مقفلة")
+
+    with col2:
+        if closed:
+            period = st.selectbox("إعادة فتح شهر", sorted(closed, reverse=True), key="reopen_period_select")
+            if st.button("🔓 إعادة الفتح", use_container_width=True):
+                crud.reopen_period(period)
+                st.success(f"✅ تم إعادة فتح شهر {period}")
+                st.rerun()
+
+    if not closed_periods.empty:
+        st.markdown("#### 📋 الشهور المقفلة")
+        st.dataframe(
+            closed_periods.rename(columns={
+                'period': 'الشهر',
+                'closed_by': 'أُقفل بواسطة',
+                'closed_at': 'تاريخ الإقفال',
+                'total_revenue': 'الإيرادات',
+                'total_expenses': 'المصروفات'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+
 # ====================
 # الدالة الرئيسية
 # ====================
@@ -358,12 +439,13 @@ def render():
         st.error(f"خطأ في جلب ملخص الحسابات: {e}")
         all_accounts_summary = pd.DataFrame()
         
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
         "👥 حسابات المرضى",
         "👨‍⚕️ حسابات الأطباء",
         "🏪 حسابات الموردين",
         "🏥 حساب العيادة",
-        "📊 ملخص عام"
+        "📊 ملخص عام",
+        "🔒 إقفال الفترات"
     ])
     
     with tab1:
@@ -385,4 +467,7 @@ def render():
         render_clinic_account()
     
     with tab5:
-        render_general_summary(all_accounts_summary)
\ No newline at end of file
+        render_general_summary(all_accounts_summary)
+    
+    with tab6:
+        render_period_close()
\ No newline at end of file
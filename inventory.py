@@ -4,6 +4,7 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from database.crud import crud
+from database.reference_data import reference_data
 
 def render():
     """صفحة إدارة المخزون"""
@@ -81,7 +82,7 @@ def render_add_item():
         supplier_id = st.selectbox(
             "المورد",
             [None] + suppliers['id'].tolist(),
-            format_func=lambda x: "لا يوجد" if x is None else suppliers[suppliers['id'] == x]['name'].iloc[0]
+            format_func=lambda x: "لا يوجد" if x is None else reference_data.name('suppliers', x)
         ) if not suppliers.empty else None
         
         expiry_date = st.date_input("تاريخ الانتهاء (اختياري)", value=None)
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from database.crud import crud
+from components.patient_picker import PatientPicker
 from report_generator import PatientReportGenerator
 
 def render():
@@ -89,14 +90,8 @@ def render_patient_history():
     """عرض سجل المريض الطبي"""
     st.markdown("#### سجل المريض الطبي")
     
-    patients = crud.get_all_patients()
-    if not patients.empty:
-        patient_id = st.selectbox(
-            "اختر المريض",
-            patients['id'].tolist(),
-            format_func=lambda x: patients[patients['id'] == x]['name'].iloc[0]
-        )
-        
+    patient_id = PatientPicker.render("اختر المريض", key="history_patient")
+    if patient_id is not None:
         if st.button("عرض السجل"):
             history = crud.get_patient_history(patient_id)
             if not history.empty:
@@ -119,28 +114,17 @@ def render_patient_report():
     """توليد تقرير شامل عن المريض"""
     st.markdown("#### 📄 تقرير شامل عن المريض")
     
-    patients = crud.get_all_patients()
-    
-    if patients.empty:
-        st.warning("لا يوجد مرضى في النظام")
-        return
-    
     # اختيار المريض
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        patient_id = st.selectbox(
-            "اختر المريض",
-            patients['id'].tolist(),
-            format_func=lambda x: patients[patients['id'] == x]['name'].iloc[0],
-            key="report_patient_select"
-        )
+        patient_id = PatientPicker.render("اختر المريض", key="report_patient_select")
     
     with col2:
         st.markdown("<br>", unsafe_allow_html=True)
         generate_report = st.button("📊 توليد التقرير", type="primary", use_container_width=True)
     
-    if generate_report:
+    if generate_report and patient_id is not None:
         with st.spinner("جاري إنشاء التقرير..."):
             # جلب جميع بيانات المريض
             report_data = crud.get_patient_full_report(patient_id)
@@ -4,6 +4,7 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from database.crud import crud
+from components.patient_picker import PatientPicker
 
 def render():
     """صفحة إدارة المدفوعات"""
@@ -47,20 +48,11 @@ def render_add_payment():
     """إضافة دفعة"""
     st.markdown("### ➕ تسجيل دفعة يدويًا")
     
-    patients = crud.get_all_patients()
     appointments = crud.get_all_appointments()
     
-    if patients.empty:
-        st.warning("⚠️ لا يوجد مرضى")
-        return
-    
     col1, col2 = st.columns(2)
     with col1:
-        patient_id = st.selectbox(
-            "اختيار المريض",
-            patients['id'].tolist(),
-            format_func=lambda x: patients[patients['id'] == x]['name'].iloc[0]
-        )
+        patient_id = PatientPicker.render("اختيار المريض", key="payment_patient")
         appointment_id = st.selectbox(
             "موعد (اختياري)",
             [None] + appointments['id'].dropna().tolist()
@@ -74,7 +66,9 @@ def render_add_payment():
     notes = st.text_area("ملاحظات")
     
     if st.button("💾 حفظ الدفعة", type="primary"):
-        if amount > 0:
+        if patient_id is None:
+            st.warning("⚠️ يرجى اختيار المريض.")
+        elif amount > 0:
             crud.create_payment(
                 appointment_id,
                 patient_id,
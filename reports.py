@@ -4,6 +4,7 @@ import streamlit as st
 import pandas as pd
 from datetime import date, timedelta
 from database.crud import crud
+from utils.figure_cache import cached_figure
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -11,24 +12,16 @@ def render():
     """صفحة التقارير العامة"""
     st.markdown("## 📊 التقارير العامة")
     
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "💰 التقارير المالية", 
-        "👨‍⚕️ أداء الأطباء", 
-        "💉 العلاجات", 
-        "📈 الاتجاهات"
-    ])
+    # اختيار القسم من الخادم: يُنفذ القسم المعروض فقط بدلاً من كل التبويبات في كل تحديث
+    sections = {
+        "💰 التقارير المالية": render_financial_reports,
+        "👨‍⚕️ أداء الأطباء": render_doctor_performance,
+        "💉 العلاجات": render_treatment_reports,
+        "📈 الاتجاهات": render_trends
+    }
     
-    with tab1:
-        render_financial_reports()
-    
-    with tab2:
-        render_doctor_performance()
-    
-    with tab3:
-        render_treatment_reports()
-    
-    with tab4:
-        render_trends()
+    section = st.radio("القسم", list(sections), horizontal=True, key="reports_section", label_visibility="collapsed")
+    sections[section]()
 
 def render_financial_reports():
     """التقارير المالية"""
@@ -63,7 +56,7 @@ def render_financial_reports():
         with col1:
             st.dataframe(payment_methods, use_container_width=True, hide_index=True)
         with col2:
-            fig = px.pie(payment_methods, values='total', names='payment_method', title='توزيع طرق الدفع')
+            fig = cached_figure(px.pie, payment_methods, values='total', names='payment_method', title='توزيع طرق الدفع')
             st.plotly_chart(fig, use_container_width=True)
     
     # المصروفات حسب الفئة
@@ -71,7 +64,7 @@ def render_financial_reports():
     expenses_by_cat = crud.get_expenses_by_category(start_date.isoformat(), end_date.isoformat())
     
     if not expenses_by_cat.empty:
-        fig = px.bar(expenses_by_cat, x='category', y='total', title='المصروفات حسب الفئة')
+        fig = cached_figure(px.bar, expenses_by_cat, x='category', y='total', title='المصروفات حسب الفئة')
         st.plotly_chart(fig, use_container_width=True)
 
 def render_doctor_performance():
@@ -99,7 +92,8 @@ def render_doctor_performance():
         )
         
         # رسم بياني للإيرادات
-        fig = px.bar(
+        fig = cached_figure(
+            px.bar,
             doctor_performance, 
             x='doctor_name', 
             y='total_revenue',
@@ -135,7 +129,8 @@ def render_treatment_reports():
         )
         
         # رسم بياني
-        fig = px.bar(
+        fig = cached_figure(
+            px.bar,
             treatment_popularity.head(10), 
             x='treatment_name', 
             y='booking_count',
@@ -146,6 +141,22 @@ def render_treatment_reports():
     else:
         st.info("لا توجد بيانات علاجات في هذه الفترة")
 
+def build_monthly_revenue_figure(monthly_data):
+    """رسم الإيرادات الشهرية"""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=monthly_data['period'], 
+        y=monthly_data['total_revenue'], 
+        name='الإيرادات'
+    ))
+    
+    fig.update_layout(
+        title='الإيرادات الشهرية',
+        xaxis_title='الشهر',
+        yaxis_title='الإيرادات (ج.م)'
+    )
+    return fig
+
 def render_trends():
     """الاتجاهات والتحليلات"""
     st.markdown("### 📈 الاتجاهات")
@@ -166,19 +177,7 @@ def render_trends():
         )
         
         if not monthly_data.empty:
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=monthly_data['period'], 
-                y=monthly_data['total_revenue'], 
-                name='الإيرادات'
-            ))
-            
-            fig.update_layout(
-                title='الإيرادات الشهرية',
-                xaxis_title='الشهر',
-                yaxis_title='الإيرادات (ج.م)'
-            )
+            fig = cached_figure(build_monthly_revenue_figure, monthly_data)
             st.plotly_chart(fig, use_container_width=True)
             
             # إضافة جدول البيانات
@@ -196,7 +195,8 @@ def render_trends():
     
     if not daily_revenue.empty:
         import plotly.express as px
-        fig = px.line(
+        fig = cached_figure(
+            px.line,
             daily_revenue, 
             x='payment_date', 
             y='daily_revenue', 
@@ -229,7 +229,8 @@ def render_trends():
                 st.dataframe(appointment_stats, use_container_width=True, hide_index=True)
             with col2:
                 import plotly.express as px
-                fig = px.pie(
+                fig = cached_figure(
+                    px.pie,
                     appointment_stats, 
                     values='count', 
                     names='status', 
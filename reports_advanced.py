@@ -4,52 +4,34 @@ import streamlit as st
 import pandas as pd
 from datetime import date, timedelta
 from database.crud import crud
+from utils.figure_cache import cached_figure
+from database.reference_data import reference_data
+from components.patient_picker import PatientPicker
 import plotly.express as px
 
 def render():
     """صفحة التقارير المتقدمة"""
     st.markdown("## 📈 التقارير المتقدمة والتفصيلية")
     
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "👤 تقرير مريض", 
-        "👨‍⚕️ تقرير طبيب", 
-        "💉 تقرير علاج",
-        "🏪 تقرير مورد",
-        "💰 تقرير مالي شامل"
-    ])
+    # اختيار القسم من الخادم: يُنفذ التقرير المعروض فقط
+    sections = {
+        "👤 تقرير مريض": render_patient_report,
+        "👨‍⚕️ تقرير طبيب": render_doctor_report,
+        "💉 تقرير علاج": render_treatment_report,
+        "🏪 تقرير مورد": render_supplier_report,
+        "💰 تقرير مالي شامل": render_comprehensive_financial_report
+    }
     
-    with tab1:
-        render_patient_report()
-    
-    with tab2:
-        render_doctor_report()
-    
-    with tab3:
-        render_treatment_report()
-    
-    with tab4:
-        render_supplier_report()
-    
-    with tab5:
-        render_comprehensive_financial_report()
+    section = st.radio("القسم", list(sections), horizontal=True, key="advanced_reports_section", label_visibility="collapsed")
+    sections[section]()
 
 def render_patient_report():
     """تقرير مريض مفصل"""
     st.markdown("### 👤 تقرير مريض مفصل")
     
-    patients = crud.get_all_patients()
+    patient_id = PatientPicker.render("اختر المريض", key="report_patient")
     
-    if patients.empty:
-        st.info("لا يوجد مرضى")
-        return
-    
-    patient_id = st.selectbox(
-        "اختر المريض",
-        patients['id'].tolist(),
-        format_func=lambda x: patients[patients['id'] == x]['name'].iloc[0]
-    )
-    
-    if st.button("📊 عرض التقرير"):
+    if patient_id is not None and st.button("📊 عرض التقرير"):
         report = crud.get_patient_detailed_report(patient_id)
         
         if report and report['patient']:
@@ -115,7 +97,7 @@ def render_doctor_report():
         doctor_id = st.selectbox(
             "اختر الطبيب",
             doctors['id'].tolist(),
-            format_func=lambda x: doctors[doctors['id'] == x]['name'].iloc[0]
+            format_func=reference_data.formatter('doctors')
         )
     with col2:
         start_date = st.date_input("من تاريخ", value=date.today() - timedelta(days=30), key="dr_start")
@@ -151,7 +133,7 @@ def render_doctor_report():
             # الأداء الشهري
             if not report['monthly_performance'].empty:
                 st.markdown("#### 📊 الأداء الشهري")
-                fig = px.line(report['monthly_performance'], x='month', y='revenue', 
+                fig = cached_figure(px.line, report['monthly_performance'], x='month', y='revenue', 
                             title='الإيرادات الشهرية', markers=True)
                 st.plotly_chart(fig, use_container_width=True)
             
@@ -179,7 +161,7 @@ def render_treatment_report():
         treatment_id = st.selectbox(
             "اختر العلاج",
             treatments['id'].tolist(),
-            format_func=lambda x: treatments[treatments['id'] == x]['name'].iloc[0]
+            format_func=reference_data.formatter('treatments')
         )
     with col2:
         start_date = st.date_input("من تاريخ", value=date.today() - timedelta(days=90), key="treat_start_adv")
@@ -217,7 +199,7 @@ def render_treatment_report():
             # الاتجاه الشهري
             if not report['monthly_trend'].empty:
                 st.markdown("#### 📈 الاتجاه الشهري")
-                fig = px.bar(report['monthly_trend'], x='month', y='booking_count', 
+                fig = cached_figure(px.bar, report['monthly_trend'], x='month', y='booking_count', 
                            title='عدد الحجوزات الشهرية')
                 st.plotly_chart(fig, use_container_width=True)
 
@@ -234,7 +216,7 @@ def render_supplier_report():
     supplier_id = st.selectbox(
         "اختر المورد",
         suppliers['id'].tolist(),
-        format_func=lambda x: suppliers[suppliers['id'] == x]['name'].iloc[0]
+        format_func=reference_data.formatter('suppliers')
     )
     
     if st.button("📊 عرض التقرير"):
@@ -293,13 +275,13 @@ def render_comprehensive_financial_report():
                 with col1:
                     st.dataframe(report['payment_methods'], use_container_width=True, hide_index=True)
                 with col2:
-                    fig = px.pie(report['payment_methods'], values='total', names='payment_method')
+                    fig = cached_figure(px.pie, report['payment_methods'], values='total', names='payment_method')
                     st.plotly_chart(fig, use_container_width=True)
             
             # فئات المصروفات
             if not report['expense_categories'].empty:
                 st.markdown("#### 💸 المصروفات حسب الفئة")
-                fig = px.bar(report['expense_categories'], x='category', y='total', 
+                fig = cached_figure(px.bar, report['expense_categories'], x='category', y='total', 
                            title='توزيع المصروفات')
                 st.plotly_chart(fig, use_container_width=True)
             
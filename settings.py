@@ -2,15 +2,23 @@
 
 import streamlit as st
 import pandas as pd
+import sqlite3
 from database.crud import crud
 from database.models import db
-from datetime import datetime
+from datetime import datetime, timezone
+import os
+import tempfile
+from database.bulk_import import bulk_importer
+from database.journal import change_journal
+from database.backup_store import backup_store
+from database.maintenance import maintenance
+from database.frames import memory_report
 
 def render():
     """صفحة الإعدادات"""
     st.markdown("## ⚙️ الإعدادات")
     
-    tab1, tab2, tab3 = st.tabs(["🏥 إعدادات العيادة", "💾 النسخ الاحتياطي", "🔔 الإشعارات"])
+    tab1, tab2, tab3, tab4 = st.tabs(["🏥 إعدادات العيادة", "💾 النسخ الاحتياطي", "🔔 الإشعارات", "📥 استيراد البيانات"])
     
     with tab1:
         render_clinic_settings()
@@ -21,6 +29,9 @@ def render():
     with tab3:
         render_notification_settings()
 
+    with tab4:
+        render_import_settings()
+
 def render_clinic_settings():
     """إعدادات العيادة"""
     st.markdown("### 🏥 إعدادات العيادة الأساسية")
@@ -155,6 +166,219 @@ def render_backup_settings():
         col1.metric("📁 حجم قاعدة البيانات", f"{file_size:.2f} MB")
         col2.metric("📍 المسار", db.db_path)
         col3.metric("🕐 آخر تعديل", datetime.fromtimestamp(os.path.getmtime(db.db_path)).strftime("%Y-%m-%d %H:%M"))
+        render_maintenance_settings()
+        render_memory_report()
+
+    st.markdown("---")
+    render_backup_store()
+
+    st.markdown("---")
+    render_point_in_time_restore()
+
+    st.markdown("---")
+    render_archive_settings()
+
+def render_maintenance_settings():
+    """الصيانة الدورية: الإحصاءات والتفريغ التدريجي ونتائج آخر تشغيل"""
+    st.markdown("#### 🧰 الصيانة الدورية")
+    status = maintenance.status()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🕳️ مساحة حرة داخل الملف", f"{status['free_bytes'] / (1024 * 1024):.2f} MB")
+    col2.metric("♻️ auto_vacuum", status['auto_vacuum'])
+    col3.metric("📓 journal_mode", status['journal_mode'])
+    start, end = maintenance.window
+    st.caption(f"تعمل تلقائياً مرة يومياً بين الساعة {start}:00 و{end}:00 عندما لا توجد تعديلات، "
+               f"بحد أقصى {maintenance.time_limit_seconds // 60} دقائق")
+
+    time_limit = st.number_input("الحد الزمني (ثانية)", min_value=10, max_value=3600,
+                                 value=maintenance.time_limit_seconds, step=30, key="maintenance_time_limit")
+    if st.button("🧰 تشغيل الصيانة الآن"):
+        with st.spinner("جاري الصيانة..."):
+            results = maintenance.run(time_limit_seconds=int(time_limit))
+        reclaimed = sum(result.bytes_reclaimed for result in results)
+        st.success(f"✅ انتهت الصيانة في {sum(result.seconds for result in results):.1f} ث، "
+                   f"وتم استرجاع {reclaimed / (1024 * 1024):.2f} MB")
+
+    if status['auto_vacuum'] != 'INCREMENTAL':
+        st.warning(f"⚠️ القاعدة لم تُحول بعد إلى auto_vacuum=INCREMENTAL. التحويل VACUUM كامل بلا حد زمني "
+                   f"يوقف الحفظ في كل الأجهزة حتى ينتهي ويحتاج مساحة فارغة بقدر حجم الملف "
+                   f"({status['file_bytes'] / (1024 * 1024):,.1f} MB)، فيُشغل خارج ساعات العمل")
+        if st.button("♻️ تحويل auto_vacuum الآن"):
+            with st.spinner("جاري VACUUM..."):
+                result = maintenance.convert_auto_vacuum()
+            if result.status == 'ok':
+                st.success(f"✅ تم التحويل في {result.seconds:.1f} ث، "
+                           f"وتم استرجاع {result.bytes_reclaimed / (1024 * 1024):.2f} MB")
+            else:
+                st.error(f"❌ لم يتم التحويل: {result.details}")
+
+    history = maintenance.history()
+    if not history.empty:
+        history['bytes_reclaimed'] = (history['bytes_reclaimed'] / (1024 * 1024)).round(2)
+        st.dataframe(
+            history.rename(columns={
+                'run_id': 'التشغيل', 'task': 'المهمة', 'status': 'الحالة', 'duration_ms': 'المدة (ms)',
+                'bytes_reclaimed': 'المسترجع (MB)', 'details': 'التفاصيل', 'started_at': 'الوقت (UTC)'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+
+def render_memory_report():
+    """ذاكرة القوائم الكبيرة قبل ضغط الأنواع وبعده"""
+    st.markdown("#### 📐 ذاكرة القوائم")
+    if st.button("📐 قياس ذاكرة القوائم"):
+        with st.spinner("جاري تحميل القوائم..."):
+            with memory_report() as reports:
+                for load in (crud.get_all_patients, crud.get_all_appointments, crud.get_all_payments,
+                             crud.get_all_expenses, crud.get_all_inventory, crud.get_all_doctors,
+                             crud.get_all_treatments, crud.get_all_suppliers):
+                    load()
+        report = pd.DataFrame([{
+            'القائمة': entry.name, 'الصفوف': entry.rows,
+            'قبل (MB)': round(entry.bytes_before / (1024 * 1024), 2),
+            'بعد (MB)': round(entry.bytes_after / (1024 * 1024), 2),
+            'التوفير (MB)': round(entry.bytes_saved / (1024 * 1024), 2)
+        } for entry in reports])
+        st.dataframe(report, use_container_width=True, hide_index=True)
+        saved = sum(entry.bytes_saved for entry in reports)
+        before = sum(entry.bytes_before for entry in reports)
+        st.caption(f"التوفير الكلي {saved / (1024 * 1024):.2f} MB ({saved / before:.0%})" if before else "")
+
+def render_backup_store():
+    """مستودع النسخ بدون تكرار: القطع المتغيرة فقط تُخزن مضغوطة"""
+    st.markdown("### 🗃️ مستودع النسخ الاحتياطية")
+    st.info("كل نسخة تُقسم إلى قطع، ولا يُخزن إلا ما تغير منذ النسخ السابقة، "
+            f"فالنسخ المتكررة لا تضاعف المساحة. المستودع في `{backup_store.root}`")
+
+    store_stats = backup_store.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("💾 النسخ", store_stats['backups'])
+    col2.metric("📦 حجم النسخ", f"{store_stats['logical_bytes'] / (1024 * 1024):,.1f} MB")
+    col3.metric("🗜️ المساحة الفعلية", f"{store_stats['stored_bytes'] / (1024 * 1024):,.1f} MB")
+    col4.metric("📉 نسبة التوفير", f"{store_stats['ratio']:.1f}x")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        compression = st.selectbox("الضغط", ["zlib", "lzma"], help="lzma أصغر وأبطأ", key="store_compression")
+        if st.button("➕ إضافة نسخة للمستودع", type="primary"):
+            backup_store.compression = compression
+            with st.spinner("جاري إنشاء النسخة..."):
+                result = backup_store.create_backup()
+            st.success(f"✅ {result.backup_id}: {result.new_chunks:,} قطعة جديدة من {result.chunks:,} "
+                       f"({result.new_bytes / (1024 * 1024):,.2f} MB) في {result.seconds:.1f} ث")
+
+    with col2:
+        st.markdown("#### 🧹 الاحتفاظ")
+        keep1, keep2, keep3 = st.columns(3)
+        hourly = keep1.number_input("ساعات", min_value=0, value=24, key="keep_hourly")
+        daily = keep2.number_input("أيام", min_value=0, value=7, key="keep_daily")
+        monthly = keep3.number_input("شهور", min_value=0, value=12, key="keep_monthly")
+        if st.button("🧹 تطبيق الاحتفاظ"):
+            removed = backup_store.prune(hourly=int(hourly), daily=int(daily), monthly=int(monthly))
+            st.success(f"✅ حُذفت {removed['backups']} نسخة و{removed['chunks']:,} قطعة "
+                       f"({removed['bytes'] / (1024 * 1024):,.2f} MB)")
+
+    manifests = backup_store.manifests()
+    if manifests:
+        st.dataframe(
+            pd.DataFrame([{
+                'المعرف': manifest['id'], 'النوع': manifest['kind'], 'التاريخ': manifest['created_at'],
+                'الحجم (MB)': round(manifest['size'] / (1024 * 1024), 1), 'القطع': len(manifest['chunks'])
+            } for manifest in manifests]),
+            use_container_width=True,
+            hide_index=True
+        )
+        backup_id = st.selectbox("النسخة", [manifest['id'] for manifest in manifests], key="store_backup_id")
+        col1, col2 = st.columns(2)
+        if col1.button("🔍 التحقق من النسخة"):
+            with st.spinner("جاري التحقق..."):
+                damaged = backup_store.verify(backup_id)
+            if damaged:
+                st.error(f"❌ {len(damaged)} قطعة تالفة أو مفقودة")
+            else:
+                st.success("✅ كل القطع سليمة")
+        if col2.button("📥 استعادة النسخة إلى ملف"):
+            output_path = os.path.join(db.backup_dir, f"restored_{backup_id}.db")
+            with st.spinner("جاري الاستعادة..."):
+                seconds = backup_store.restore(backup_id, output_path)
+            st.success(f"✅ `{output_path}` في {seconds:.2f} ث")
+            archive_output = db.archive_path_for(output_path)
+            if os.path.exists(archive_output):
+                st.caption(f"قاعدة الأرشيف: `{archive_output}`")
+
+def render_point_in_time_restore():
+    """الاستعادة لأي لحظة من أقرب نسخة احتياطية وسجل التغييرات"""
+    st.markdown("### ⏪ استعادة لنقطة زمنية")
+    st.info("كل تغيير يُحفظ في سجل بجانب النسخ الاحتياطية، فيمكن بناء القاعدة كما كانت في أي لحظة "
+            "بعد أقدم نسخة احتياطية يغطيها السجل")
+
+    change_journal.ship()
+    journal_stats = change_journal.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("📒 حجم السجل", f"{journal_stats['journal_bytes'] / (1024 * 1024):.2f} MB")
+    col2.metric("🔢 التغييرات", f"{journal_stats['entries']:,}")
+    col3.metric("📏 متوسط التغيير", f"{journal_stats['bytes_per_entry']:.0f} بايت")
+    col4.metric("💾 النسخ الاحتياطية", journal_stats['backups'])
+    if journal_stats['oldest']:
+        st.caption(f"السجل من {journal_stats['oldest'][:19]} إلى {journal_stats['newest'][:19]} (UTC)")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        restore_date = st.date_input("التاريخ", value=datetime.now().date(), key="pitr_date")
+    with col2:
+        restore_time = st.time_input("الوقت", value=datetime.now().time().replace(microsecond=0),
+                                     step=60, key="pitr_time")
+    # السجل بتوقيت UTC والإدخال بالتوقيت المحلي
+    local_moment = datetime.combine(restore_date, restore_time).astimezone()
+    target_time = local_moment.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.999")
+
+    if st.button("⏪ بناء نسخة مستعادة", type="primary"):
+        try:
+            with st.spinner("جاري الاستعادة..."):
+                st.session_state['pitr_result'] = change_journal.restore(target_time)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+
+    result = st.session_state.get('pitr_result')
+    if result:
+        st.success(f"✅ النسخة المستعادة: `{result.output_path}`")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("🔁 تغييرات مُعادة", f"{result.replayed:,}")
+        col2.metric("✍️ صفوف مكتوبة", f"{result.rows_written:,}")
+        col3.metric("⏱️ المدة", f"{result.seconds:.2f} ث")
+        col4.metric("⚡ السرعة", f"{result.changes_per_second:,.0f} تغيير/ث")
+        st.caption(f"من النسخة `{os.path.basename(result.base_backup)}`")
+
+        confirm = st.checkbox("أفهم أن التغييرات بعد هذه اللحظة ستُلغى من القاعدة الحالية", key="pitr_confirm")
+        if st.button("♻️ استبدال القاعدة الحالية بالنسخة المستعادة", disabled=not confirm):
+            with st.spinner("جاري الاستبدال..."):
+                safety_backup = change_journal.replace_database(result)
+            del st.session_state['pitr_result']
+            st.cache_data.clear()
+            st.success(f"✅ تم الاستبدال. نسخة الحالة السابقة: `{safety_backup}`")
+
+def render_archive_settings():
+    """أرشفة السجلات القديمة في قاعدة الأرشيف"""
+    st.markdown("### 🗄️ أرشفة السجلات القديمة")
+    st.info("المواعيد المنتهية والمدفوعات المكتملة والمصروفات الأقدم من المدة المحددة تُنقل إلى "
+            f"`{db.archive_path}`، وتبقى ظاهرة في سجل المريض والتقارير")
+
+    archive_stats = crud.get_archive_stats()
+    st.dataframe(
+        archive_stats.rename(columns={
+            'table_name': 'الجدول', 'current_rows': 'صفوف حالية', 'archived_rows': 'صفوف مؤرشفة',
+            'oldest_current': 'أقدم تاريخ حالي', 'newest_archived': 'أحدث تاريخ مؤرشف'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    older_than_years = st.number_input("أرشفة السجلات الأقدم من (سنة)", min_value=1, max_value=20, value=3)
+    if st.button("🗄️ أرشفة الآن"):
+        with st.spinner("جاري نقل السجلات إلى الأرشيف..."):
+            moved = crud.archive_old_records(older_than_days=int(older_than_years) * 365)
+        st.success("✅ تم النقل: " + "، ".join(f"{table}: {count:,}" for table, count in moved.items()))
 
 def render_notification_settings():
     """إعدادات الإشعارات"""
@@ -217,4 +441,52 @@ def render_notification_settings():
                     st.success("✅ تم إضافة الإشعار")
                     st.rerun()
                 else:
-                    st.warning("⚠️ يرجى ملء العنوان والرسالة")
\ No newline at end of file
+                    st.warning("⚠️ يرجى ملء العنوان والرسالة")
+
+IMPORT_ENTITIES = {
+    "المرضى": ("patients", "name, phone, email, address, date_of_birth, gender, medical_history, emergency_contact"),
+    "المواعيد": ("appointments", "patient, doctor, date, time, treatment, status, notes, total_cost"),
+    "المدفوعات": ("payments", "patient, amount, payment_method, payment_date, appointment_id, notes"),
+}
+
+def render_import_settings():
+    """استيراد كميات كبيرة من ملفات CSV أو Excel"""
+    st.markdown("### 📥 استيراد البيانات")
+    st.info("المريض والطبيب يُحددان بالمعرف أو رقم الهاتف أو الاسم. التواريخ بصيغة YYYY-MM-DD أو DD/MM/YYYY")
+
+    label = st.selectbox("نوع البيانات", list(IMPORT_ENTITIES), key="import_entity")
+    entity, columns = IMPORT_ENTITIES[label]
+    st.caption(f"الأعمدة: {columns}")
+    uploaded = st.file_uploader("ملف CSV أو Excel", type=["csv", "xlsx"], key="import_file")
+
+    if uploaded is not None and st.button("📥 بدء الاستيراد", type="primary"):
+        progress_bar = st.progress(0.0)
+        status = st.empty()
+
+        def progress(result):
+            status.text(f"{result.total_rows:,} صف: {result.imported:,} مستورد، {result.rejected:,} مرفوض "
+                        f"({result.rows_per_second:,.0f} صف/ث)")
+            progress_bar.progress(min(1.0, uploaded.tell() / max(uploaded.size, 1)))
+
+        reject_path = os.path.join(tempfile.mkdtemp(), f"{entity}_rejected.csv")
+        try:
+            result = bulk_importer.import_file(entity, uploaded, file_name=uploaded.name,
+                                               reject_path=reject_path, progress=progress)
+        except (ValueError, sqlite3.Error) as e:
+            # الدفعات السابقة للخطأ تبقى مستوردة
+            st.error(f"❌ توقف الاستيراد: {e}")
+            return
+
+        progress_bar.progress(1.0)
+        st.success(f"✅ تم استيراد {result.imported:,} من {result.total_rows:,} صف في {result.seconds:.1f} ث "
+                   f"({result.rows_per_second:,.0f} صف/ث)")
+        if result.reject_path:
+            st.warning(f"تم رفض {result.rejected:,} صف")
+            st.dataframe(
+                pd.DataFrame(list(result.reject_reasons.items()), columns=["السبب", "العدد"]),
+                use_container_width=True,
+                hide_index=True
+            )
+            with open(result.reject_path, 'rb') as f:
+                st.download_button("📄 تحميل الصفوف المرفوضة", f.read(),
+                                   file_name=os.path.basename(result.reject_path), mime="text/csv")
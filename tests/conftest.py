@@ -0,0 +1,27 @@
+"""إعداد مشترك للاختبارات.
+
+database.models تنشئ كائن Database واحداً للعملية عند أول استيراد وتقرأ مساره من
+CLINIC_DB_PATH، فيُضبط المسار هنا على مجلد مؤقت قبل أن يستورد أي ملف اختبار database،
+وتستخدم كل الاختبارات نفس القاعدة المؤقتة (لا تُلمس clinic.db ولا backups في المشروع).
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_DB_DIR = tempfile.mkdtemp(prefix="clinic_tests_")
+os.environ["CLINIC_DB_PATH"] = os.path.join(_DB_DIR, "clinic.db")
+os.environ.pop("CLINIC_ARCHIVE_DB_PATH", None)
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope="session")
+def clinic_db():
+    """قاعدة الاختبارات المؤقتة بعد إنشاء جداولها"""
+    from database.models import db
+    assert db.db_path == os.environ["CLINIC_DB_PATH"], "database حُملت قبل conftest بمسار آخر"
+    db.initialize()
+    return db
@@ -0,0 +1,55 @@
+"""اختبار الاستعادة لنقطة زمنية: نسخة أساسية ثم كتابة ثم استعادة واستبدال القاعدة"""
+
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from database.crud import crud
+from database.journal import change_journal
+from database.reference_data import reference_data
+
+def utc_now():
+    # بنفس صيغة changed_at في مشغلات changes
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def add_patient(name):
+    patient_id = crud.create_patient(name, "01099990000", "", "", "1990-01-01", "ذكر")
+    assert patient_id
+    return patient_id
+
+@pytest.fixture
+def restored(clinic_db):
+    """مريض بعد النسخة الأساسية يبقى بعد الاستعادة، ومريض بعد اللحظة المطلوبة يُلغى"""
+    change_journal.ship()
+    assert clinic_db.backup_database('test') is not None
+
+    kept_id = add_patient("سمير زيدان")
+    time.sleep(0.01)
+    target_time = utc_now()
+    time.sleep(0.01)
+    dropped_id = add_patient("زينب مراد")
+    # الخريطة محملة قبل الاستبدال مثل جلسة تعمل
+    assert reference_data.name('patients', dropped_id) == "زينب مراد"
+
+    result = change_journal.restore(target_time)
+    change_journal.replace_database(result)
+    return clinic_db, kept_id, dropped_id
+
+def test_replayed_patients_are_searchable(restored):
+    clinic_db, kept_id, dropped_id = restored
+    # "زي" بداية الكلمة الثانية فقط، فلا يجدها إلا فهرس الكلمات
+    found = [row[0] for row in crud.find_patients("زي")]
+    assert kept_id in found
+    assert dropped_id not in found
+
+    conn = clinic_db.get_connection()
+    try:
+        conn.execute("INSERT INTO patients_name_fts (patients_name_fts, rank) VALUES ('integrity-check', 1)")
+    finally:
+        conn.close()
+
+def test_replace_drops_stale_reference_names(restored):
+    _, kept_id, dropped_id = restored
+    assert reference_data.name('patients', kept_id) == "سمير زيدان"
+    assert reference_data.name('patients', dropped_id) == "غير معروف"
@@ -0,0 +1,154 @@
+"""ترحيل أعمدة المبالغ من REAL بالجنيه إلى INTEGER بالقرش، وتحويل المبالغ وتنسيقها"""
+
+import sqlite3
+
+import pytest
+
+from database.money import to_piasters
+from utils.helpers import format_currency
+
+# الأعمدة التي تُعاد إلى تعريفها القديم في نسخة القاعدة: (الجدول، العمود، النوع الحالي، النوع القديم)
+LEGACY_COLUMNS = [
+    ('payments', 'amount', 'amount INTEGER NOT NULL', 'amount REAL NOT NULL'),
+    ('expenses', 'amount', 'amount INTEGER NOT NULL', 'amount REAL NOT NULL'),
+    ('doctors', 'salary', 'salary INTEGER,', 'salary REAL,'),
+    ('period_payment_method_snapshots', 'total', 'total INTEGER DEFAULT 0,', 'total REAL DEFAULT 0.0,'),
+]
+
+def schema_of(conn, table):
+    return {
+        row[0]: row[1] for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger')", (table,)
+        )
+    }
+
+def column_types(conn, table):
+    return {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+@pytest.fixture
+def legacy_db(clinic_db, tmp_path):
+    """نسخة من قاعدة الاختبارات بأعمدة المبالغ القديمة (REAL بالجنيه) بكل فهارسها ومشغلاتها"""
+    path = str(tmp_path / "legacy.db")
+    source = clinic_db.get_connection()
+    conn = sqlite3.connect(path)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+
+    conn.execute("DELETE FROM accounting_periods")
+    conn.executemany(
+        "INSERT INTO payments (patient_id, amount, payment_method, payment_date) VALUES (1, ?, 'نقدي', '2031-05-10')",
+        [(15050,), (1,)]
+    )
+    conn.execute("DELETE FROM payments WHERE id = (SELECT MAX(id) FROM payments)")
+    conn.commit()
+
+    # تغيير النوع في التعريف فقط ثم تحويل القيم المخزنة إلى جنيه كما كانت في القواعد القديمة
+    conn.execute("PRAGMA writable_schema = ON")
+    for table, _, current, legacy in LEGACY_COLUMNS:
+        changed = conn.execute(
+            "UPDATE sqlite_master SET sql = replace(sql, ?, ?) WHERE type = 'table' AND name = ?",
+            (current, legacy, table)
+        ).rowcount
+        assert changed == 1, table
+    conn.execute("PRAGMA writable_schema = OFF")
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    for table, column, _, _ in LEGACY_COLUMNS:
+        assert column_types(conn, table)[column] == 'REAL'
+        conn.execute(f"UPDATE {table} SET {column} = {column} / 100.0")
+    conn.commit()
+    yield conn
+    conn.close()
+
+def test_migrates_real_columns_to_piasters(clinic_db, legacy_db):
+    conn = legacy_db
+    conn.execute("INSERT INTO expenses (category, description, amount, expense_date) VALUES ('أخرى', 'نصف قرش', 0.125, '2031-05-10')")
+    conn.execute("INSERT INTO expenses (category, description, amount, expense_date) VALUES ('أخرى', 'كسور', 99.99, '2031-05-10')")
+    conn.commit()
+
+    pounds = {
+        table: conn.execute(f"SELECT rowid, {column} FROM {table} ORDER BY rowid").fetchall()
+        for table, column, _, _ in LEGACY_COLUMNS
+    }
+    dependents = {table: schema_of(conn, table) for table, _, _, _ in LEGACY_COLUMNS}
+    sequences = dict(conn.execute("SELECT name, seq FROM sqlite_sequence"))
+    assert sequences['payments'] > conn.execute("SELECT MAX(id) FROM payments").fetchone()[0]
+
+    clinic_db.migrate_money_columns(conn, conn.cursor())
+
+    for table, column, _, _ in LEGACY_COLUMNS:
+        assert column_types(conn, table)[column] == 'INTEGER'
+        rows = conn.execute(f"SELECT rowid, {column}, typeof({column}) FROM {table} ORDER BY rowid").fetchall()
+        expected = [(rowid, to_piasters(value)) for rowid, value in pounds[table]]
+        assert [(rowid, value) for rowid, value, _ in rows] == expected
+        assert {kind for _, value, kind in rows if value is not None} <= {'integer'}
+        assert schema_of(conn, table) == dependents[table]
+
+    # commission_rate بجوار salary ليس من أعمدة المبالغ فيبقى REAL
+    assert column_types(conn, 'doctors')['commission_rate'] == 'REAL'
+    table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'period_payment_method_snapshots'").fetchone()[0]
+    assert 'total INTEGER DEFAULT 0,' in table_sql
+    assert [row[0] for row in conn.execute("SELECT amount FROM expenses WHERE expense_date = '2031-05-10' ORDER BY id")] == [13, 9999]
+
+    assert dict(conn.execute("SELECT name, seq FROM sqlite_sequence")) == sequences
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+
+    # المشغلات المعاد إنشاؤها تعمل على الجدول الجديد
+    payment_id = conn.execute(
+        "INSERT INTO payments (patient_id, amount, payment_method, payment_date) VALUES (1, 2550, 'نقدي', '2031-05-10')"
+    ).lastrowid
+    assert payment_id > sequences['payments']
+    change = conn.execute(
+        "SELECT op, json_extract(data, '$.amount') FROM changes WHERE table_name = 'payments' AND row_id = ? ORDER BY seq DESC",
+        (payment_id,)
+    ).fetchone()
+    assert change == ('insert', 2550)
+    conn.execute("INSERT INTO accounting_periods (period, closed_by) VALUES ('2031-05', 'test')")
+    with pytest.raises(sqlite3.IntegrityError, match='مقفلة'):
+        conn.execute("INSERT INTO payments (patient_id, amount, payment_method, payment_date) VALUES (1, 100, 'نقدي', '2031-05-11')")
+    conn.rollback()
+
+def test_second_run_changes_nothing(clinic_db, legacy_db):
+    conn = legacy_db
+    clinic_db.migrate_money_columns(conn, conn.cursor())
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    amounts = conn.execute("SELECT id, amount FROM payments ORDER BY id").fetchall()
+    changes = conn.total_changes
+
+    clinic_db.migrate_money_columns(conn, conn.cursor())
+
+    assert conn.execute("PRAGMA schema_version").fetchone()[0] == schema_version
+    assert conn.execute("SELECT id, amount FROM payments ORDER BY id").fetchall() == amounts
+    assert conn.total_changes == changes
+
+@pytest.mark.parametrize("amount, piasters", [
+    (0.285, 29),
+    (0.125, 13),
+    ("1,250.505", 125051),
+    (" 99.99 ", 9999),
+    (150, 15000),
+    (-0.005, -1),
+    (None, None),
+    ("", None),
+    (float("nan"), None),
+])
+def test_to_piasters_rounds_half_up(amount, piasters):
+    assert to_piasters(amount) == piasters
+
+def test_to_piasters_rejects_text():
+    with pytest.raises(ValueError):
+        to_piasters("خمسون")
+
+@pytest.mark.parametrize("piasters, text", [
+    (123456, "1,234.56 ج.م"),
+    (5, "0.05 ج.م"),
+    (-250, "-2.50 ج.م"),
+    (0, "0.00 ج.م"),
+])
+def test_format_currency_from_piasters(piasters, text):
+    assert format_currency(piasters, piasters=True) == text
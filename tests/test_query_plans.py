@@ -0,0 +1,201 @@
+"""اختبارات خطط الاستعلام لـ CRUDOperations.
+
+كل دالة في CRUDOperations تُستدعى (بنفس حالات tools/benchmark.py) على قاعدة بيانات
+كاملة الجداول، وتُلتقط كل جملة SQL تنفذها، ثم تُقارن خطة EXPLAIN QUERY PLAN لكل
+جملة بالخطة المحفوظة في snapshots/query_plans.json. الاختبار يفشل إذا:
+  - أصبحت جملة تمسح جدولاً كبيراً بالكامل (SCAN) بعد أن كانت تستخدم فهرساً
+  - أصبح ORDER BY أو GROUP BY يحتاج جدولاً مؤقتاً (USE TEMP B-TREE)
+  - ظهرت جملة جديدة ليس لها خطة محفوظة
+
+لتحديث الخطط المحفوظة بعد تغيير مقصود:
+    UPDATE_QUERY_PLANS=1 python -m pytest tests/test_query_plans.py
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+
+import pytest
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots", "query_plans.json")
+
+# القاعدة المؤقتة يضبطها conftest.py قبل هذا الاستيراد
+from database.activity_logger import activity_logger  # noqa: E402
+from database.crud import CRUDOperations, crud  # noqa: E402
+from database.models import db  # noqa: E402
+from database.reference_data import reference_data  # noqa: E402
+from tools.benchmark import CASES, Context  # noqa: E402
+
+# الجداول التي تنمو مع عمل العيادة، ومسحها بالكامل تراجع في الأداء
+LARGE_TABLES = {
+    'patients', 'appointments', 'payments', 'expenses', 'inventory_usage', 'accounts',
+    'financial_transactions', 'vouchers', 'activity_log', 'period_account_snapshots'
+}
+PARTITION_TABLE = re.compile(r"^activity_log_\d{6}$")
+# جداول temp تنشئها الدالة وتحذفها قبل انتهائها، فلا يمكن شرح جملها بعد التشغيل
+TEMP_TABLE = re.compile(r"\btemp\.\w+", re.IGNORECASE)
+# جمل FTS5 الداخلية على جداوله الظلية (تظهر في trace لكنها ليست من الكود)
+FTS_SHADOW_TABLE = re.compile(r"'\w+_(?:config|data|idx|content|docsize)'")
+
+PLANNED_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+SQL_KEYWORDS = {
+    'WHERE', 'ON', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'OUTER', 'GROUP', 'ORDER', 'LIMIT',
+    'UNION', 'SET', 'USING', 'AS', 'VALUES', 'HAVING', 'WINDOW', 'RETURNING', 'NATURAL'
+}
+
+def normalize_sql(sql):
+    """الجملة بدون القيم الحرفية وبمسافات موحدة حتى تتطابق بين التشغيلات"""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])", "?", sql)
+    # NULL قيمة حرفية في قوائم القيم (صفوف دفعة سجل الأنشطة مثلاً)
+    sql = re.sub(r"(?<=[(,])(\s*)NULL\b", r"\1?", sql)
+    sql = re.sub(r"\?(?:\s*,\s*\?)+", "?", sql)
+    return re.sub(r"\s+", " ", sql).strip()
+
+def table_aliases(sql):
+    """خريطة الاسم المستعار -> الجدول من FROM/JOIN/UPDATE/INTO"""
+    aliases = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+def is_large(table):
+    return table in LARGE_TABLES or bool(PARTITION_TABLE.match(table))
+
+def full_scans(sql, plan):
+    """الجداول الكبيرة التي تُمسح بالكامل (بدون فهرس يحدد الصفوف)"""
+    aliases = table_aliases(sql)
+    scanned = set()
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)", detail)
+        if match:
+            table = aliases.get(match.group(1), match.group(1))
+            if is_large(table):
+                scanned.add(table)
+    return scanned
+
+def temp_btrees(plan):
+    return sorted({detail for detail in plan if detail.startswith("USE TEMP B-TREE")})
+
+class StatementRecorder:
+    """التقاط الجمل المنفذة من كل اتصال مع اسم الدالة الجارية"""
+
+    def __init__(self):
+        self.statements = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def label(self, name):
+        self._local.label = name
+
+    def record(self, sql):
+        if not sql.lstrip().upper().startswith(PLANNED_STATEMENTS) or FTS_SHADOW_TABLE.search(sql):
+            return
+        label = getattr(self._local, 'label', None) or 'background'
+        key = f"{label}: {normalize_sql(sql)}"
+        with self._lock:
+            self.statements.setdefault(key, {'method': label, 'sql': sql})
+
+def explain(db_path, sql):
+    # اتصال مربوط بالأرشيف حتى تُشرح الجمل التي تقرأ views السجل الكامل
+    conn = sqlite3.connect(db_path)
+    db.attach_archive(conn)
+    try:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    finally:
+        conn.close()
+
+@pytest.fixture(scope="module")
+def captured_plans(clinic_db):
+    recorder = StatementRecorder()
+    original = db.get_connection
+
+    def traced_connection(*args, **kwargs):
+        conn = original(*args, **kwargs)
+        conn.set_trace_callback(recorder.record)
+        return conn
+
+    # نفس حالة عملية جديدة مهما سبقها من اختبارات: الخرائط تُحمل عند أول طلب، وما في
+    # طابور سجل الأنشطة يُكتب قبل الالتقاط
+    reference_data.invalidate()
+    activity_logger.flush()
+    db.get_connection = traced_connection
+    try:
+        ctx = Context(crud, db.db_path)
+        for name, case in CASES.items():
+            recorder.label(name)
+            for _ in range(case.repeat or 2):
+                if case.setup:
+                    case.setup(ctx)
+                args, kwargs = case.args(ctx)
+                getattr(crud, name)(*args, **kwargs)
+                if case.teardown:
+                    case.teardown(ctx)
+            recorder.label(None)
+        activity_logger.flush()
+    finally:
+        db.get_connection = original
+
+    plans = {}
+    unexplained = []
+    for key, statement in sorted(recorder.statements.items()):
+        try:
+            plan = explain(db.db_path, statement['sql'])
+        except sqlite3.Error as e:
+            if TEMP_TABLE.search(statement['sql']):
+                continue
+            # جملة لم تعد تطابق المخطط تفشل هنا بدلاً من أن تختفي من المقارنة
+            unexplained.append(f"{key}\n    {e}")
+            continue
+        plans[key] = {'method': statement['method'], 'plan': plan}
+    if unexplained:
+        pytest.fail("جمل لا يمكن شرح خطتها على المخطط الحالي:\n" + "\n".join(unexplained))
+    return plans
+
+def test_every_crud_method_is_exercised():
+    public = sorted(name for name in vars(CRUDOperations) if not name.startswith('_') and callable(getattr(crud, name)))
+    missing = [name for name in public if name not in CASES]
+    assert not missing, f"دوال بدون حالة في tools/benchmark.py CASES: {missing}"
+
+def test_query_plans_match_snapshots(captured_plans):
+    if os.environ.get("UPDATE_QUERY_PLANS"):
+        os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+        with open(SNAPSHOT_PATH, 'w', encoding='utf-8') as f:
+            json.dump(captured_plans, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        pytest.skip(f"تم تحديث {SNAPSHOT_PATH}")
+
+    with open(SNAPSHOT_PATH, encoding='utf-8') as f:
+        snapshots = json.load(f)
+
+    failures = []
+    for key, current in captured_plans.items():
+        stored = snapshots.get(key)
+        sql = key.split(": ", 1)[1]
+        if stored is None:
+            failures.append(f"جملة جديدة بدون خطة محفوظة:\n    {key}\n    {current['plan']}")
+            continue
+
+        new_scans = full_scans(sql, current['plan']) - full_scans(sql, stored['plan'])
+        if new_scans:
+            failures.append(f"مسح كامل جديد لـ {sorted(new_scans)}:\n    {key}\n"
+                            f"    قبل: {stored['plan']}\n    بعد: {current['plan']}")
+
+        new_temp = set(temp_btrees(current['plan'])) - set(temp_btrees(stored['plan']))
+        if new_temp:
+            failures.append(f"جدول مؤقت جديد {sorted(new_temp)}:\n    {key}\n"
+                            f"    قبل: {stored['plan']}\n    بعد: {current['plan']}")
+
+    assert not failures, "تراجع في خطط الاستعلام (UPDATE_QUERY_PLANS=1 لتحديث الخطط إن كان التغيير مقصوداً):\n" + "\n".join(failures)
+
+def test_full_scan_detection():
+    plan = ['SCAN a', 'SEARCH p USING INTEGER PRIMARY KEY (rowid=?)', 'USE TEMP B-TREE FOR ORDER BY']
+    sql = "SELECT * FROM appointments a JOIN patients p ON a.patient_id = p.id ORDER BY a.notes"
+    assert full_scans(sql, plan) == {'appointments'}
+    assert temp_btrees(plan) == ['USE TEMP B-TREE FOR ORDER BY']
+    assert full_scans("SELECT * FROM doctors", ['SCAN doctors']) == set()
+    assert full_scans("SELECT * FROM activity_log_202401", ['SCAN activity_log_202401']) == {'activity_log_202401'}
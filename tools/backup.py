@@ -0,0 +1,95 @@
+"""مستودع النسخ الاحتياطية بدون تكرار: إضافة نسخة، العرض، الاحتفاظ، التحقق، والاستعادة.
+
+مناسب للتشغيل الدوري (cron أو Task Scheduler) كل ساعة مع prune بعده.
+
+أمثلة:
+    python -m tools.backup create --kind hourly
+    python -m tools.backup list
+    python -m tools.backup prune --hourly 24 --daily 7 --monthly 12
+    python -m tools.backup verify
+    python -m tools.backup restore 20251017_054424_123456 restored.db
+"""
+
+import argparse
+import os
+import sys
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="مستودع النسخ الاحتياطية للعيادة")
+    parser.add_argument("--db", help="ملف قاعدة البيانات (افتراضياً CLINIC_DB_PATH أو clinic.db)")
+    parser.add_argument("--compression", choices=["zlib", "lzma"], default="zlib", help="ضغط القطع الجديدة")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="إضافة نسخة من القاعدة الحالية")
+    create.add_argument("--kind", default="manual", help="نوع النسخة (manual أو hourly ...)")
+
+    commands.add_parser("list", help="عرض النسخ وحجم المستودع")
+
+    prune = commands.add_parser("prune", help="تطبيق قواعد الاحتفاظ وحذف القطع غير المستخدمة")
+    prune.add_argument("--hourly", type=int, default=24, help="عدد الساعات الأخيرة (نسخة لكل ساعة)")
+    prune.add_argument("--daily", type=int, default=7, help="عدد الأيام الأخيرة (نسخة لكل يوم)")
+    prune.add_argument("--monthly", type=int, default=12, help="عدد الشهور الأخيرة (نسخة لكل شهر)")
+
+    verify = commands.add_parser("verify", help="التحقق من sha256 لكل القطع")
+    verify.add_argument("backup_id", nargs="?", help="نسخة واحدة فقط")
+
+    restore = commands.add_parser("restore", help="إعادة تجميع نسخة في ملف")
+    restore.add_argument("backup_id", help="معرف النسخة (من list)")
+    restore.add_argument("output", help="ملف الناتج")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.db:
+        os.environ["CLINIC_DB_PATH"] = args.db
+
+    from database.backup_store import backup_store
+    from database.models import db
+
+    backup_store.compression = args.compression
+
+    if args.command == "create":
+        db.initialize()
+        result = backup_store.create_backup(kind=args.kind)
+        print(f"✅ {result.backup_id}: {result.size / (1024 * 1024):,.1f} MB في {result.chunks:,} قطعة، "
+              f"{result.new_chunks:,} جديدة ({result.new_bytes / (1024 * 1024):,.2f} MB مضغوطة) "
+              f"في {result.seconds:.1f} ث")
+    elif args.command == "list":
+        for manifest in backup_store.manifests():
+            print(f"  {manifest['id']}  {manifest['kind']:<8} {manifest['created_at']}  "
+                  f"{manifest['size'] / (1024 * 1024):,.1f} MB  seq={manifest['base_seq']}")
+        stats = backup_store.stats()
+        print(f"📦 {stats['backups']} نسخة، {stats['logical_bytes'] / (1024 * 1024):,.1f} MB مخزنة في "
+              f"{stats['stored_bytes'] / (1024 * 1024):,.1f} MB ({stats['ratio']:.1f}x)")
+    elif args.command == "prune":
+        removed = backup_store.prune(hourly=args.hourly, daily=args.daily, monthly=args.monthly)
+        print(f"🧹 حُذفت {removed['backups']} نسخة و{removed['chunks']:,} قطعة "
+              f"({removed['bytes'] / (1024 * 1024):,.2f} MB)")
+    elif args.command == "verify":
+        try:
+            damaged = backup_store.verify(args.backup_id)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        if damaged:
+            print(f"❌ {len(damaged)} قطعة تالفة أو مفقودة")
+            for digest in damaged:
+                print(f"  {digest}")
+            return 1
+        print("✅ كل القطع سليمة")
+    elif args.command == "restore":
+        try:
+            seconds = backup_store.restore(args.backup_id, args.output)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        size = os.path.getsize(args.output)
+        print(f"✅ {args.output}: {size / (1024 * 1024):,.1f} MB في {seconds:.2f} ث "
+              f"({size / (1024 * 1024) / seconds if seconds else 0:,.0f} MB/ث)")
+        archive_output = db.archive_path_for(args.output)
+        if os.path.exists(archive_output):
+            print(f"  الأرشيف: {archive_output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
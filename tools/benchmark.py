@@ -0,0 +1,447 @@
+"""قياس أداء دوال CRUDOperations وزمن عرض الصفحات على أحجام مختلفة من البيانات.
+
+لكل حجم تُولد قاعدة بيانات بـ tools.generate_data (وتُحفظ للتشغيلات التالية)، ثم
+تُقاس كل دالة قراءة وكتابة على نسخة منها في عملية مستقلة، وكذلك زمن عرض كل صفحة
+من page_mapping في app.py عبر AppTest. النتائج تُكتب JSON ويمكن مقارنتها بملف
+نتائج سابق (baseline) مع فشل التشغيل عند وجود تراجع أكبر من الحد المسموح.
+
+أمثلة:
+    python -m tools.benchmark --sizes small --output bench.json
+    python -m tools.benchmark --sizes small medium --baseline baseline.json --threshold 0.3
+    python -m tools.benchmark --sizes small --no-pages --only get_all_ find_patients
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# الصفحات كما في page_mapping داخل app.py
+PAGES = [
+    'dashboard', 'appointments', 'patients', 'doctors', 'treatments', 'payments',
+    'inventory', 'suppliers', 'expenses', 'reports', 'settings', 'activity_log'
+]
+
+class Case:
+    """حالة قياس لدالة واحدة.
+
+    args(ctx) تعيد (args, kwargs) لكل تكرار، و setup/teardown تُنفذ خارج القياس
+    (مثلاً إنشاء سجل قبل قياس حذفه). repeat يحدد عدد التكرارات إن اختلف عن العام.
+    """
+
+    def __init__(self, kind, args=None, setup=None, teardown=None, repeat=None):
+        self.kind = kind
+        self.args = args or (lambda ctx: ((), {}))
+        self.setup = setup
+        self.teardown = teardown
+        self.repeat = repeat
+
+def read(args=None, **options):
+    return Case('read', args, **options)
+
+def write(args=None, **options):
+    return Case('write', args, **options)
+
+def _new_doctor(ctx):
+    return ctx.crud.create_doctor("طبيب قياس", "طب الأسنان العام", "01000000000", "bench@clinic.local",
+                                  "القاهرة", ctx.today, 8000, 10)
+
+def _new_patient(ctx):
+    return ctx.crud.create_patient("مريض قياس", "01000000001", "", "القاهرة", "1990-01-01", "ذكر")
+
+def _new_treatment(ctx):
+    return ctx.crud.create_treatment("علاج قياس", "", 300, 30, "عام")
+
+def _new_notification(ctx):
+    return ctx.crud.create_notification("general", "إشعار قياس", "رسالة")
+
+def _close(ctx):
+    ctx.crud.close_period(ctx.period)
+
+def _reopen(ctx):
+    ctx.crud.reopen_period(ctx.period)
+
+CASES = {
+    # الأطباء
+    'get_all_doctors': read(),
+    'get_doctor_by_id': read(lambda ctx: ((ctx.doctor_id,), {})),
+    'create_doctor': write(lambda ctx: (("طبيب قياس", "طب الأسنان العام", "01000000000", "bench@clinic.local",
+                                         "القاهرة", ctx.today, 8000, 10), {})),
+    'update_doctor': write(lambda ctx: ((ctx.doctor_id, "طبيب معدل", "تقويم الأسنان", "01000000000", "",
+                                         "الجيزة", 9000, 12), {})),
+    'delete_doctor': write(lambda ctx: ((ctx.pop('doctor'),), {}), setup=lambda ctx: ctx.push('doctor', _new_doctor(ctx))),
+
+    # المرضى
+    'get_all_patients': read(),
+    'get_patient_by_id': read(lambda ctx: ((ctx.patient_id,), {})),
+    'search_patients': read(lambda ctx: ((ctx.patient_prefix,), {})),
+    'find_patients': read(lambda ctx: ((ctx.patient_prefix,), {})),
+    'create_patient': write(lambda ctx: (("مريض قياس", "01000000001", "", "القاهرة", "1990-01-01", "ذكر"), {})),
+    'update_patient': write(lambda ctx: ((ctx.patient_id, "مريض معدل", "01000000002", "", "الجيزة",
+                                          "1991-02-02", "أنثى", "", ""), {})),
+    'delete_patient': write(lambda ctx: ((ctx.pop('patient'),), {}), setup=lambda ctx: ctx.push('patient', _new_patient(ctx))),
+
+    # العلاجات
+    'get_all_treatments': read(),
+    'get_treatment_by_id': read(lambda ctx: ((ctx.treatment_id,), {})),
+    'create_treatment': write(lambda ctx: (("علاج قياس", "", 300, 30, "عام"), {})),
+    'update_treatment': write(lambda ctx: ((ctx.treatment_id, "علاج معدل", "", 350, 45, "عام"), {})),
+    'delete_treatment': write(lambda ctx: ((ctx.pop('treatment'),), {}), setup=lambda ctx: ctx.push('treatment', _new_treatment(ctx))),
+
+    # المواعيد
+    'get_all_appointments': read(),
+    'get_appointments_by_date': read(lambda ctx: ((ctx.today,), {})),
+    'get_patient_history': read(lambda ctx: ((ctx.patient_id,), {})),
+    'get_daily_appointments_count': read(),
+    'create_appointment': write(lambda ctx: ((ctx.patient_id, ctx.doctor_id, ctx.treatment_id, ctx.today, "10:00"),
+                                             {'total_cost': 500})),
+    'update_appointment_status': write(lambda ctx: ((ctx.appointment_id, "مؤكد"), {})),
+
+    # المدفوعات
+    'get_all_payments': read(),
+    'create_payment': write(lambda ctx: ((ctx.appointment_id, ctx.appointment_patient_id, 100, "نقدي", ctx.today), {})),
+
+    # المخزون والموردين والمصروفات
+    'get_all_inventory': read(),
+    'get_low_stock_items': read(),
+    'get_expiring_inventory': read(),
+    'create_inventory_item': write(lambda ctx: (("صنف قياس", "مستهلكات", 100, 5, 10), {'supplier_id': ctx.supplier_id})),
+    'update_inventory_quantity': write(lambda ctx: ((ctx.inventory_id, 50), {})),
+    'get_all_suppliers': read(),
+    'create_supplier': write(lambda ctx: (("مورد قياس", "مسؤول", "01000000003", "", "القاهرة", "30 يوم"), {})),
+    'get_all_expenses': read(),
+    'create_expense': write(lambda ctx: (("أخرى", "مصروف قياس", 250, ctx.today, "نقدي"), {})),
+
+    # الحسابات المالية
+    'create_or_update_account': write(lambda ctx: (("patient", ctx.patient_id, "مريض"), {})),
+    'add_financial_transaction': write(lambda ctx: ((ctx.account_id, "دفعة", 10, "حركة قياس"), {})),
+    'create_voucher': write(lambda ctx: (("receipt", ctx.account_id, 10, "نقدي", "سند قياس"), {})),
+    'get_account_balance': read(lambda ctx: (("patient", ctx.patient_id), {})),
+    'get_account_statement': read(lambda ctx: (("patient", ctx.patient_id), {})),
+    'get_patient_financial_summary': read(lambda ctx: ((ctx.patient_id,), {})),
+    'get_doctor_financial_summary': read(lambda ctx: ((ctx.doctor_id,), {})),
+    'get_supplier_financial_summary': read(lambda ctx: ((ctx.supplier_id,), {})),
+    'get_all_accounts_summary': read(),
+    'get_closed_periods': read(),
+    'close_period': write(lambda ctx: ((ctx.period,), {}), teardown=_reopen),
+    'reopen_period': write(lambda ctx: ((ctx.period,), {}), setup=_close),
+
+    # سجل الأنشطة (log_activity يقيس الإضافة لطابور الكاتب فقط)
+    'log_activity': write(lambda ctx: (("قياس", "patients", ctx.patient_id, "benchmark"), {})),
+    'get_activity_log': read(),
+    'get_activity_log_filter_values': read(),
+    'get_activity_log_writer_stats': read(),
+    'archive_activity_log': write(repeat=1),
+
+    # أرشفة السجلات القديمة (مدة أطول من تاريخ البيانات المولدة: قياس البحث دون نقل)
+    'archive_old_records': write(lambda ctx: ((), {'older_than_days': 3650}), repeat=1),
+    'get_archive_stats': read(),
+
+    # التقارير
+    'get_financial_summary': read(),
+    'get_payment_methods_stats': read(),
+    'get_expenses_by_category': read(),
+    'get_comprehensive_financial_report': read(lambda ctx: ((ctx.month_start, ctx.today), {})),
+    'get_revenue_by_period': read(lambda ctx: ((ctx.half_year_start, ctx.today), {'group_by': 'month'})),
+    'get_daily_revenue_comparison': read(),
+    'get_dashboard_stats': read(),
+
+    # الإعدادات والإشعارات
+    'get_all_settings': read(),
+    'update_setting': write(lambda ctx: (("clinic_name", "عيادة قياس"), {})),
+    'create_notification': write(lambda ctx: (("general", "إشعار قياس", "رسالة", "normal"), {})),
+    'get_all_notifications': read(),
+    'get_unread_notifications': read(),
+    'mark_notification_as_read': write(lambda ctx: ((ctx.pop('notification'),), {}),
+                                       setup=lambda ctx: ctx.push('notification', _new_notification(ctx))),
+    'mark_all_notifications_as_read': write(),
+    'generate_daily_notifications': write(),
+    'get_monthly_comparison': read(),
+}
+
+class Context:
+    """معرفات حقيقية من قاعدة البيانات تُمرر للدوال المقاسة"""
+
+    def __init__(self, crud, db_path):
+        self.crud = crud
+        self.today = date.today().isoformat()
+        self.month_start = date.today().replace(day=1).isoformat()
+        self.half_year_start = (date.today() - timedelta(days=180)).isoformat()
+        # شهر قديم غير مقفل لقياس الإقفال وإعادة الفتح
+        self.period = (date.today().replace(day=1) - timedelta(days=400)).strftime('%Y-%m')
+        self._stack = {}
+
+        conn = sqlite3.connect(db_path)
+        try:
+            def first(query):
+                row = conn.execute(query).fetchone()
+                return row[0] if row else None
+
+            self.doctor_id = first("SELECT id FROM doctors ORDER BY id LIMIT 1")
+            self.patient_id = first("SELECT id FROM patients ORDER BY id LIMIT 1")
+            self.treatment_id = first("SELECT id FROM treatments ORDER BY id LIMIT 1")
+            self.supplier_id = first("SELECT id FROM suppliers ORDER BY id LIMIT 1")
+            self.inventory_id = first("SELECT id FROM inventory ORDER BY id LIMIT 1")
+            self.account_id = first(f"SELECT id FROM accounts WHERE account_type = 'patient' AND account_holder_id = {self.patient_id}")
+            row = conn.execute("SELECT id, patient_id FROM appointments ORDER BY id DESC LIMIT 1").fetchone()
+            self.appointment_id, self.appointment_patient_id = row if row else (None, None)
+            name = first(f"SELECT name FROM patients WHERE id = {self.patient_id}") or ""
+            self.patient_prefix = name.split(" ")[0]
+            conn.execute("DELETE FROM accounting_periods WHERE period = ?", (self.period,))
+            conn.commit()
+        finally:
+            conn.close()
+
+        if self.account_id is None:
+            self.account_id = crud.create_or_update_account('patient', self.patient_id, "مريض")
+
+    def push(self, name, value):
+        self._stack.setdefault(name, []).append(value)
+
+    def pop(self, name):
+        return self._stack[name].pop()
+
+def summarize(samples):
+    """إحصائيات التكرارات بالمللي ثانية"""
+    values = [s * 1000 for s in samples]
+    return {
+        'runs': len(values),
+        'median_ms': round(statistics.median(values), 3),
+        'min_ms': round(min(values), 3),
+        'max_ms': round(max(values), 3),
+    }
+
+def selected(name, only):
+    return not only or any(name.startswith(prefix) for prefix in only)
+
+def run_crud(ctx, repeat, only):
+    """قياس دوال CRUDOperations: القراءة أولاً ثم الكتابة حتى لا تؤثر الكتابة على القراءة"""
+    from database.frames import memory_report
+
+    results = {}
+    ordered = sorted(CASES.items(), key=lambda item: (item[1].kind != 'read', item[0]))
+    for name, case in ordered:
+        if not selected(name, only):
+            continue
+        method = getattr(ctx.crud, name)
+        samples = []
+        memory = []
+        try:
+            # تشغيل تمهيدي للقراءة حتى تكون صفحات قاعدة البيانات في الذاكرة، ومعه قياس الذاكرة
+            if case.kind == 'read':
+                args, kwargs = case.args(ctx)
+                with memory_report() as memory:
+                    method(*args, **kwargs)
+            for _ in range(case.repeat or repeat):
+                if case.setup:
+                    case.setup(ctx)
+                args, kwargs = case.args(ctx)
+                started = time.perf_counter()
+                method(*args, **kwargs)
+                samples.append(time.perf_counter() - started)
+                if case.teardown:
+                    case.teardown(ctx)
+            results[name] = {'kind': case.kind, **summarize(samples)}
+            if memory:
+                results[name]['frame_bytes'] = sum(report.bytes_after for report in memory)
+                results[name]['frame_bytes_saved'] = sum(report.bytes_saved for report in memory)
+        except Exception as e:
+            results[name] = {'kind': case.kind, 'error': f"{type(e).__name__}: {e}"}
+        print(f"    {name}: " + (f"{results[name]['median_ms']:.2f} ms" if 'error' not in results[name]
+                                   else f"❌ {results[name]['error']}"), file=sys.stderr)
+    return results
+
+def _render_page(page):
+    # سكربت AppTest: دالة render للصفحة كما تستدعيها page_mapping، بدون الشريط الجانبي
+    import importlib
+    importlib.import_module(page).render()
+
+def run_pages(repeat, only, timeout):
+    """زمن عرض كل صفحة كاملة عبر AppTest: أول تشغيل (بارد) ثم وسيط إعادة التشغيل"""
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    for page in PAGES:
+        if not selected(page, only):
+            continue
+        at = AppTest.from_function(_render_page, args=(page,), default_timeout=timeout)
+        try:
+            started = time.perf_counter()
+            at.run()
+            cold = time.perf_counter() - started
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                at.run()
+                samples.append(time.perf_counter() - started)
+            results[page] = {'cold_ms': round(cold * 1000, 3), **summarize(samples)}
+            if at.exception:
+                results[page]['error'] = at.exception[0].message
+        except Exception as e:
+            results[page] = {'error': f"{type(e).__name__}: {e}"}
+        print(f"    page {page}: " + (f"{results[page]['median_ms']:.1f} ms" if 'median_ms' in results[page]
+                                        else f"❌ {results[page]['error']}"), file=sys.stderr)
+    return results
+
+def worker(args):
+    """تشغيل القياسات على قاعدة بيانات واحدة (في عملية مستقلة لأن مسار القاعدة ثابت لكل عملية)"""
+    os.environ["CLINIC_DB_PATH"] = args.db
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    sys.path.insert(0, ROOT)
+    from database.crud import CRUDOperations, crud
+    from database.dashboard_snapshot import dashboard_snapshots
+
+    ctx = Context(crud, args.db)
+    result = {}
+    if not args.no_crud:
+        result['crud'] = run_crud(ctx, args.repeat, args.only)
+        # الدوال العامة غير المغطاة حتى لا تفوت دالة جديدة دون قياس
+        public = sorted(name for name in vars(CRUDOperations) if not name.startswith('_') and callable(getattr(crud, name)))
+        result['uncovered'] = [name for name in public if name not in CASES]
+    if not args.no_pages:
+        result['pages'] = run_pages(args.repeat, args.only, args.page_timeout)
+
+    dashboard_snapshots.stop()
+    with open(args.result, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    return 0
+
+def prepare_database(preset, seed, anchor_date, cache_dir):
+    """قاعدة بيانات الحجم المطلوب من الذاكرة المحلية أو توليدها أول مرة"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"clinic_{preset}_{seed}_{anchor_date}.db")
+    if not os.path.exists(path):
+        print(f"⏳ توليد قاعدة بيانات {preset}...", file=sys.stderr)
+        subprocess.run(
+            [sys.executable, "-m", "tools.generate_data", "--preset", preset, "--seed", str(seed),
+             "--anchor-date", anchor_date, "--output", path],
+            cwd=ROOT, check=True, stdout=sys.stderr
+        )
+    return path
+
+def table_sizes(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('patients', 'appointments', 'payments', 'expenses', 'financial_transactions', 'activity_log')}
+    finally:
+        conn.close()
+
+def compare(results, baseline, threshold, min_delta_ms=2.0):
+    """مقارنة الوسيط بالنتائج المرجعية: التراجع هو زيادة الزمن بأكثر من threshold"""
+    regressions, improvements = [], []
+    for size, groups in results['sizes'].items():
+        base_groups = baseline.get('sizes', {}).get(size, {})
+        for group in ('crud', 'pages'):
+            for name, current in groups.get(group, {}).items():
+                previous = base_groups.get(group, {}).get(name)
+                if not previous or 'median_ms' not in current or 'median_ms' not in previous:
+                    continue
+                # الفروق الصغيرة بالمللي ثانية ضوضاء قياس (fsync، جدولة العمليات)
+                if abs(current['median_ms'] - previous['median_ms']) < min_delta_ms:
+                    continue
+                ratio = current['median_ms'] / previous['median_ms'] if previous['median_ms'] else float('inf')
+                entry = {'size': size, 'group': group, 'name': name, 'baseline_ms': previous['median_ms'],
+                         'current_ms': current['median_ms'], 'ratio': round(ratio, 3)}
+                if ratio > 1 + threshold:
+                    regressions.append(entry)
+                elif ratio < 1 / (1 + threshold):
+                    improvements.append(entry)
+    return regressions, improvements
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء دوال قاعدة البيانات والصفحات")
+    parser.add_argument("--sizes", nargs="+", default=["small"], help="أحجام البيانات (small medium large)")
+    parser.add_argument("--repeat", type=int, default=5, help="عدد التكرارات لكل قياس")
+    parser.add_argument("--seed", type=int, default=42, help="بذرة توليد البيانات")
+    parser.add_argument("--anchor-date", default=date.today().isoformat(), help="تاريخ مرجع البيانات YYYY-MM-DD")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "clinic_benchmarks"),
+                        help="مجلد حفظ قواعد البيانات المولدة")
+    parser.add_argument("--output", default="benchmark_results.json", help="ملف النتائج JSON")
+    parser.add_argument("--baseline", help="ملف نتائج سابق للمقارنة")
+    parser.add_argument("--threshold", type=float, default=0.25, help="نسبة الزيادة المسموحة قبل اعتبارها تراجعاً")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="أقل فرق بالمللي ثانية يؤخذ في الاعتبار")
+    parser.add_argument("--only", nargs="+", help="قياس الدوال/الصفحات التي تبدأ بهذه الأسماء فقط")
+    parser.add_argument("--no-crud", action="store_true", help="بدون قياس دوال قاعدة البيانات")
+    parser.add_argument("--no-pages", action="store_true", help="بدون قياس الصفحات")
+    parser.add_argument("--page-timeout", type=float, default=120, help="أقصى زمن لعرض صفحة بالثواني")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.worker:
+        return worker(args)
+
+    results = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'anchor_date': args.anchor_date,
+            'repeat': args.repeat,
+        },
+        'sizes': {}
+    }
+
+    forwarded = ["--repeat", str(args.repeat), "--page-timeout", str(args.page_timeout)]
+    if args.only:
+        forwarded += ["--only", *args.only]
+    if args.no_crud:
+        forwarded.append("--no-crud")
+    if args.no_pages:
+        forwarded.append("--no-pages")
+
+    for preset in args.sizes:
+        source = prepare_database(preset, args.seed, args.anchor_date, args.cache_dir)
+        with tempfile.TemporaryDirectory() as work_dir:
+            # الكتابة تتم على نسخة حتى تبقى القاعدة المحفوظة كما هي
+            db_path = os.path.join(work_dir, "clinic.db")
+            shutil.copyfile(source, db_path)
+            result_path = os.path.join(work_dir, "result.json")
+            print(f"📏 {preset}", file=sys.stderr)
+            subprocess.run(
+                [sys.executable, "-m", "tools.benchmark", "--worker", "--db", db_path, "--result", result_path, *forwarded],
+                cwd=ROOT, check=True
+            )
+            with open(result_path, encoding='utf-8') as f:
+                size_result = json.load(f)
+        size_result['rows'] = table_sizes(source)
+        results['sizes'][preset] = size_result
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"✅ النتائج في {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions, improvements = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for entry in improvements:
+        print(f"  ⬆️ {entry['size']}/{entry['name']}: {entry['baseline_ms']:.2f} → {entry['current_ms']:.2f} ms")
+    for entry in regressions:
+        print(f"  ⬇️ {entry['size']}/{entry['name']}: {entry['baseline_ms']:.2f} → {entry['current_ms']:.2f} ms (×{entry['ratio']})")
+    if regressions:
+        print(f"❌ {len(regressions)} تراجع في الأداء (أكثر من {args.threshold:.0%})")
+        return 1
+    print("✅ لا يوجد تراجع في الأداء")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,464 @@
+"""مولد بيانات تجريبية بحجم حقيقي لقاعدة بيانات العيادة.
+
+يبني ملف قاعدة بيانات كامل بأسماء عربية وتوزيعات تواريخ واقعية. نفس البذرة ونفس
+تاريخ المرجع (--anchor-date) ينتجان نفس البيانات دائماً. التحميل بـ executemany
+في معاملات كبيرة.
+
+أمثلة:
+    python -m tools.generate_data --preset small --output small.db
+    python -m tools.generate_data --preset large --output large.db --force
+    python -m tools.generate_data --patients 50000 --appointments 400000 --output custom.db
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from database.money import to_piasters
+
+PRESETS = {
+    'small': {
+        'doctors': 5, 'patients': 1000, 'treatments': 20, 'suppliers': 10, 'inventory': 100,
+        'appointments': 10000, 'payments': 7500, 'usage': 5000, 'expenses': 1000, 'activity': 20000
+    },
+    'medium': {
+        'doctors': 20, 'patients': 20000, 'treatments': 40, 'suppliers': 30, 'inventory': 500,
+        'appointments': 200000, 'payments': 150000, 'usage': 100000, 'expenses': 10000, 'activity': 300000
+    },
+    'large': {
+        'doctors': 50, 'patients': 200000, 'treatments': 60, 'suppliers': 60, 'inventory': 1500,
+        'appointments': 2000000, 'payments': 1500000, 'usage': 1000000, 'expenses': 60000, 'activity': 3000000
+    }
+}
+
+MALE_NAMES = [
+    "محمد", "أحمد", "محمود", "مصطفى", "علي", "حسن", "حسين", "عمر", "خالد", "إبراهيم",
+    "يوسف", "عبدالله", "عبدالرحمن", "طارق", "كريم", "هشام", "سامح", "شريف", "وليد", "ياسر",
+    "أيمن", "عمرو", "إسلام", "مينا", "جرجس", "بيتر", "رامي", "حازم", "تامر", "عادل"
+]
+FEMALE_NAMES = [
+    "فاطمة", "مريم", "سارة", "نورا", "هدى", "منى", "ياسمين", "آية", "رنا", "دينا",
+    "إيمان", "أسماء", "شيماء", "هبة", "نهى", "سلمى", "ملك", "جنى", "رحمة", "مي",
+    "ريهام", "نادية", "سميرة", "ليلى", "زينب", "خديجة", "دعاء", "مارينا", "كريستين", "نيرمين"
+]
+FAMILY_NAMES = [
+    "عبدالعزيز", "السيد", "الشافعي", "المصري", "النجار", "الحداد", "عثمان", "سليمان", "رمضان", "منصور",
+    "فوزي", "شاكر", "عبدالحميد", "الشريف", "حمدي", "زكي", "فهمي", "لطفي", "جمال", "سعيد",
+    "البنا", "الجمل", "درويش", "قاسم", "غنيم", "بدوي", "حافظ", "راضي", "نصار", "الفقي"
+]
+CITIES = ["القاهرة", "الجيزة", "الإسكندرية", "المنصورة", "طنطا", "الزقازيق", "أسيوط", "بنها", "شبين الكوم", "دمياط"]
+SPECIALIZATIONS = ["طب الأسنان العام", "تقويم الأسنان", "جراحة الفم", "علاج الجذور", "طب أسنان الأطفال", "تركيبات الأسنان", "أمراض اللثة", "تجميل الأسنان"]
+TREATMENTS = [
+    ("فحص وتنظيف", "وقائي", 200, 30), ("حشو عادي", "علاجي", 300, 45), ("حشو تجميلي", "تجميلي", 500, 45),
+    ("علاج عصب", "علاجي", 1200, 90), ("خلع عادي", "جراحي", 250, 30), ("خلع ضرس عقل", "جراحي", 900, 60),
+    ("تركيب تاج", "تركيبات", 2500, 60), ("تبييض", "تجميلي", 2000, 60), ("تقويم - جلسة متابعة", "تقويم", 400, 30),
+    ("زراعة سن", "جراحي", 9000, 120), ("تنظيف جير", "وقائي", 350, 45), ("أشعة بانوراما", "تشخيصي", 250, 15)
+]
+PAYMENT_METHODS = ["نقدي", "بطاقة ائتمان", "تحويل بنكي", "شيك"]
+PAYMENT_METHOD_WEIGHTS = [60, 25, 12, 3]
+EXPENSE_CATEGORIES = ["رواتب", "إيجار", "كهرباء ومياه", "مستلزمات طبية", "صيانة", "تسويق", "ضرائب", "أخرى"]
+INVENTORY_CATEGORIES = ["مستهلكات", "أدوية", "مواد حشو", "أدوات", "معقمات"]
+INVENTORY_ITEMS = ["قفازات طبية", "حقن تخدير", "كمامات", "مادة حشو كومبوزيت", "إبر", "قطن طبي", "مطهر", "خيوط جراحية", "أقماع", "برد أسنان"]
+ACTIVITY_TYPES = [
+    ("إضافة موعد", "appointments"), ("تحديث حالة موعد", "appointments"), ("إضافة دفعة", "payments"),
+    ("إضافة مريض", "patients"), ("تحديث مريض", "patients"), ("إضافة مصروف", "expenses"),
+    ("تحديث كمية مخزون", "inventory"), ("إضافة سند", "vouchers")
+]
+USERS = ["النظام", "الاستقبال", "المحاسب", "المدير"]
+
+def weighted_dates(rng, start, end, count):
+    """تواريخ بين start و end تزداد كثافتها مع الوقت (نمو العيادة) وتقل يوم الجمعة"""
+    days = (end - start).days + 1
+    weights = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        weight = 1.0 + offset / days  # نمو خطي حتى الضعف
+        if day.weekday() == 4:  # الجمعة
+            weight *= 0.2
+        weights.append(weight)
+    offsets = rng.choices(range(days), weights=weights, k=count)
+    offsets.sort()
+    return [(start + timedelta(days=offset)).isoformat() for offset in offsets]
+
+def person_name(rng, gender):
+    first = rng.choice(MALE_NAMES if gender == "ذكر" else FEMALE_NAMES)
+    return f"{first} {rng.choice(MALE_NAMES)} {rng.choice(FAMILY_NAMES)}"
+
+def phone_number(rng):
+    return f"01{rng.choice('0125')}{rng.randrange(10 ** 8):08d}"
+
+class DataGenerator:
+    """يملأ قاعدة بيانات فارغة بالأحجام المطلوبة"""
+
+    def __init__(self, db_path, sizes, seed=42, years=3, batch_size=50000, ledger=True, anchor_date=None, log=print):
+        self.db_path = db_path
+        self.sizes = sizes
+        self.seed = seed
+        self.batch_size = batch_size
+        self.ledger = ledger
+        self.log = log
+        # كل التواريخ نسبية لتاريخ المرجع (اليوم افتراضياً)
+        self.today = anchor_date or date.today()
+        self.end_date = self.today + timedelta(days=30)
+        self.start_date = self.today - timedelta(days=365 * years)
+
+    def rng(self, table):
+        """مولد مستقل لكل جدول حتى لا يغير حجم جدول بيانات جدول آخر"""
+        return random.Random(f"{self.seed}:{table}")
+
+    def run(self):
+        from database.models import db
+        started = time.perf_counter()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        try:
+            # البيانات المولدة هي الحالة الابتدائية وليست تغييرات ينتظرها مستهلك، فلا تُكتب
+            # صورها في changes أثناء التحميل
+            self.drop_change_triggers(conn)
+            self.clear(conn)
+            self.load(conn, 'doctors', self.doctors())
+            self.load(conn, 'patients', self.patients())
+            self.load(conn, 'treatments', self.treatments())
+            self.load(conn, 'suppliers', self.suppliers())
+            self.load(conn, 'inventory', self.inventory())
+            self.load(conn, 'appointments', self.appointments(conn))
+            self.load(conn, 'payments', self.payments(conn))
+            self.load(conn, 'inventory_usage', self.inventory_usage(conn))
+            self.load(conn, 'expenses', self.expenses())
+            self.load(conn, 'activity_log', self.activity_log())
+            if self.ledger:
+                self.build_ledger(conn)
+            self.fix_timestamps(conn)
+            db.create_change_feed(conn.cursor())
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.execute("PRAGMA journal_mode = DELETE")
+            conn.close()
+        self.log(f"✅ {self.db_path} في {time.perf_counter() - started:.1f} ث")
+
+    def drop_change_triggers(self, conn):
+        """حذف مشغلات سجل التغييرات (تُعاد بـ Database.create_change_feed بعد التحميل)"""
+        from database.models import db
+        for table in db.CHANGE_TRACKED_TABLES:
+            for op in ('insert', 'update', 'delete'):
+                conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_change_{op}")
+        conn.commit()
+
+    def clear(self, conn):
+        """حذف البيانات التجريبية الافتراضية التي أضافتها تهيئة الجداول.
+
+        الفترات المقفلة أولاً حتى لا توقف مشغلات الإقفال الحذف أو التحميل، ومواضع مستهلكي
+        سجل التغييرات مع changes لأن أرقامه تبدأ من جديد بعد حذف sqlite_sequence.
+        """
+        tables = [
+            'period_account_snapshots', 'period_payment_method_snapshots', 'period_expense_category_snapshots',
+            'accounting_periods', 'financial_transactions', 'accounts', 'vouchers', 'sequences', 'activity_log',
+            'inventory_usage', 'payments', 'appointments', 'inventory', 'expenses', 'suppliers', 'treatments',
+            'patients', 'doctors', 'changes', 'change_consumers'
+        ]
+        for table in tables:
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("DELETE FROM sqlite_sequence")
+        conn.commit()
+
+    def load(self, conn, table, rows):
+        """إدخال الصفوف على دفعات، كل دفعة في معاملة واحدة"""
+        started = time.perf_counter()
+        columns, rows = rows
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                conn.executemany(sql, batch)
+                conn.commit()
+                count += len(batch)
+                batch.clear()
+        if batch:
+            conn.executemany(sql, batch)
+            conn.commit()
+            count += len(batch)
+        elapsed = time.perf_counter() - started
+        self.log(f"  {table}: {count:,} صف في {elapsed:.1f} ث ({count / max(elapsed, 1e-9):,.0f} صف/ث)")
+
+    # ---------- الجداول ----------
+    def doctors(self):
+        from database.arabic_text import normalize_name
+        rng = self.rng('doctors')
+        columns = ('name', 'specialization', 'phone', 'email', 'address', 'hire_date', 'salary', 'commission_rate',
+                   'name_search')
+
+        def rows():
+            for i in range(self.sizes['doctors']):
+                gender = rng.choice(["ذكر", "أنثى"])
+                name = f"د. {person_name(rng, gender)}"
+                yield (
+                    name, rng.choice(SPECIALIZATIONS), phone_number(rng),
+                    f"doctor{i + 1}@clinic.com", rng.choice(CITIES),
+                    (self.start_date - timedelta(days=rng.randrange(0, 1500))).isoformat(),
+                    to_piasters(rng.randrange(8000, 40000, 500)), float(rng.choice([10, 15, 20, 25, 30])),
+                    normalize_name(name)
+                )
+        return columns, rows()
+
+    def patients(self):
+        from database.arabic_text import normalize_name
+        rng = self.rng('patients')
+        columns = ('name', 'phone', 'email', 'address', 'date_of_birth', 'gender', 'medical_history',
+                   'emergency_contact', 'name_search', 'created_at')
+        histories = ["لا يوجد", "لا يوجد", "لا يوجد", "حساسية بنسلين", "سكري", "ضغط مرتفع", "أمراض قلب", "ربو"]
+        created = weighted_dates(rng, self.start_date, self.today, self.sizes['patients'])
+
+        def rows():
+            for i in range(self.sizes['patients']):
+                gender = rng.choice(["ذكر", "أنثى"])
+                name = person_name(rng, gender)
+                birth = self.today - timedelta(days=rng.randrange(4 * 365, 80 * 365))
+                yield (
+                    name, phone_number(rng), f"patient{i + 1}@mail.com" if rng.random() < 0.4 else "",
+                    rng.choice(CITIES), birth.isoformat(), gender, rng.choice(histories), phone_number(rng),
+                    normalize_name(name), f"{created[i]} 10:00:00"
+                )
+        return columns, rows()
+
+    def treatments(self):
+        from database.arabic_text import normalize_name
+        rng = self.rng('treatments')
+        columns = ('name', 'description', 'base_price', 'duration_minutes', 'category', 'name_search')
+
+        def rows():
+            for i in range(self.sizes['treatments']):
+                name, category, price, minutes = TREATMENTS[i % len(TREATMENTS)]
+                if i >= len(TREATMENTS):
+                    name = f"{name} ({i // len(TREATMENTS) + 1})"
+                    price = round(price * rng.uniform(0.8, 1.5), -1)
+                yield (name, f"{name} - {category}", to_piasters(price), minutes, category, normalize_name(name))
+        return columns, rows()
+
+    def suppliers(self):
+        from database.arabic_text import normalize_name
+        rng = self.rng('suppliers')
+        columns = ('name', 'contact_person', 'phone', 'email', 'address', 'payment_terms', 'name_search')
+
+        def rows():
+            for i in range(self.sizes['suppliers']):
+                name = f"شركة {rng.choice(FAMILY_NAMES)} للمستلزمات {i + 1}"
+                yield (
+                    name, person_name(rng, "ذكر"), phone_number(rng),
+                    f"supplier{i + 1}@co.com", rng.choice(CITIES), rng.choice(["نقدي", "آجل 30 يوم", "آجل 60 يوم"]),
+                    normalize_name(name)
+                )
+        return columns, rows()
+
+    def inventory(self):
+        rng = self.rng('inventory')
+        columns = ('item_name', 'category', 'quantity', 'unit_price', 'min_stock_level', 'supplier_id', 'expiry_date',
+                   'created_at')
+
+        def rows():
+            for i in range(self.sizes['inventory']):
+                expiry = self.today + timedelta(days=rng.randrange(-30, 900))
+                yield (
+                    f"{rng.choice(INVENTORY_ITEMS)} {i + 1}", rng.choice(INVENTORY_CATEGORIES), rng.randrange(0, 500),
+                    round(rng.uniform(0.5, 300), 2), rng.choice([10, 20, 50]),
+                    rng.randrange(1, self.sizes['suppliers'] + 1), expiry.isoformat(),
+                    f"{self.start_date + timedelta(days=rng.randrange(0, (self.today - self.start_date).days))} 08:00:00"
+                )
+        return columns, rows()
+
+    def appointments(self, conn):
+        rng = self.rng('appointments')
+        prices = [row[0] for row in conn.execute("SELECT base_price FROM treatments ORDER BY id")]
+        columns = ('patient_id', 'doctor_id', 'treatment_id', 'appointment_date', 'appointment_time', 'status',
+                   'notes', 'total_cost', 'created_at')
+        today = self.today.isoformat()
+        dates = weighted_dates(rng, self.start_date, self.end_date, self.sizes['appointments'])
+        slots = [f"{hour:02d}:{minute:02d}" for hour in range(9, 22) for minute in (0, 15, 30, 45)]
+
+        def rows():
+            for appointment_date in dates:
+                treatment_id = rng.randrange(1, len(prices) + 1)
+                if appointment_date < today:
+                    status = rng.choices(["مكتمل", "ملغي", "مجدول"], weights=[85, 10, 5])[0]
+                else:
+                    status = rng.choices(["مجدول", "مؤكد"], weights=[70, 30])[0]
+                yield (
+                    # بعض المرضى يتكررون أكثر من غيرهم
+                    int(rng.paretovariate(1.2)) % self.sizes['patients'] + 1 if rng.random() < 0.3
+                    else rng.randrange(1, self.sizes['patients'] + 1),
+                    rng.randrange(1, self.sizes['doctors'] + 1), treatment_id, appointment_date, rng.choice(slots),
+                    status, "", prices[treatment_id - 1], f"{appointment_date} 09:00:00"
+                )
+        return columns, rows()
+
+    def payments(self, conn):
+        rng = self.rng('payments')
+        columns = ('appointment_id', 'patient_id', 'amount', 'payment_method', 'payment_date', 'status', 'notes', 'created_at')
+        count = self.sizes['payments']
+        # معظم الدفعات لمواعيد مكتملة، والباقي دفعات مستقلة
+        completed = conn.execute(
+            "SELECT id, patient_id, appointment_date, total_cost FROM appointments WHERE status = 'مكتمل' ORDER BY id"
+        ).fetchall()
+        linked = rng.sample(completed, min(len(completed), int(count * 0.9)))
+        linked.sort()
+        standalone_dates = weighted_dates(rng, self.start_date, self.today, count - len(linked))
+
+        def rows():
+            for appointment_id, patient_id, appointment_date, total_cost in linked:
+                # total_cost بالقرش، والدفعة الجزئية تُقرب لأقرب قرش
+                amount = total_cost if rng.random() < 0.8 else round(total_cost * rng.choice([0.25, 0.5, 0.75]))
+                method = rng.choices(PAYMENT_METHODS, weights=PAYMENT_METHOD_WEIGHTS)[0]
+                yield (appointment_id, patient_id, amount, method, appointment_date, "مكتمل", "", f"{appointment_date} 12:00:00")
+            for payment_date in standalone_dates:
+                method = rng.choices(PAYMENT_METHODS, weights=PAYMENT_METHOD_WEIGHTS)[0]
+                yield (None, rng.randrange(1, self.sizes['patients'] + 1), to_piasters(rng.randrange(100, 3000, 50)),
+                       method, payment_date, "مكتمل", "دفعة مقدمة", f"{payment_date} 12:00:00")
+        return columns, rows()
+
+    def inventory_usage(self, conn):
+        rng = self.rng('inventory_usage')
+        columns = ('inventory_id', 'appointment_id', 'quantity_used', 'usage_date', 'notes')
+        max_appointment = conn.execute("SELECT COALESCE(MAX(id), 0) FROM appointments").fetchone()[0]
+        dates = weighted_dates(rng, self.start_date, self.today, self.sizes['usage'])
+
+        def rows():
+            for usage_date in dates:
+                yield (rng.randrange(1, self.sizes['inventory'] + 1),
+                       rng.randrange(1, max_appointment + 1) if max_appointment else None,
+                       rng.randrange(1, 6), usage_date, "")
+        return columns, rows()
+
+    def expenses(self):
+        rng = self.rng('expenses')
+        columns = ('category', 'description', 'amount', 'expense_date', 'payment_method', 'receipt_number', 'notes')
+        dates = weighted_dates(rng, self.start_date, self.today, self.sizes['expenses'])
+
+        def rows():
+            for i, expense_date in enumerate(dates):
+                category = rng.choice(EXPENSE_CATEGORIES)
+                amount = rng.randrange(20000, 60000, 1000) if category == "رواتب" else rng.randrange(100, 8000, 50)
+                yield (category, f"{category} - {expense_date[:7]}", to_piasters(amount), expense_date,
+                       rng.choices(PAYMENT_METHODS, weights=PAYMENT_METHOD_WEIGHTS)[0], f"EXP-{i + 1:07d}", "")
+        return columns, rows()
+
+    def activity_log(self):
+        rng = self.rng('activity_log')
+        columns = ('action', 'table_name', 'record_id', 'details', 'user_name', 'created_at')
+        dates = weighted_dates(rng, self.start_date, self.today, self.sizes['activity'])
+
+        def rows():
+            for created in dates:
+                action, table = rng.choice(ACTIVITY_TYPES)
+                moment = datetime.fromisoformat(created) + timedelta(seconds=rng.randrange(8 * 3600, 22 * 3600))
+                yield (action, table, rng.randrange(1, 100000), action, rng.choice(USERS),
+                       moment.strftime('%Y-%m-%d %H:%M:%S'))
+        return columns, rows()
+
+    def build_ledger(self, conn):
+        """بناء الحسابات والحركات من المواعيد والمدفوعات والمشتريات بنفس قواعد CRUDOperations"""
+        from database.models import db
+        started = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO accounts (account_type, account_holder_id, account_holder_name) SELECT 'patient', id, name FROM patients")
+        cursor.execute("INSERT INTO accounts (account_type, account_holder_id, account_holder_name) SELECT 'doctor', id, name FROM doctors")
+        cursor.execute("INSERT INTO accounts (account_type, account_holder_id, account_holder_name) SELECT 'supplier', id, name FROM suppliers")
+
+        # الحركات بترتيب التاريخ حتى يكون الرصيد الجاري زمنياً. CROSS JOIN يثبت ترتيب الربط
+        # (الجدول الكبير ثم البحث في فهرس الحسابات) مهما كانت إحصائيات المخطط
+        cursor.execute('''
+            INSERT INTO financial_transactions
+            (account_id, transaction_type, amount, description, reference_type, reference_id, transaction_date,
+             payment_method, created_at)
+            SELECT account_id, transaction_type, amount, description, reference_type, reference_id, transaction_date,
+                   payment_method, transaction_date
+            FROM (
+                SELECT acc.id AS account_id, 'debit' AS transaction_type, a.total_cost / 100.0 AS amount, 'تكلفة موعد' AS description,
+                       'appointment' AS reference_type, a.id AS reference_id, a.appointment_date AS transaction_date,
+                       NULL AS payment_method, 0 AS sort_order
+                FROM appointments a
+                CROSS JOIN accounts acc ON acc.account_type = 'patient' AND acc.account_holder_id = a.patient_id
+                WHERE a.total_cost > 0
+                UNION ALL
+                SELECT acc.id, 'payment', p.amount / 100.0, 'دفعة من المريض', 'payment', p.id, p.payment_date, p.payment_method, 1
+                FROM payments p
+                CROSS JOIN accounts acc ON acc.account_type = 'patient' AND acc.account_holder_id = p.patient_id
+                UNION ALL
+                SELECT acc.id, 'credit', p.amount * d.commission_rate / 10000.0, 'حصة الطبيب من دفعة', 'payment', p.id,
+                       p.payment_date, NULL, 2
+                FROM payments p
+                JOIN appointments a ON a.id = p.appointment_id
+                JOIN doctors d ON d.id = a.doctor_id
+                CROSS JOIN accounts acc ON acc.account_type = 'doctor' AND acc.account_holder_id = d.id
+                WHERE d.commission_rate > 0
+                UNION ALL
+                SELECT acc.id, 'purchase', i.quantity * i.unit_price, 'مشتريات مخزون', 'inventory', i.id,
+                       substr(i.created_at, 1, 10), NULL, 3
+                FROM inventory i
+                CROSS JOIN accounts acc ON acc.account_type = 'supplier' AND acc.account_holder_id = i.supplier_id
+                WHERE i.quantity > 0 AND i.unit_price > 0
+            )
+            ORDER BY transaction_date, sort_order, reference_id
+        ''')
+        db._rebuild_running_balances(cursor)
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM financial_transactions").fetchone()[0]
+        self.log(f"  financial_transactions: {count:,} صف في {time.perf_counter() - started:.1f} ث")
+
+    def fix_timestamps(self, conn):
+        """توقيتات الإنشاء من تواريخ البيانات بدلاً من وقت التوليد حتى تتطابق النتائج"""
+        start = f"{self.start_date} 08:00:00"
+        for table in ('doctors', 'treatments', 'suppliers'):
+            conn.execute(f"UPDATE {table} SET created_at = ?", (start,))
+        conn.execute("UPDATE accounts SET created_at = ?, updated_at = COALESCE(last_transaction_date, ?)", (start, start))
+        conn.execute("UPDATE expenses SET created_at = expense_date || ' 12:00:00'")
+        conn.execute("UPDATE inventory_usage SET created_at = usage_date || ' 12:00:00'")
+        conn.commit()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="توليد قاعدة بيانات عيادة بيانات تجريبية بحجم محدد")
+    parser.add_argument("--output", default="clinic_synthetic.db", help="ملف قاعدة البيانات الناتج")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="أحجام جاهزة")
+    parser.add_argument("--seed", type=int, default=42, help="البذرة (نفس البذرة = نفس البيانات)")
+    parser.add_argument("--anchor-date", type=date.fromisoformat, help="تاريخ المرجع YYYY-MM-DD (افتراضياً اليوم)")
+    parser.add_argument("--years", type=int, default=3, help="عدد سنوات التاريخ")
+    parser.add_argument("--batch-size", type=int, default=50000, help="عدد الصفوف في كل معاملة")
+    parser.add_argument("--no-ledger", action="store_true", help="بدون بناء الحسابات المالية")
+    parser.add_argument("--force", action="store_true", help="استبدال الملف إذا كان موجوداً")
+    for name in PRESETS['small']:
+        parser.add_argument(f"--{name}", type=int, help=f"عدد صفوف {name} (يتجاوز الحجم الجاهز)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = dict(PRESETS[args.preset])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+
+    if os.path.exists(args.output):
+        if not args.force:
+            print(f"❌ الملف {args.output} موجود، استخدم --force للاستبدال")
+            return 1
+        os.remove(args.output)
+
+    # إنشاء الجداول بنفس كود التطبيق على الملف المطلوب
+    os.environ["CLINIC_DB_PATH"] = args.output
+    from database.models import db
+    if db.db_path != args.output:
+        print("❌ تم تحميل قاعدة البيانات مسبقاً بمسار آخر")
+        return 1
+
+    print(f"⏳ توليد {args.output} (seed={args.seed}): " + ", ".join(f"{k}={v:,}" for k, v in sizes.items()))
+    DataGenerator(args.output, sizes, seed=args.seed, years=args.years, batch_size=args.batch_size,
+                  ledger=not args.no_ledger, anchor_date=args.anchor_date).run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
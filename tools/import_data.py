@@ -0,0 +1,59 @@
+"""استيراد المرضى والمواعيد والمدفوعات من ملفات CSV أو XLSX (نقل بيانات فرع من نظام قديم).
+
+المرضى والأطباء في ملفات المواعيد والمدفوعات يُحددون بالمعرف أو رقم الهاتف أو الاسم.
+الصفوف المرفوضة تُكتب في ملف CSV بجانب الملف الأصلي مع سبب الرفض.
+
+أمثلة:
+    python -m tools.import_data patients patients.xlsx
+    python -m tools.import_data appointments appointments.csv --db branch.db --chunk-size 10000
+    python -m tools.import_data payments payments.csv --reject payments_rejected.csv
+"""
+
+import argparse
+import os
+import sys
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="استيراد بيانات العيادة من CSV أو XLSX")
+    parser.add_argument("entity", choices=["patients", "appointments", "payments"], help="نوع البيانات")
+    parser.add_argument("file", help="ملف CSV أو XLSX")
+    parser.add_argument("--db", help="ملف قاعدة البيانات (افتراضياً CLINIC_DB_PATH أو clinic.db)")
+    parser.add_argument("--reject", help="ملف الصفوف المرفوضة (افتراضياً <الملف>_rejected.csv)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="عدد الصفوف في كل دفعة")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.file):
+        print(f"❌ الملف {args.file} غير موجود")
+        return 1
+    if args.db:
+        os.environ["CLINIC_DB_PATH"] = args.db
+
+    from database.bulk_import import BulkImporter
+    from database.models import db
+
+    reject_path = args.reject or f"{os.path.splitext(args.file)[0]}_rejected.csv"
+    importer = BulkImporter(db, chunk_size=args.chunk_size)
+
+    def progress(result):
+        print(f"  {result.total_rows:,} صف: {result.imported:,} مستورد، {result.rejected:,} مرفوض "
+              f"({result.rows_per_second:,.0f} صف/ث)")
+
+    print(f"⏳ استيراد {args.entity} من {args.file} إلى {db.db_path}")
+    try:
+        result = importer.import_file(args.entity, args.file, reject_path=reject_path, progress=progress)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ {result.imported:,} من {result.total_rows:,} صف في {result.seconds:.1f} ث "
+          f"({result.rows_per_second:,.0f} صف/ث)")
+    for reason, count in sorted(result.reject_reasons.items(), key=lambda item: -item[1]):
+        print(f"  ❌ {count:,} × {reason}")
+    if result.reject_path:
+        print(f"📄 الصفوف المرفوضة في {result.reject_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""اختبار تحميل يحاكي عدة موظفي استقبال يعملون على نفس قاعدة البيانات في وقت واحد.
+
+كل عامل (خيط أو عملية) ينفذ خليطاً واقعياً من عمليات CRUDOperations: حجز موعد،
+تسجيل دفعة، بحث عن مريض، فتح لوحة التحكم، وصرف من المخزون. في النهاية يُطبع
+معدل العمليات في الثانية وزمن الاستجابة p50/p95/p99 لكل عملية وعدد أخطاء
+"database is locked".
+
+الاختبار يكتب في قاعدة البيانات، فاستخدم نسخة مولدة وليس قاعدة العيادة الفعلية:
+    python -m tools.generate_data --preset small --output load.db
+    python -m tools.load_test --db load.db --workers 8 --duration 30
+    python -m tools.load_test --db load.db --workers 4 8 16 --mode process --output load.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# الخليط الافتراضي (أوزان نسبية) كما يحدث في مكتب الاستقبال
+DEFAULT_MIX = {
+    'search_patient': 35,
+    'open_dashboard': 20,
+    'book_appointment': 20,
+    'record_payment': 15,
+    'use_inventory': 10,
+}
+
+PAYMENT_METHODS = ["نقدي", "بطاقة ائتمان", "تحويل بنكي"]
+TIME_SLOTS = [f"{hour:02d}:{minute:02d}" for hour in range(9, 21) for minute in (0, 30)]
+
+class FrontDeskSession:
+    """جلسة موظف استقبال واحدة: كل دالة عملية كاملة كما تنفذها الصفحة"""
+
+    def __init__(self, crud, ids, rng):
+        self.crud = crud
+        self.ids = ids
+        self.rng = rng
+        self.booked = []
+
+    def search_patient(self):
+        self.crud.find_patients(self.rng.choice(self.ids['prefixes']))
+
+    def open_dashboard(self):
+        today = date.today().isoformat()
+        self.crud.get_dashboard_stats()
+        self.crud.get_monthly_comparison()
+        self.crud.get_financial_summary()
+        self.crud.get_appointments_by_date(today)
+
+    def book_appointment(self):
+        patient_id = self.rng.choice(self.ids['patients'])
+        appointment_id = self.crud.create_appointment(
+            patient_id, self.rng.choice(self.ids['doctors']), self.rng.choice(self.ids['treatments']),
+            date.today().isoformat(), self.rng.choice(TIME_SLOTS), total_cost=self.rng.choice([200, 350, 500, 800])
+        )
+        self.booked.append((appointment_id, patient_id))
+
+    def record_payment(self):
+        # الدفع على موعد حجزته نفس الجلسة إن وجد، وإلا على مريض عشوائي
+        if self.booked:
+            appointment_id, patient_id = self.booked.pop()
+        else:
+            appointment_id, patient_id = None, self.rng.choice(self.ids['patients'])
+        self.crud.create_payment(appointment_id, patient_id, self.rng.choice([100, 200, 350]),
+                                 self.rng.choice(PAYMENT_METHODS), date.today().isoformat())
+
+    def use_inventory(self):
+        self.crud.update_inventory_quantity(self.rng.choice(self.ids['inventory']), self.rng.randint(10, 500))
+
+def percentile(sorted_values, fraction):
+    """النسبة المئوية بالاستيفاء الخطي من قائمة مرتبة"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def is_locked_error(error):
+    return isinstance(error, sqlite3.OperationalError) and 'locked' in str(error)
+
+def run_worker(worker_id, db_path, ids, mix, start_at, duration, think_ms, seed):
+    """حلقة عامل واحد حتى انتهاء المدة، وإرجاع الأزمنة والأخطاء لكل عملية"""
+    os.environ["CLINIC_DB_PATH"] = db_path
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from database.crud import crud
+
+    rng = random.Random(f"{seed}:{worker_id}")
+    session = FrontDeskSession(crud, ids, rng)
+    operations = list(mix)
+    weights = [mix[name] for name in operations]
+    latencies = {name: [] for name in operations}
+    errors = {name: {'locked': 0, 'other': 0} for name in operations}
+    messages = {}
+
+    # كل العمال يبدأون معاً بعد انتهاء الاستيراد والتهيئة
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + duration
+    while time.time() < deadline:
+        name = rng.choices(operations, weights)[0]
+        started = time.perf_counter()
+        try:
+            getattr(session, name)()
+            latencies[name].append(time.perf_counter() - started)
+        except Exception as e:
+            kind = 'locked' if is_locked_error(e) else 'other'
+            errors[name][kind] += 1
+            messages.setdefault(f"{type(e).__name__}: {e}", 0)
+            messages[f"{type(e).__name__}: {e}"] += 1
+        if think_ms:
+            time.sleep(rng.expovariate(1000 / think_ms))
+
+    return {'latencies': latencies, 'errors': errors, 'messages': messages}
+
+def load_ids(db_path, prefix_count=200):
+    """معرفات حقيقية تشترك فيها كل الجلسات"""
+    conn = sqlite3.connect(db_path)
+    try:
+        def column(query):
+            return [row[0] for row in conn.execute(query)]
+
+        ids = {
+            'patients': column("SELECT id FROM patients"),
+            'doctors': column("SELECT id FROM doctors"),
+            'treatments': column("SELECT id FROM treatments"),
+            'inventory': column("SELECT id FROM inventory"),
+            'prefixes': [name.split(" ")[0][:3] for name in
+                         column(f"SELECT name FROM patients ORDER BY random() LIMIT {prefix_count}")],
+        }
+    finally:
+        conn.close()
+    for name, values in ids.items():
+        if not values:
+            raise ValueError(f"لا توجد بيانات في {name}، ولّد قاعدة بيانات أولاً بـ tools.generate_data")
+    return ids
+
+def run_load(db_path, workers, mode, duration, mix, think_ms, seed, startup_seconds=3.0):
+    """تشغيل العمال وتجميع النتائج"""
+    ids = load_ids(db_path)
+    start_at = time.time() + startup_seconds
+    if mode == 'process':
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        futures = [executor.submit(run_worker, worker_id, db_path, ids, mix, start_at, duration, think_ms, seed)
+                   for worker_id in range(workers)]
+        results = [future.result() for future in futures]
+    return summarize(results, workers, mode, duration)
+
+def summarize(results, workers, mode, duration):
+    operations = {}
+    total_ok = total_locked = total_other = 0
+    messages = {}
+    for name in results[0]['latencies']:
+        values = sorted(v * 1000 for result in results for v in result['latencies'][name])
+        locked = sum(result['errors'][name]['locked'] for result in results)
+        other = sum(result['errors'][name]['other'] for result in results)
+        total_ok += len(values)
+        total_locked += locked
+        total_other += other
+        operations[name] = {
+            'count': len(values),
+            'per_second': round(len(values) / duration, 2),
+            'locked_errors': locked,
+            'other_errors': other,
+            'p50_ms': _round(percentile(values, 0.50)),
+            'p95_ms': _round(percentile(values, 0.95)),
+            'p99_ms': _round(percentile(values, 0.99)),
+            'max_ms': _round(values[-1] if values else None),
+        }
+    for result in results:
+        for message, count in result['messages'].items():
+            messages[message] = messages.get(message, 0) + count
+
+    return {
+        'workers': workers,
+        'mode': mode,
+        'duration_seconds': duration,
+        'throughput_per_second': round(total_ok / duration, 2),
+        'completed': total_ok,
+        'locked_errors': total_locked,
+        'other_errors': total_other,
+        'operations': operations,
+        'error_messages': dict(sorted(messages.items(), key=lambda item: -item[1])[:10]),
+    }
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+def print_report(report):
+    print(f"\n👥 {report['workers']} عامل ({report['mode']}) لمدة {report['duration_seconds']} ث: "
+          f"{report['throughput_per_second']:,.1f} عملية/ث، "
+          f"{report['locked_errors']} database is locked، {report['other_errors']} أخطاء أخرى")
+    print(f"  {'العملية':<18}{'العدد':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'locked':>8}")
+    for name, stats in report['operations'].items():
+        def ms(value):
+            return f"{value:.1f}" if value is not None else "-"
+        print(f"  {name:<18}{stats['count']:>8}{ms(stats['p50_ms']):>10}{ms(stats['p95_ms']):>10}"
+              f"{ms(stats['p99_ms']):>10}{stats['locked_errors']:>8}")
+    for message, count in report['error_messages'].items():
+        print(f"  ❌ {count} × {message}")
+
+def parse_mix(text):
+    """صيغة --mix: search_patient=35,book_appointment=20 ..."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"عملية غير معروفة: {name} (المتاح: {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="اختبار تحميل متزامن لقاعدة بيانات العيادة")
+    parser.add_argument("--db", required=True, help="ملف قاعدة البيانات (سيتم الكتابة فيه)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4], help="عدد الجلسات المتزامنة (أكثر من قيمة = عدة جولات)")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread", help="خيوط أم عمليات مستقلة")
+    parser.add_argument("--duration", type=float, default=20, help="مدة كل جولة بالثواني")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="أوزان العمليات، مثلاً search_patient=50,book_appointment=50")
+    parser.add_argument("--think-ms", type=float, default=0, help="متوسط زمن التفكير بين العمليات (0 = أقصى حمل)")
+    parser.add_argument("--seed", type=int, default=42, help="البذرة")
+    parser.add_argument("--output", help="حفظ النتائج JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"❌ الملف {args.db} غير موجود")
+        return 1
+    db_path = os.path.abspath(args.db)
+
+    reports = []
+    for workers in args.workers:
+        report = run_load(db_path, workers, args.mode, args.duration, args.mix, args.think_ms, args.seed)
+        print_report(report)
+        reports.append(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'db': db_path,
+                'sqlite': sqlite3.sqlite_version,
+                'think_ms': args.think_ms,
+                'mix': args.mix,
+                'runs': reports,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ النتائج في {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""استعادة قاعدة البيانات كما كانت في لحظة معينة من أقرب نسخة احتياطية وسجل التغييرات.
+
+اللحظة بالتوقيت المحلي افتراضياً (أو UTC مع --utc). النتيجة ملف جديد في مجلد backups،
+واستبدال القاعدة الحالية به يتم فقط مع --replace بعد أخذ نسخة أمان.
+
+أمثلة:
+    python -m tools.restore "2025-03-01 14:30"
+    python -m tools.restore "2025-03-01 14:30:15" --db branch.db --output restored.db
+    python -m tools.restore "2025-03-01 12:30" --utc --replace
+    python -m tools.restore --stats
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="استعادة قاعدة العيادة لنقطة زمنية")
+    parser.add_argument("time", nargs="?", help="اللحظة المطلوبة: YYYY-MM-DD HH:MM[:SS]")
+    parser.add_argument("--db", help="ملف قاعدة البيانات (افتراضياً CLINIC_DB_PATH أو clinic.db)")
+    parser.add_argument("--output", help="ملف النسخة المستعادة (افتراضياً في مجلد backups)")
+    parser.add_argument("--utc", action="store_true", help="اللحظة بتوقيت UTC")
+    parser.add_argument("--replace", action="store_true", help="استبدال القاعدة الحالية بالنسخة المستعادة")
+    parser.add_argument("--stats", action="store_true", help="عرض حجم سجل التغييرات فقط")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.time and not args.stats:
+        print("❌ حدد اللحظة المطلوبة أو --stats")
+        return 1
+    if args.db:
+        os.environ["CLINIC_DB_PATH"] = args.db
+
+    from database.journal import change_journal
+    from database.models import db
+
+    db.initialize()
+    shipped = change_journal.ship()
+    stats = change_journal.stats()
+    print(f"📒 {stats['journal_path']}: {stats['entries']:,} تغيير، {stats['journal_bytes'] / (1024 * 1024):.2f} MB "
+          f"({stats['bytes_per_entry']:.0f} بايت/تغيير، {shipped:,} جديد)، {stats['backups']} نسخة احتياطية")
+    if args.stats:
+        return 0
+
+    try:
+        moment = datetime.fromisoformat(args.time)
+    except ValueError:
+        print(f"❌ لحظة غير صحيحة: {args.time}")
+        return 1
+    if not args.utc:
+        moment = moment.astimezone().astimezone(timezone.utc)
+    # بدون ثوانٍ كسرية تدخل كل تغييرات الثانية المحددة
+    target_time = moment.strftime("%Y-%m-%d %H:%M:%S.") + (f"{moment.microsecond // 1000:03d}" if moment.microsecond else "999")
+
+    print(f"⏳ استعادة {db.db_path} كما كانت في {target_time} UTC")
+    try:
+        result = change_journal.restore(target_time, output_path=args.output)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ {result.output_path} من {os.path.basename(result.base_backup)}")
+    print(f"  {result.replayed:,} تغيير ({result.rows_written:,} صف) في {result.seconds:.2f} ث "
+          f"({result.changes_per_second:,.0f} تغيير/ث)")
+    if args.replace:
+        safety_backup = change_journal.replace_database(result)
+        print(f"♻️ تم استبدال القاعدة الحالية، والحالة السابقة في {safety_backup}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
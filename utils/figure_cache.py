@@ -0,0 +1,82 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+import plotly.graph_objects as go
+
+class FigureCache:
+    """ذاكرة مؤقتة للرسوم البيانية مفتاحها بصمة البيانات ومعاملات الرسم.
+
+    تُحفظ الرسوم كقواميس (to_dict) مع إخراج الأقدم استخداماً عند امتلاء السعة، وعند تكرار
+    نفس البيانات يُعاد الرسم من القاموس بدون تحقق من الخصائص (تحقق منها عند بنائه أول مرة)
+    بدلاً من تشغيل plotly express أو تحليل JSON والتحقق من جديد.
+    دالة البناء يجب أن تعتمد فقط على البيانات والمعاملات الممررة لها.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # عدادات
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, builder, data=None, **params):
+        """الرسم من الذاكرة إن وجد، وإلا بناؤه بـ builder(data, **params) وحفظه"""
+        key = self.fingerprint(builder, data, params)
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        if spec is None:
+            figure = builder(data, **params)
+            spec = figure.to_dict()
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = spec
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return figure
+
+        # كائن جديد لكل استدعاء حتى لا تتأثر الجلسات ببعضها إذا عُدل الرسم
+        return go.Figure(spec, _validate=False)
+
+    def fingerprint(self, builder, data, params):
+        """بصمة دالة البناء والبيانات والمعاملات"""
+        digest = hashlib.blake2b(digest_size=16)
+        code = getattr(builder, '__code__', None)
+        builder_id = f"{getattr(builder, '__module__', '')}.{getattr(builder, '__qualname__', repr(builder))}"
+        if code is not None:
+            builder_id += f":{code.co_filename}:{code.co_firstlineno}"
+        digest.update(builder_id.encode())
+
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            frame = data.to_frame() if isinstance(data, pd.Series) else data
+            digest.update(repr(list(frame.columns)).encode())
+            digest.update(repr(list(frame.dtypes.astype(str))).encode())
+            digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+        else:
+            digest.update(repr(data).encode())
+
+        digest.update(repr(sorted(params.items())).encode())
+        return digest.hexdigest()
+
+    def stats(self):
+        """عدادات الذاكرة"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """تفريغ الذاكرة"""
+        with self._lock:
+            self._entries.clear()
+
+figure_cache = FigureCache()
+
+def cached_figure(builder, data=None, **params):
+    """اختصار لـ figure_cache.get_or_build"""
+    return figure_cache.get_or_build(builder, data, **params)
@@ -2,9 +2,13 @@ from datetime import datetime, date
 import pandas as pd
 import re
 
-def format_currency(amount, currency="ج.م"):
-    """تنسيق المبلغ المالي"""
+def format_currency(amount, currency="ج.م", piasters=False):
+    """تنسيق المبلغ المالي (piasters=True إذا كان المبلغ عدداً صحيحاً بالقرش كما في الجداول)"""
     try:
+        if piasters:
+            pounds, rest = divmod(abs(int(amount)), 100)
+            sign = "-" if int(amount) < 0 else ""
+            return f"{sign}{pounds:,}.{rest:02d} {currency}"
         return f"{float(amount):,.2f} {currency}"
     except Exception:
         return f"{amount} {currency}"
@@ -46,6 +50,16 @@ def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return bool(re.match(pattern, str(email)))
 
+def validate_phones(phones):
+    """نسخة لعمود كامل من validate_phone: Series منطقية بنفس القواعد"""
+    digits = pd.Series(phones, dtype="string").str.replace(r'\D', '', regex=True)
+    return ((digits.str.len() == 11) & digits.str.startswith('01')).fillna(False).astype(bool)
+
+def validate_emails(emails):
+    """نسخة لعمود كامل من validate_email: Series منطقية بنفس القواعد"""
+    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return pd.Series(emails, dtype="string").str.match(pattern).fillna(False).astype(bool)
+
 def export_to_excel(dataframe, filename):
     """تصدير بيانات إلى Excel"""
     try: